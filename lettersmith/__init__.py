@@ -1,19 +1,49 @@
-from lettersmith import absolutize
-from lettersmith import archive
-from lettersmith import blog
-from lettersmith import data
-from lettersmith import docs
-from lettersmith import files
-from lettersmith import html
-from lettersmith import jinjatools
-from lettersmith import markdowntools
-from lettersmith import permalink
-from lettersmith import query
-from lettersmith import rss
-from lettersmith import sitemap
-from lettersmith import stub
-from lettersmith import taxonomy
-from lettersmith import wikidoc
+"""
+Lettersmith. A set of tools for static site generation.
+
+Submodules are imported lazily, the first time they are used, so
+`import lettersmith` stays fast. Scripts that only need a few tools
+(e.g. `files` and `write`) never pay for importing Jinja, commonmark
+or YAML.
+"""
+from importlib import import_module
 from lettersmith.write import write
 from lettersmith.func import rest, pipe, compose, thrush
-from itertools import chain
\ No newline at end of file
+from itertools import chain
+
+
+_SUBMODULES = (
+    "absolutize",
+    "archive",
+    "blog",
+    "data",
+    "docs",
+    "files",
+    "html",
+    "jinjatools",
+    "markdowntools",
+    "permalink",
+    "query",
+    "rss",
+    "sitemap",
+    "stub",
+    "taxonomy",
+    "wikidoc"
+)
+
+
+__all__ = _SUBMODULES + ("write", "rest", "pipe", "compose", "thrush", "chain")
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        module = import_module("lettersmith." + name)
+        globals()[name] = module
+        return module
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name)
+    )
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
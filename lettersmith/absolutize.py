@@ -1,13 +1,7 @@
 """
 Tools for making relative URLs absolute in doc content.
 """
-import re
-from lettersmith.docs import renderer
-from lettersmith.func import composable
-from lettersmith import path as pathtools
-
-
-URL_ATTR = r"""(src|href)=["'](.*?)["']"""
+from lettersmith import rewrite
 
 
 def absolutize(base_url):
@@ -16,17 +10,9 @@ def absolutize(base_url):
     that start with `/` and instead starts them with `base_url`.
 
     URLS are found by matching against `href=` and `src=`.
-    """
-    def render_inner_match(match):
-        attr = match.group(1)
-        value = match.group(2)
-        url = pathtools.qualify_url(value, base_url)
-        return '{attr}="{url}"'.format(attr=attr, url=url)
 
-    @renderer
-    def render(content):
-        """
-        Absolutize URLs in doc content fields.
-        """
-        return re.sub(URL_ATTR, render_inner_match, content)
-    return render
\ No newline at end of file
+    This is a single `rewrite.rewrite_html` pass. If you are also doing
+    other rewrites, pass `rewrite.qualify_urls(base_url)` to the same
+    `rewrite_html` call instead, so content is only scanned once.
+    """
+    return rewrite.rewrite_html(rewrite.qualify_urls(base_url))
@@ -0,0 +1,300 @@
+"""
+Async versions of the pipeline tools, built on asyncio.
+
+Async stages take an async iterable and return an async iterable, just
+like sync stages take and return iterables. `maps` and `filters` run up
+to `concurrency` items at a time, so slow file reads and writes overlap
+with each other and with other stages. Blocking functions run in an
+executor: the default thread pool for I/O, or a process pool you pass
+in for CPU-heavy work.
+
+Sync stages (any existing plugin) can be used in an async `pipe` as-is.
+They are run in a worker thread, fed one item at a time from the async
+stream, so they still stream, and they don't block the event loop.
+
+Example:
+
+    async def build():
+        posts = await aio.pipe(
+            aio.find("post/*.md"),
+            docs.uplift_frontmatter,
+            blog.markdown_post(base_url),
+            aio.maps(expensive, executor=process_pool),
+            aio.collect
+        )
+        await aio.write(posts, directory="public")
+
+    asyncio.run(build())
+"""
+import asyncio
+import inspect
+from collections import deque
+from collections.abc import Iterator
+from functools import wraps
+from pathlib import PurePath
+from threading import Thread
+from lettersmith import doc as Doc
+from lettersmith.path import walk_files
+from lettersmith.io import write_blob_deep, blob_size
+from lettersmith.write import writeable as _writeable, _clear_directory
+
+
+_DEFAULT_CONCURRENCY = 8
+
+# Markers for items passed between threads and the event loop
+_DONE = object()
+_STREAM = object()
+_ITEM = object()
+_VALUE = object()
+_ERROR = object()
+
+
+def stage(func):
+    """
+    Mark a function as an async stage, so `pipe` doesn't lift it.
+    Can be used as a decorator.
+    """
+    func.is_async_stage = True
+    return func
+
+
+def _is_async_stage(func):
+    return (
+        getattr(func, "is_async_stage", False)
+        or inspect.isasyncgenfunction(func)
+        or inspect.iscoroutinefunction(func)
+    )
+
+
+async def _call(func, executor, item):
+    if inspect.iscoroutinefunction(func):
+        return await func(item)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, func, item)
+
+
+@stage
+async def from_iter(iterable, executor=None):
+    """
+    Turn a sync iterable into an async iterable. Items are pulled in an
+    executor, so iterables that block (like `docs.find`) don't block the
+    event loop.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = iter(iterable)
+    while True:
+        item = await loop.run_in_executor(executor, next, iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
+
+
+def _aiter(iterable):
+    if hasattr(iterable, "__aiter__"):
+        return iterable
+    return from_iter(iterable)
+
+
+async def collect(aiterable):
+    """
+    Read an async iterable into a tuple.
+    """
+    return tuple([item async for item in _aiter(aiterable)])
+
+
+def lift(sync_stage):
+    """
+    Lift a sync stage into an async stage.
+
+    The sync stage runs in its own thread, reading items from the async
+    stream as it asks for them. If it returns an iterator (like most
+    stages), its results are streamed back as an async iterable. If it
+    returns anything else (like `tuple`, or `rss.rss`, which returns a
+    single doc), that value is returned as-is, just like in a sync
+    pipeline.
+    """
+    @stage
+    @wraps(sync_stage)
+    async def lifted(aiterable):
+        loop = asyncio.get_running_loop()
+        source = _aiter(aiterable).__aiter__()
+        messages = asyncio.Queue(maxsize=_DEFAULT_CONCURRENCY)
+
+        def pull():
+            while True:
+                item = asyncio.run_coroutine_threadsafe(
+                    _anext(source),
+                    loop
+                ).result()
+                if item is _DONE:
+                    return
+                yield item
+
+        def put(kind, value):
+            asyncio.run_coroutine_threadsafe(
+                messages.put((kind, value)),
+                loop
+            ).result()
+
+        def run():
+            try:
+                value = sync_stage(pull())
+                if isinstance(value, Iterator):
+                    put(_STREAM, None)
+                    for item in value:
+                        put(_ITEM, item)
+                    put(_DONE, None)
+                else:
+                    put(_VALUE, value)
+            except BaseException as e:
+                put(_ERROR, e)
+
+        Thread(target=run, daemon=True).start()
+        kind, value = await messages.get()
+        if kind is _ERROR:
+            raise value
+        elif kind is _VALUE:
+            return value
+        else:
+            return _drain(messages)
+    return lifted
+
+
+async def _drain(messages):
+    while True:
+        kind, value = await messages.get()
+        if kind is _ITEM:
+            yield value
+        elif kind is _ERROR:
+            raise value
+        else:
+            return
+
+
+async def _anext(aiterator):
+    try:
+        return await aiterator.__anext__()
+    except StopAsyncIteration:
+        return _DONE
+
+
+async def pipe(value, *funcs):
+    """
+    Pipe value through a series of stages, like `func.pipe`.
+
+    Sync iterables are turned into async iterables, and sync stages are
+    lifted with `lift`. If a stage is a coroutine function (like
+    `collect`), its result is awaited.
+    """
+    for func in funcs:
+        if not _is_async_stage(func):
+            func = lift(func)
+            value = _aiter(value)
+        value = func(value)
+        if inspect.isawaitable(value):
+            value = await value
+    return value
+
+
+def _ordered(aiterable, func, executor, concurrency):
+    """
+    Run `func` on items with up to `concurrency` running at once.
+    Yields `(item, result)` in the same order as the input.
+    """
+    async def run():
+        pending = deque()
+        try:
+            async for item in _aiter(aiterable):
+                pending.append((
+                    item,
+                    asyncio.ensure_future(_call(func, executor, item))
+                ))
+                if len(pending) >= concurrency:
+                    item, task = pending.popleft()
+                    yield item, await task
+            while pending:
+                item, task = pending.popleft()
+                yield item, await task
+        finally:
+            for item, task in pending:
+                task.cancel()
+    return run()
+
+
+def maps(a2b, concurrency=_DEFAULT_CONCURRENCY, executor=None):
+    """
+    Map an async iterable with function `a2b`, running up to
+    `concurrency` calls at once. Output order matches input order.
+
+    `a2b` can be a coroutine function, or a sync function. Sync
+    functions run in `executor` (the default thread pool if None).
+    Pass a `ProcessPoolExecutor` for CPU-heavy work.
+    """
+    @stage
+    async def map_bound(aiterable):
+        async for item, result in _ordered(
+            aiterable, a2b, executor, concurrency
+        ):
+            yield result
+    return map_bound
+
+
+def filters(predicate, concurrency=_DEFAULT_CONCURRENCY, executor=None):
+    """
+    Keep items if they pass predicate function test, running up to
+    `concurrency` tests at once. Output order matches input order.
+    See `maps` for how `predicate` is run.
+    """
+    @stage
+    async def filter_bound(aiterable):
+        async for item, keep in _ordered(
+            aiterable, predicate, executor, concurrency
+        ):
+            if keep:
+                yield item
+    return filter_bound
+
+
+def find(*globs, exclude=(), concurrency=_DEFAULT_CONCURRENCY):
+    """
+    Async version of `docs.find`. The directory is walked in a thread,
+    and up to `concurrency` docs are read at once.
+    """
+    entries = from_iter(walk_files(".", globs, exclude=exclude))
+    return maps(Doc.load_entry, concurrency=concurrency)(entries)
+
+
+def writer(writeable, concurrency=_DEFAULT_CONCURRENCY):
+    """
+    Lift a `writeable` function into an async `write` function, like
+    `write.writer`. Up to `concurrency` files are written at once, in
+    the default thread pool.
+    """
+    async def write(things, directory):
+        """
+        Write files to `directory`.
+        """
+        loop = asyncio.get_running_loop()
+        dir_path = PurePath(directory)
+        await loop.run_in_executor(None, _clear_directory, dir_path)
+        known_dirs = set()
+
+        def write_thing(thing):
+            output_path, blob = writeable(thing)
+            write_blob_deep(
+                dir_path.joinpath(output_path),
+                blob,
+                known_dirs=known_dirs
+            )
+            return blob_size(blob)
+
+        written = 0
+        size = 0
+        async for thing_size in maps(write_thing, concurrency)(things):
+            written = written + 1
+            size = size + thing_size
+        return {"written": written, "bytes": size}
+    return write
+
+
+write = writer(_writeable)
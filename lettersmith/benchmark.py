@@ -0,0 +1,215 @@
+"""
+Benchmarks for comparing the tools lettersmith can plug in.
+
+Run from the command line to compare installed markdown backends on a
+corpus of markdown files:
+
+    python -m lettersmith.benchmark markdown "post/*.md" "page/*.md"
+
+Or to time `import lettersmith` in a fresh interpreter:
+
+    python -m lettersmith.benchmark imports
+"""
+import argparse
+import difflib
+import re
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from lettersmith import markdowntools
+from lettersmith.path import walk_files
+
+
+BackendResult = namedtuple("BackendResult", (
+    "backend", "docs", "seconds", "docs_per_sec", "differing", "sample_diff"
+))
+BackendResult.__doc__ = """
+Benchmark and conformance result for a single markdown backend.
+
+- docs: number of docs rendered per round
+- seconds: best time for one round over the whole corpus
+- docs_per_sec: throughput, based on the best round
+- differing: number of docs whose output differs from the reference
+- sample_diff: a unified diff for the first differing doc, or ""
+"""
+
+
+def _normalize_html(html):
+    """
+    Normalize HTML whitespace, so backends that only differ in
+    formatting count as conformant.
+    """
+    html = re.sub(r">\s+<", "><", html)
+    html = re.sub(r"\s+", " ", html)
+    return html.strip()
+
+
+def _time_render(render, corpus):
+    start = time.perf_counter()
+    outputs = tuple(render(text) for text in corpus)
+    return time.perf_counter() - start, outputs
+
+
+def markdown_backends(corpus, backends=None, reference="commonmark", rounds=3):
+    """
+    Render the same `corpus` (a sequence of markdown strings) through
+    each backend, and compare speed and output.
+
+    Output of each backend is compared to the `reference` backend,
+    after normalizing whitespace. If `backends` is None, every installed
+    backend is benchmarked.
+
+    Returns a tuple of `BackendResult`, fastest first.
+    """
+    corpus = tuple(corpus)
+    backends = markdowntools.available() if backends is None else backends
+    reference_outputs = tuple(
+        _normalize_html(html)
+        for html in map(markdowntools.renderer(reference), corpus)
+    )
+    results = []
+    for backend in backends:
+        render = markdowntools.renderer(backend)
+        best = None
+        for i in range(rounds):
+            seconds, outputs = _time_render(render, corpus)
+            best = seconds if best is None else min(best, seconds)
+        differing = 0
+        sample_diff = ""
+        for expected, actual in zip(reference_outputs, outputs):
+            actual = _normalize_html(actual)
+            if actual != expected:
+                differing = differing + 1
+                if not sample_diff:
+                    sample_diff = "\n".join(difflib.unified_diff(
+                        expected.replace("><", ">\n<").splitlines(),
+                        actual.replace("><", ">\n<").splitlines(),
+                        reference,
+                        backend,
+                        lineterm=""
+                    ))
+        results.append(BackendResult(
+            backend=backend,
+            docs=len(corpus),
+            seconds=best,
+            docs_per_sec=len(corpus) / best if best > 0 else float("inf"),
+            differing=differing,
+            sample_diff=sample_diff
+        ))
+    return tuple(sorted(results, key=lambda result: result.seconds))
+
+
+def format_backend_results(results):
+    """
+    Format backend results as a plain-text table.
+    """
+    lines = ["{:<18}{:>12}{:>12}{:>12}".format(
+        "backend", "docs/sec", "seconds", "differing"
+    )]
+    for result in results:
+        lines.append("{:<18}{:>12.1f}{:>12.4f}{:>12}".format(
+            result.backend,
+            result.docs_per_sec,
+            result.seconds,
+            "{}/{}".format(result.differing, result.docs)
+        ))
+    return "\n".join(lines)
+
+
+_IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(",".join(sorted(sys.modules)))
+"""
+
+
+def import_time(module="lettersmith", rounds=5):
+    """
+    Time importing `module` in a fresh interpreter, `rounds` times.
+
+    Returns a tuple of `(seconds, modules)`, where `seconds` is the best
+    time, and `modules` is the set of module names loaded afterwards.
+    """
+    best = None
+    modules = frozenset()
+    for i in range(rounds):
+        out = subprocess.run(
+            (sys.executable, "-c", _IMPORT_SCRIPT.format(module=module)),
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True
+        ).stdout
+        seconds, names = out.splitlines()[-2:]
+        seconds = float(seconds)
+        best = seconds if best is None else min(best, seconds)
+        modules = frozenset(names.split(","))
+    return best, modules
+
+
+def _read_corpus(globs):
+    for entry in walk_files(".", globs):
+        with open(entry.path, "r") as f:
+            yield f.read()
+
+
+parser = argparse.ArgumentParser(
+    description="Benchmark tools that lettersmith can plug in"
+)
+subparsers = parser.add_subparsers(dest="command", required=True)
+markdown_parser = subparsers.add_parser(
+    "markdown",
+    help="Compare speed and output of installed markdown backends"
+)
+markdown_parser.add_argument("globs",
+    nargs="+",
+    help="Glob patterns for markdown files to use as a corpus")
+markdown_parser.add_argument("-b", "--backend",
+    action="append", dest="backends",
+    help="Backend to benchmark (can be repeated). Defaults to all installed.")
+markdown_parser.add_argument("-r", "--reference",
+    default="commonmark",
+    help="Backend to compare output against")
+markdown_parser.add_argument("--rounds",
+    type=int, default=3,
+    help="Number of timed rounds per backend")
+markdown_parser.add_argument("--diff",
+    action="store_true",
+    help="Print a sample diff for each non-conformant backend")
+imports_parser = subparsers.add_parser(
+    "imports",
+    help="Time importing lettersmith in a fresh interpreter"
+)
+imports_parser.add_argument("module",
+    nargs="?", default="lettersmith",
+    help="Module to import")
+imports_parser.add_argument("--rounds",
+    type=int, default=5,
+    help="Number of timed imports")
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    if args.command == "markdown":
+        results = markdown_backends(
+            _read_corpus(args.globs),
+            backends=args.backends,
+            reference=args.reference,
+            rounds=args.rounds
+        )
+        print(format_backend_results(results))
+        if args.diff:
+            for result in results:
+                if result.sample_diff:
+                    print("\n" + result.sample_diff)
+    elif args.command == "imports":
+        seconds, modules = import_time(args.module, rounds=args.rounds)
+        print("import {}: {:.1f}ms, {} modules loaded".format(
+            args.module, seconds * 1000, len(modules)
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,25 +3,31 @@ Tools for blogging
 """
 from lettersmith.func import compose
 from lettersmith import wikidoc
+from lettersmith import markdownast
 from lettersmith import absolutize
 from lettersmith import permalink
 from lettersmith import docs as Docs
 
 
-def markdown_doc(base_url):
+def markdown_doc(base_url, backend=None):
     """
     Handle typical transformations for a generic markdown doc.
 
-    - Markdown
+    - Markdown, parsed once (see `markdownast`)
     - Wikilinks
     - Transclusions
+    - Table of contents and heading ids
     - Absolutizes post links
     - Changes file extension to .html
     - Sets template in prep for Jinja rendering later
+
+    Markdown is rendered with `backend`, or the default `markdowntools`
+    backend. Backends other than "commonmark" don't have a parsed tree,
+    so they don't get a table of contents or heading ids.
     """
     return compose(
         absolutize.absolutize(base_url),
-        wikidoc.content_markdown(base_url),
+        markdownast.content_markdown(base_url, backend=backend),
         Docs.autotemplate,
         Docs.uplift_frontmatter
     )
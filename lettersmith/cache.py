@@ -0,0 +1,106 @@
+"""
+Tools for caching build artifacts on disk.
+"""
+import hashlib
+import os
+import pickle
+from collections.abc import Mapping, Set, Sequence
+from datetime import date
+from pathlib import Path
+
+
+def digest(blob):
+    """
+    Get a hex digest for some bytes.
+    """
+    return hashlib.sha1(blob).hexdigest()
+
+
+def key_path(cache_dir, *parts):
+    """
+    Get a stable file path in `cache_dir` for a cache key made of
+    string `parts`.
+    """
+    key = digest("\0".join(str(part) for part in parts).encode())
+    return Path(cache_dir, key[:2], key[2:])
+
+
+def write_atomic(pathlike, blob):
+    """
+    Write bytes to a file atomically, by writing to a temporary file in
+    the same directory, then renaming it over the destination.
+    Creates parent directories if necessary.
+    """
+    file_path = Path(pathlike)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = file_path.with_name(
+        "{}.{}.tmp".format(file_path.name, os.getpid())
+    )
+    with open(tmp_path, "wb") as f:
+        f.write(blob)
+    os.replace(tmp_path, file_path)
+
+
+def read_pickle(pathlike, default=None):
+    """
+    Read a pickled value from a file. Returns `default` if the file
+    doesn't exist or can't be unpickled.
+    """
+    try:
+        with open(pathlike, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return default
+
+
+def write_pickle(pathlike, value):
+    """
+    Pickle a value to a file, atomically.
+    """
+    write_atomic(pathlike, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class Unfingerprintable(Exception):
+    pass
+
+
+def _canonical(value):
+    """
+    Turn a value into a canonical, stable string, that is the same
+    across processes (unlike `hash`, which is salted for strings).
+    """
+    if value is None or isinstance(value, (str, bytes, int, float, bool)):
+        return repr(value)
+    elif isinstance(value, date):
+        return "date:" + value.isoformat()
+    elif isinstance(value, Mapping):
+        items = sorted(
+            (_canonical(k), _canonical(v)) for k, v in value.items()
+        )
+        return "{" + ",".join(k + ":" + v for k, v in items) + "}"
+    elif isinstance(value, (Set, set, frozenset)):
+        return "set(" + ",".join(sorted(_canonical(v) for v in value)) + ")"
+    elif isinstance(value, (Sequence, tuple, list)):
+        return (
+            type(value).__name__
+            + "(" + ",".join(_canonical(v) for v in value) + ")"
+        )
+    else:
+        raise Unfingerprintable(
+            "Can't fingerprint value of type {}".format(type(value))
+        )
+
+
+def fingerprint(value):
+    """
+    Get a stable hex digest for a value made of plain data: strings,
+    numbers, dates, and mappings, sets and sequences of plain data
+    (including namedtuples like `Doc` and `Stub`).
+
+    Returns None for values that can't be fingerprinted without side
+    effects (e.g. iterators). Treat None as "always changed".
+    """
+    try:
+        return digest(_canonical(value).encode())
+    except Unfingerprintable:
+        return None
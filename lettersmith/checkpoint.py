@@ -0,0 +1,167 @@
+"""
+Tools for saving a stream of docs to disk partway through a pipeline,
+and resuming from it on the next build.
+
+A checkpoint file is a header (magic bytes and an input fingerprint),
+followed by length-prefixed pickle records, one per doc. Checkpoints are
+read back through `mmap`, so loading one doesn't copy the whole file
+into memory.
+
+Example:
+
+    posts = pipe(
+        docs.find("post/*.md"),
+        blog.markdown_post(base_url),
+        checkpoint.checkpoint("posts", ("post/*.md",), key=base_url),
+        jinjatools.jinja("template", base_url, context)
+    )
+
+If nothing matching `post/*.md` changed since the last build, the docs
+are loaded from the checkpoint, and the stages before it never run.
+This works because stages are lazy. Upstream docs are only read if the
+checkpoint needs to be rebuilt. Don't put `tuple` (or anything else that
+reads the docs right away) before a checkpoint.
+"""
+import mmap
+import os
+import pickle
+import struct
+from pathlib import Path
+from lettersmith.path import walk_files
+from lettersmith import cache
+from lettersmith import runtime
+
+
+MAGIC = b"LSCKPT1\n"
+_LENGTH = struct.Struct("<I")
+_DIGEST_SIZE = 40
+_HEADER_SIZE = len(MAGIC) + _DIGEST_SIZE
+
+
+class CheckpointError(Exception):
+    pass
+
+
+def input_fingerprint(globs, exclude=(), key=None):
+    """
+    Get a fingerprint for the input files matching `globs`, from their
+    paths and file times, plus `key`, which can be any plain data the
+    pipeline depends on (e.g. a base URL). Files are not read.
+    """
+    parts = [
+        "{}\0{}\0{}".format(
+            entry.path,
+            entry.created.timestamp(),
+            entry.modified.timestamp()
+        )
+        for entry in walk_files(".", globs, exclude=exclude)
+    ]
+    key_fingerprint = cache.fingerprint(key)
+    if key_fingerprint is None:
+        raise CheckpointError(
+            "Can't fingerprint checkpoint key {}".format(repr(key))
+        )
+    parts.append(key_fingerprint)
+    parts.append(str(runtime.options().only))
+    return cache.digest("\n".join(parts).encode())
+
+
+def read_fingerprint(pathlike):
+    """
+    Read the input fingerprint from a checkpoint file.
+    Returns None if the file doesn't exist or isn't a checkpoint.
+    """
+    try:
+        with open(pathlike, "rb") as f:
+            header = f.read(_HEADER_SIZE)
+    except OSError:
+        return None
+    if len(header) != _HEADER_SIZE or not header.startswith(MAGIC):
+        return None
+    return header[len(MAGIC):].decode("ascii")
+
+
+def dump(docs, pathlike, fingerprint):
+    """
+    Write docs to a checkpoint file, as they pass through.
+
+    Returns a generator that yields each doc after writing it. The
+    checkpoint only replaces any existing file once every doc has been
+    read, so a partly-read stream never leaves a partial checkpoint.
+    """
+    file_path = Path(pathlike)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = file_path.with_name(
+        "{}.{}.tmp".format(file_path.name, os.getpid())
+    )
+    complete = False
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(fingerprint.encode("ascii"))
+            for doc in docs:
+                try:
+                    blob = pickle.dumps(doc, protocol=pickle.HIGHEST_PROTOCOL)
+                except Exception as e:
+                    msg = "Can't checkpoint {}".format(
+                        getattr(doc, "id_path", repr(doc))
+                    )
+                    raise CheckpointError(msg) from e
+                f.write(_LENGTH.pack(len(blob)))
+                f.write(blob)
+                yield doc
+        os.replace(tmp_path, file_path)
+        complete = True
+    finally:
+        if not complete:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+
+
+def load(pathlike):
+    """
+    Read docs from a checkpoint file.
+    Returns a generator of docs.
+    """
+    with open(pathlike, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if buf[:len(MAGIC)] != MAGIC:
+                raise CheckpointError(
+                    "Not a checkpoint file: {}".format(pathlike)
+                )
+            view = memoryview(buf)
+            try:
+                pos = _HEADER_SIZE
+                end = len(buf)
+                while pos < end:
+                    (size,) = _LENGTH.unpack_from(view, pos)
+                    pos = pos + _LENGTH.size
+                    yield pickle.loads(view[pos:pos + size])
+                    pos = pos + size
+            finally:
+                view.release()
+
+
+def checkpoint(name, globs, exclude=(), key=None, cache_dir=None):
+    """
+    Create a stage that saves docs to a checkpoint named `name`, or
+    resumes from it, if the input files matching `globs` (and `key`)
+    haven't changed since it was saved.
+
+    Checkpoints are saved in `cache_dir`, or the build's cache
+    directory (see `lettersmith.runtime`).
+    """
+    cache_dir = (
+        cache_dir if cache_dir is not None
+        else runtime.options().cache_dir
+    )
+    file_path = Path(cache_dir, "checkpoint", name)
+
+    def stage(docs):
+        fingerprint = input_fingerprint(globs, exclude=exclude, key=key)
+        if read_fingerprint(file_path) == fingerprint:
+            return load(file_path)
+        return dump(docs, file_path, fingerprint)
+    return stage
@@ -0,0 +1,152 @@
+"""
+Command line tool for building Lettersmith sites.
+
+    lettersmith build build.py --jobs 4 --incremental
+    lettersmith serve build.py --port 8000
+
+Runs a site's build script with a standard set of build options. Library
+stages read the options from `lettersmith.runtime`, so build scripts
+don't need to handle them. `serve` runs the build script, but serves
+the site from memory instead of writing it (see `lettersmith.serve`).
+"""
+from pathlib import Path
+import argparse
+import cProfile
+import json
+import pstats
+import runpy
+import sys
+import time
+from lettersmith import runtime
+
+
+parser = argparse.ArgumentParser(
+    prog="lettersmith",
+    description="""Tools for Lettersmith sites""")
+subparsers = parser.add_subparsers(dest="command", required=True)
+
+options_parser = argparse.ArgumentParser(add_help=False)
+options_parser.add_argument("script",
+    type=Path, nargs="?", default=Path("build.py"),
+    help="Path to the build script (default: build.py)")
+options_parser.add_argument("-j", "--jobs",
+    type=int, default=None,
+    help="Number of workers for stages that run in parallel")
+options_parser.add_argument("--cache-dir",
+    type=Path, default=Path(runtime.DEFAULT_CACHE_DIR),
+    help="Directory for build caches (default: {})".format(
+        runtime.DEFAULT_CACHE_DIR))
+options_parser.add_argument("--incremental",
+    action="store_true",
+    help="Cache build steps in the cache directory, and skip work "
+    "that hasn't changed since the last build")
+options_parser.add_argument("--profile",
+    type=Path, default=None, metavar="OUT.json",
+    help="Profile the build, and write the results to a JSON file")
+options_parser.add_argument("--only",
+    type=str, default=None, metavar="GLOB",
+    help="Only load docs and files matching this glob pattern")
+
+build_parser = subparsers.add_parser(
+    "build",
+    parents=(options_parser,),
+    help="Run a site's build script")
+
+serve_parser = subparsers.add_parser(
+    "serve",
+    parents=(options_parser,),
+    help="Run a site's build script, and serve the site from memory")
+serve_parser.add_argument("--host",
+    type=str, default="localhost",
+    help="Host to serve on (default: localhost)")
+serve_parser.add_argument("-p", "--port",
+    type=int, default=8000,
+    help="Port to serve on (default: 8000)")
+
+
+def _function_name(key):
+    file_name, line, name = key
+    return "{}:{}({})".format(file_name, line, name)
+
+
+def profile_report(profiler, seconds):
+    """
+    Summarize a `cProfile.Profile` as a JSON-friendly dict, with
+    functions sorted by cumulative time.
+    """
+    stats = pstats.Stats(profiler).stats
+    functions = sorted(
+        (
+            {
+                "function": _function_name(key),
+                "calls": calls,
+                "primitive_calls": primitive_calls,
+                "tottime": tottime,
+                "cumtime": cumtime
+            }
+            for key, (primitive_calls, calls, tottime, cumtime, callers)
+            in stats.items()
+        ),
+        key=lambda row: row["cumtime"],
+        reverse=True
+    )
+    return {"seconds": seconds, "functions": functions}
+
+
+def _run_script(script):
+    """
+    Run a build script as `__main__`, like `python build.py` would.
+    """
+    script_dir = str(Path(script).parent.resolve())
+    sys.path.insert(0, script_dir)
+    try:
+        runpy.run_path(str(script), run_name="__main__")
+    finally:
+        sys.path.remove(script_dir)
+
+
+def build(args):
+    serve = (
+        "{}:{}".format(args.host, args.port)
+        if args.command == "serve"
+        else None
+    )
+    options = runtime.create(
+        jobs=args.jobs,
+        cache_dir=args.cache_dir,
+        incremental=args.incremental,
+        profile=args.profile,
+        only=args.only,
+        serve=serve
+    )
+    if not args.script.is_file():
+        print(f"Error: build script \"{args.script}\" does not exist.")
+        return 1
+    with runtime.using(options):
+        start = time.perf_counter()
+        if options.profile is None:
+            _run_script(args.script)
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                _run_script(args.script)
+            finally:
+                profiler.disable()
+                report = profile_report(
+                    profiler,
+                    time.perf_counter() - start
+                )
+                with open(options.profile, "w") as f:
+                    json.dump(report, f, indent=2)
+    return 0
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    if args.command in ("build", "serve"):
+        sys.exit(build(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,44 @@
+import json
+import os
+from collections.abc import Mapping
+from contextlib import contextmanager
 from pathlib import Path
 import yaml
-from lettersmith.path import glob_all
+from lettersmith.path import walk_files
+from lettersmith import cache
+from lettersmith import runtime
 
 
 YAML_EXT = (".yaml", ".yml")
-JSON_EXT = (".json")
+JSON_EXT = (".json",)
+DATA_GLOBS = ("*.yaml", "*.yml", "*.json")
+
+
+# Use the libyaml-backed loader when PyYAML was built with it.
+# It is many times faster than the pure-Python loader.
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _parse_data(blob, ext):
+    """
+    Parse structured data from bytes, based on file extension.
+
+    Supported types:
+
+    * .json
+    * .yaml
+    """
+    if ext in JSON_EXT:
+        return json.loads(blob)
+    elif ext in YAML_EXT:
+        return yaml.load(blob, Loader=_YamlLoader)
+    else:
+        raise ValueError("Unsupported file type: {}".format(ext))
 
 
 def _smart_read_data_file(file_path):
     """
-    Given an open file object, this function will do its best to
+    Given a file path, this function will do its best to
     interpret structured data.
 
     Supported types:
@@ -18,13 +47,8 @@ def _smart_read_data_file(file_path):
     * .yaml
     """
     ext = Path(file_path).suffix
-    with open(file_path, "r") as f:
-        if ext in JSON_EXT:
-            return json.load(f)
-        elif ext in YAML_EXT:
-            return yaml.load(f)
-        else:
-            raise ValueError("Unsupported file type: {}".format(ext))
+    with open(file_path, "rb") as f:
+        return _parse_data(f.read(), ext)
 
 
 def find(dir_path):
@@ -37,10 +61,148 @@ def find(dir_path):
     Returns a dictionary of structured Python data.
     """
     data = {}
-    for file_path in glob_all(dir_path, ("*.yaml", "*.yml", "*.json")):
+    for entry in walk_files(dir_path, DATA_GLOBS):
         try:
-            stem = Path(file_path).stem
-            data[stem] = _smart_read_data_file(file_path)
+            stem = Path(entry.path).stem
+            data[stem] = _smart_read_data_file(entry.path)
         except ValueError:
             pass
-    return data
\ No newline at end of file
+    return data
+
+
+def _read_cached(file_path, cache_dir):
+    """
+    Read a data file through the on-disk cache.
+
+    The cache record is reused without reading the file if its mtime and
+    size are unchanged. Otherwise the file is read and hashed, and only
+    parsed if the hash changed too.
+    """
+    stat = os.stat(file_path)
+    record_path = cache.key_path(cache_dir, "data", Path(file_path).resolve())
+    record = cache.read_pickle(record_path)
+    if (
+        record is not None
+        and record["mtime_ns"] == stat.st_mtime_ns
+        and record["size"] == stat.st_size
+    ):
+        return record["value"]
+    with open(file_path, "rb") as f:
+        blob = f.read()
+    blob_digest = cache.digest(blob)
+    if record is not None and record["digest"] == blob_digest:
+        value = record["value"]
+    else:
+        value = _parse_data(blob, Path(file_path).suffix)
+    cache.write_pickle(record_path, {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "digest": blob_digest,
+        "value": value
+    })
+    return value
+
+
+class LazyData(Mapping):
+    """
+    A read-only mapping of data file stem to parsed data.
+
+    Files are found up front, but each one is only parsed the first time
+    its key is read. If `cache_dir` is given, parsed values are also
+    cached on disk between builds, keyed by file mtime and content hash.
+
+    Use `recording` to find out which keys were read during a block of
+    code (e.g. rendering a template), and `report` to get every key read
+    under each label.
+    """
+    def __init__(self, paths, cache_dir=None):
+        self._paths = dict(paths)
+        self._cache_dir = cache_dir
+        self._values = {}
+        self._labels = []
+        self._touched = {}
+
+    def __getitem__(self, key):
+        file_path = self._paths[key]
+        if self._labels:
+            label, keys = self._labels[-1]
+            keys.add(key)
+            self._touched[label].add(key)
+        try:
+            return self._values[key]
+        except KeyError:
+            if self._cache_dir is not None:
+                value = _read_cached(file_path, self._cache_dir)
+            else:
+                value = _smart_read_data_file(file_path)
+            self._values[key] = value
+            return value
+
+    def __contains__(self, key):
+        # Checking for a key doesn't parse its file, or record it as read.
+        return key in self._paths
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def path(self, key):
+        """
+        Get the file path for a data key.
+        """
+        return self._paths[key]
+
+    @contextmanager
+    def recording(self, label):
+        """
+        Record the keys read inside this `with` block under `label`.
+        Yields a set of the keys read inside this block.
+        """
+        keys = set()
+        self._touched.setdefault(label, set())
+        self._labels.append((label, keys))
+        try:
+            yield keys
+        finally:
+            self._labels.pop()
+
+    def signature(self, key):
+        """
+        Get a cheap signature for the file behind a data key, from its
+        mtime and size. Returns None if the key or file is missing.
+        """
+        try:
+            stat = os.stat(self._paths[key])
+        except (KeyError, OSError):
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def report(self):
+        """
+        Get the data keys read under each recording label.
+        Returns a dict of `label: (key, ...)`, with keys sorted.
+        """
+        return {
+            label: tuple(sorted(keys))
+            for label, keys in self._touched.items()
+        }
+
+
+def lazy(dir_path, cache_dir=None):
+    """
+    Create a lazy data mapping for the template. Like `find`, but files
+    are only parsed when a template (or anything else) reads their key.
+
+    If `cache_dir` is given, parsed data is cached on disk between builds.
+    Otherwise, the build's cache directory is used for incremental builds
+    (see `lettersmith.runtime`).
+
+    Returns a `LazyData` mapping.
+    """
+    cache_dir = cache_dir if cache_dir is not None else runtime.cache_dir()
+    paths = {}
+    for entry in walk_files(dir_path, DATA_GLOBS):
+        paths[Path(entry.path).stem] = entry.path
+    return LazyData(paths, cache_dir=cache_dir)
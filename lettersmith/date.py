@@ -1,8 +1,20 @@
 from datetime import date, datetime
-from os import path
+from os import stat
 from functools import singledispatch
 
 
+def stat_file_times(stat_result):
+    """
+    Given an `os.stat_result` (e.g. from `os.stat` or `DirEntry.stat`),
+    return a tuple of `(created_time, modified_time)`.
+    Both return values are datetime objects.
+    """
+    return (
+        datetime.fromtimestamp(stat_result.st_ctime),
+        datetime.fromtimestamp(stat_result.st_mtime)
+    )
+
+
 def read_file_times(pathlike):
     """
     Given a pathlike, return a tuple of `(created_time, modified_time)`.
@@ -10,11 +22,8 @@ def read_file_times(pathlike):
 
     If no value can be found, will return unix epoch for both.
     """
-    path_str = str(pathlike)
     try:
-        modified_time = datetime.fromtimestamp(path.getmtime(path_str))
-        created_time = datetime.fromtimestamp(path.getctime(path_str))
-        return created_time, modified_time
+        return stat_file_times(stat(str(pathlike)))
     except OSError:
         return EPOCH, EPOCH
 
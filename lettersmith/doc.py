@@ -16,9 +16,6 @@ import json
 from collections import namedtuple
 from functools import wraps
 
-import frontmatter
-import yaml
-
 from lettersmith.util import mix
 from lettersmith.date import read_file_times, EPOCH, to_datetime
 from lettersmith import path as pathtools
@@ -61,15 +58,7 @@ def create(id_path, output_path,
     )
 
 
-def load(pathlike):
-    """
-    Loads a doc namedtuple from a file path.
-    `content` field will contain contents of file.
-    Typically, you decorate the doc later with meta and other fields.
-
-    Returns a doc.
-    """
-    file_created, file_modified = read_file_times(pathlike)
+def _load(pathlike, created, modified):
     with open(pathlike, 'r') as f:
         content = f.read()
     title = pathtools.to_title(pathlike)
@@ -77,14 +66,37 @@ def load(pathlike):
         id_path=pathlike,
         output_path=pathlike,
         input_path=pathlike,
-        created=file_created,
-        modified=file_modified,
+        created=created,
+        modified=modified,
         title=title,
         meta={},
         content=content
     )
 
 
+def load(pathlike):
+    """
+    Loads a doc namedtuple from a file path.
+    `content` field will contain contents of file.
+    Typically, you decorate the doc later with meta and other fields.
+
+    Returns a doc.
+    """
+    file_created, file_modified = read_file_times(pathlike)
+    return _load(pathlike, file_created, file_modified)
+
+
+def load_entry(entry):
+    """
+    Loads a doc namedtuple from a `path.FileEntry`.
+    Same as `load`, but uses the file times already read by
+    `path.walk_files`, instead of reading them again.
+
+    Returns a doc.
+    """
+    return _load(entry.path, entry.created, entry.modified)
+
+
 def writeable(doc):
     """
     Return a writeable tuple for doc.
@@ -273,6 +285,9 @@ def parse_frontmatter(doc):
     If there is no frontmatter, will set an empty object on meta field,
     and leave content as-is.
     """
+    # Imported here, since frontmatter pulls in yaml, which is slow to
+    # import, and most scripts that import doc never parse frontmatter.
+    import frontmatter
     meta, content = frontmatter.parse(doc.content)
     return doc._replace(
         meta=meta,
@@ -5,22 +5,33 @@ from fnmatch import fnmatch
 from lettersmith import path as pathtools
 from lettersmith import doc as Doc
 from lettersmith import query
+from lettersmith import runtime
 from lettersmith.func import composable, compose
 from lettersmith.lens import get
 
 
 load = query.maps(Doc.load)
+load_entries = query.maps(Doc.load_entry)
 
 
-def find(glob):
+def find(*globs, exclude=()):
     """
-    Load all docs under input path that match a glob pattern.
+    Load all docs under input path that match any of the glob patterns,
+    skipping any that match a pattern in `exclude`.
+
+    The input directory is scanned once, no matter how many patterns
+    you pass. If the build's `only` option is set (see
+    `lettersmith.runtime`), only matching docs are loaded.
 
     Example:
 
         docs.find("posts/*.md")
+        docs.find("posts/**/*.md", "notes/*.md", exclude=("**/_*",))
     """
-    return load(pathtools.glob_files(".", glob))
+    entries = pathtools.walk_files(".", globs, exclude=exclude)
+    return load_entries(
+        entry for entry in entries if runtime.is_selected(entry.path)
+    )
 
 
 @composable
@@ -0,0 +1,504 @@
+"""
+A doc store, backed by SQLite.
+
+Docs and stubs can be written to the store, and queried back with
+indexed SQL queries instead of scanning every doc in memory. The store
+lives in a file, so it persists between builds.
+
+Example:
+
+    with docstore.open_store() as store:
+        store.put(docs.find("post/*.md"), taxonomies=("tags",))
+        tagged = store.stubs(
+            taxonomy="tags",
+            term="python",
+            created_after=datetime(2019, 1, 1),
+            created_before=datetime(2020, 1, 1)
+        )
+        archive_doc = archive.archive(tagged, "archive/index.html")
+
+Wikilinks are read from doc content when docs are put, so put docs
+before rendering them.
+"""
+import pickle
+import sqlite3
+from datetime import date, datetime
+from pathlib import Path
+from lettersmith import doc as Doc
+from lettersmith import stub as Stub
+from lettersmith import wikidoc
+from lettersmith import runtime
+from lettersmith.path import to_slug, match_glob
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id_path TEXT PRIMARY KEY,
+    output_path TEXT NOT NULL,
+    input_path TEXT,
+    created REAL NOT NULL,
+    modified REAL NOT NULL,
+    title TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    template TEXT NOT NULL,
+    content TEXT,
+    meta BLOB
+);
+CREATE INDEX IF NOT EXISTS docs_output_path ON docs (output_path);
+CREATE INDEX IF NOT EXISTS docs_created ON docs (created);
+CREATE INDEX IF NOT EXISTS docs_modified ON docs (modified);
+CREATE INDEX IF NOT EXISTS docs_template ON docs (template);
+CREATE INDEX IF NOT EXISTS docs_slug ON docs (slug);
+CREATE TABLE IF NOT EXISTS terms (
+    id_path TEXT NOT NULL REFERENCES docs (id_path) ON DELETE CASCADE,
+    taxonomy TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    term NOT NULL,
+    PRIMARY KEY (taxonomy, kind, term, id_path)
+);
+CREATE INDEX IF NOT EXISTS terms_id_path ON terms (id_path);
+CREATE TABLE IF NOT EXISTS links (
+    tail TEXT NOT NULL REFERENCES docs (id_path) ON DELETE CASCADE,
+    slug TEXT NOT NULL,
+    PRIMARY KEY (tail, slug)
+);
+CREATE INDEX IF NOT EXISTS links_slug ON links (slug);
+"""
+
+# Bump when the schema changes. Stores with an older version are
+# cleared and rebuilt, since they only hold docs that can be put again.
+_SCHEMA_VERSION = 2
+
+_DROP_SCHEMA = """
+DROP TABLE IF EXISTS terms;
+DROP TABLE IF EXISTS links;
+DROP TABLE IF EXISTS docs;
+"""
+
+_STUB_COLUMNS = (
+    "d.id_path, d.output_path, d.created, d.modified, d.title, d.summary"
+)
+_DOC_COLUMNS = (
+    "d.id_path, d.output_path, d.input_path, d.created, d.modified, "
+    "d.title, d.content, d.meta, d.template"
+)
+
+_ORDER_BY = {
+    "created": "d.created",
+    "modified": "d.modified",
+    "title": "d.title",
+    "id_path": "d.id_path"
+}
+
+
+def _timestamp(dt):
+    return dt.timestamp()
+
+
+def _term_to_row(term):
+    """
+    Encode a taxonomy term as a `(kind, value)` pair, so it keeps its
+    type in the store. The `term` column has no type affinity, so
+    strings, ints and floats are stored as they are. Booleans, dates
+    and datetimes are tagged with their kind.
+    """
+    if isinstance(term, bool):
+        return "bool", int(term)
+    elif isinstance(term, (str, int, float)):
+        return "", term
+    elif isinstance(term, datetime):
+        return "datetime", term.isoformat()
+    elif isinstance(term, date):
+        return "date", term.isoformat()
+    else:
+        msg = "Can't store taxonomy term {term!r} of type {type}."
+        raise TypeError(msg.format(term=term, type=type(term).__name__))
+
+
+def _term_from_row(kind, value):
+    if kind == "bool":
+        return bool(value)
+    elif kind == "datetime":
+        return datetime.fromisoformat(value)
+    elif kind == "date":
+        return date.fromisoformat(value)
+    return value
+
+
+def _stub_from_row(row):
+    id_path, output_path, created, modified, title, summary = row
+    return Stub.Stub(
+        id_path,
+        output_path,
+        datetime.fromtimestamp(created),
+        datetime.fromtimestamp(modified),
+        title,
+        summary
+    )
+
+
+def _doc_from_row(row):
+    (
+        id_path, output_path, input_path, created, modified,
+        title, content, meta, template
+    ) = row
+    return Doc.Doc(
+        id_path=id_path,
+        output_path=output_path,
+        input_path=input_path,
+        created=datetime.fromtimestamp(created),
+        modified=datetime.fromtimestamp(modified),
+        title=title,
+        content=content if content is not None else "",
+        meta=pickle.loads(meta) if meta is not None else {},
+        template=template
+    )
+
+
+class DocStore:
+    """
+    A store of docs and stubs, in an SQLite database at `path`.
+    Use ":memory:" for a store that only lasts as long as the process.
+
+    Docs are indexed by id_path, output_path, created, modified and
+    template. Taxonomy terms and wikilinks are kept in their own indexed
+    tables.
+    """
+    def __init__(self, path=":memory:"):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path))
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.create_function("match_glob", 2, match_glob)
+        (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+        if version != _SCHEMA_VERSION:
+            self._conn.executescript(_DROP_SCHEMA)
+            self._conn.execute(
+                "PRAGMA user_version = {}".format(_SCHEMA_VERSION)
+            )
+        self._conn.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()
+        return count
+
+    def __contains__(self, id_path):
+        row = self._conn.execute(
+            "SELECT 1 FROM docs WHERE id_path = ?",
+            (id_path,)
+        ).fetchone()
+        return row is not None
+
+    def put(
+        self,
+        docs,
+        taxonomies=("tags",),
+        find_wikilinks=wikidoc.find_wikilinks
+    ):
+        """
+        Write docs or stubs to the store, replacing any with the same
+        id_path. Terms in each of `taxonomies` are read from doc meta,
+        and wikilinks are read with `find_wikilinks(doc)`.
+
+        Stubs only update the stub fields of a doc, and keep its content,
+        meta, terms and links.
+
+        Returns the number of docs written.
+        """
+        count = 0
+        with self._conn:
+            for doc in docs:
+                count = count + 1
+                if isinstance(doc, Stub.Stub):
+                    self._put_stub(doc)
+                else:
+                    self._put_doc(doc, taxonomies, find_wikilinks)
+        return count
+
+    def _put_stub(self, stub):
+        self._conn.execute(
+            """
+            INSERT INTO docs (
+                id_path, output_path, created, modified, title, slug,
+                summary, template
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, '')
+            ON CONFLICT (id_path) DO UPDATE SET
+                output_path = excluded.output_path,
+                created = excluded.created,
+                modified = excluded.modified,
+                title = excluded.title,
+                slug = excluded.slug,
+                summary = excluded.summary
+            """,
+            (
+                stub.id_path,
+                stub.output_path,
+                _timestamp(stub.created),
+                _timestamp(stub.modified),
+                stub.title,
+                to_slug(stub.title),
+                stub.summary
+            )
+        )
+
+    def _put_doc(self, doc, taxonomies, find_wikilinks):
+        try:
+            meta = pickle.dumps(doc.meta, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            msg = "Can't store meta for {}".format(doc.id_path)
+            raise Doc.DocException(msg) from e
+        self._conn.execute(
+            "DELETE FROM docs WHERE id_path = ?",
+            (doc.id_path,)
+        )
+        self._conn.execute(
+            """
+            INSERT INTO docs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                doc.id_path,
+                doc.output_path,
+                doc.input_path,
+                _timestamp(doc.created),
+                _timestamp(doc.modified),
+                doc.title,
+                to_slug(doc.title),
+                Stub.from_doc(doc).summary,
+                doc.template,
+                doc.content,
+                meta
+            )
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO terms VALUES (?, ?, ?, ?)",
+            (
+                (doc.id_path, tax, *_term_to_row(term))
+                for tax in taxonomies
+                for term in doc.meta.get(tax, ())
+            )
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO links VALUES (?, ?)",
+            (
+                (doc.id_path, slug)
+                for slug, title in find_wikilinks(doc)
+            )
+        )
+
+    def remove(self, id_paths):
+        """
+        Remove docs by id_path.
+        """
+        with self._conn:
+            self._conn.executemany(
+                "DELETE FROM docs WHERE id_path = ?",
+                ((id_path,) for id_path in id_paths)
+            )
+
+    def prune(self, id_paths, glob=None):
+        """
+        Remove every doc that isn't in `id_paths` (and matches `glob`,
+        if given). Use this to drop docs whose files were deleted.
+        """
+        keep = frozenset(id_paths)
+        stale = tuple(
+            id_path for (id_path,) in self._conn.execute(
+                "SELECT id_path FROM docs"
+            )
+            if id_path not in keep
+            and (glob is None or match_glob(id_path, glob))
+        )
+        self.remove(stale)
+        return len(stale)
+
+    def get(self, id_path, default=None):
+        """
+        Get a doc by id_path, or `default` if it isn't in the store.
+        """
+        row = self._conn.execute(
+            "SELECT {} FROM docs d WHERE d.id_path = ?".format(_DOC_COLUMNS),
+            (id_path,)
+        ).fetchone()
+        return _doc_from_row(row) if row is not None else default
+
+    def _select(
+        self,
+        columns,
+        glob=None,
+        template=None,
+        taxonomy=None,
+        term=None,
+        created_after=None,
+        created_before=None,
+        order_by="created",
+        reverse=True,
+        limit=None
+    ):
+        joins = []
+        where = []
+        params = []
+        if taxonomy is not None:
+            joins.append("JOIN terms t ON t.id_path = d.id_path")
+            where.append("t.taxonomy = ?")
+            params.append(taxonomy)
+            if term is not None:
+                where.append("t.kind = ? AND t.term = ?")
+                params.extend(_term_to_row(term))
+        if template is not None:
+            where.append("d.template = ?")
+            params.append(template)
+        if created_after is not None:
+            where.append("d.created >= ?")
+            params.append(_timestamp(created_after))
+        if created_before is not None:
+            where.append("d.created < ?")
+            params.append(_timestamp(created_before))
+        if glob is not None:
+            where.append("match_glob(d.id_path, ?)")
+            params.append(glob)
+        sql = "SELECT DISTINCT {columns} FROM docs d {joins}".format(
+            columns=columns,
+            joins=" ".join(joins)
+        )
+        if where:
+            sql = sql + " WHERE " + " AND ".join(where)
+        sql = sql + " ORDER BY {} {}".format(
+            _ORDER_BY[order_by],
+            "DESC" if reverse else "ASC"
+        )
+        if limit is not None:
+            sql = sql + " LIMIT ?"
+            params.append(limit)
+        return self._conn.execute(sql, params)
+
+    def stubs(self, **kwargs):
+        """
+        Query stubs. Returns a tuple of `Stub`s.
+
+        Keyword arguments (all optional):
+
+        - glob: only id_paths matching a glob pattern
+        - template: only docs with this template
+        - taxonomy, term: only docs with `term` in `taxonomy`
+        - created_after, created_before: datetime range for created
+        - order_by: "created" (default), "modified", "title" or "id_path"
+        - reverse: sort in descending order (default True)
+        - limit: return at most this many stubs
+        """
+        return tuple(
+            _stub_from_row(row)
+            for row in self._select(_STUB_COLUMNS, **kwargs)
+        )
+
+    def docs(self, **kwargs):
+        """
+        Query full docs. Takes the same arguments as `stubs`.
+        Returns a generator of docs.
+        """
+        for row in self._select(_DOC_COLUMNS, **kwargs):
+            yield _doc_from_row(row)
+
+    def most_recent(self, n, glob=None):
+        """
+        Get the `n` most recently created docs, e.g. for a feed.
+        """
+        return self.docs(glob=glob, limit=n)
+
+    def terms(self, taxonomy):
+        """
+        Get the terms in a taxonomy, with the number of docs for each.
+        Returns a dict of `{term: count}`, sorted by kind of term, then
+        by term. Terms keep the type they were put with.
+        """
+        return {
+            _term_from_row(kind, term): count
+            for kind, term, count in self._conn.execute(
+                """
+                SELECT kind, term, COUNT(*) FROM terms
+                WHERE taxonomy = ?
+                GROUP BY kind, term ORDER BY kind, term
+                """,
+                (taxonomy,)
+            )
+        }
+
+    def index_taxonomy(self, taxonomy):
+        """
+        Index a taxonomy, like `taxonomy.index_taxonomy`.
+        Returns a dict of `{term: (stub, ...)}`, most recent first.
+        """
+        index = {}
+        for row in self._conn.execute(
+            """
+            SELECT t.kind, t.term, {columns} FROM terms t
+            JOIN docs d ON d.id_path = t.id_path
+            WHERE t.taxonomy = ?
+            ORDER BY t.kind, t.term, d.created DESC
+            """.format(columns=_STUB_COLUMNS),
+            (taxonomy,)
+        ):
+            term = _term_from_row(row[0], row[1])
+            index.setdefault(term, []).append(_stub_from_row(row[2:]))
+        return {term: tuple(stubs) for term, stubs in index.items()}
+
+    def links(self, id_path):
+        """
+        Get stubs for the docs that a doc links to.
+        """
+        return tuple(_stub_from_row(row) for row in self._conn.execute(
+            """
+            SELECT DISTINCT {columns} FROM links l
+            JOIN docs d ON d.slug = l.slug
+            WHERE l.tail = ?
+            ORDER BY d.id_path
+            """.format(columns=_STUB_COLUMNS),
+            (id_path,)
+        ))
+
+    def backlinks(self, id_path):
+        """
+        Get stubs for the docs that link to a doc.
+        """
+        return tuple(_stub_from_row(row) for row in self._conn.execute(
+            """
+            SELECT DISTINCT {columns} FROM docs target
+            JOIN links l ON l.slug = target.slug
+            JOIN docs d ON d.id_path = l.tail
+            WHERE target.id_path = ?
+            ORDER BY d.id_path
+            """.format(columns=_STUB_COLUMNS),
+            (id_path,)
+        ))
+
+    def annotate_links(self, docs):
+        """
+        Annotate docs with links and backlinks from the store, like
+        `wikidoc.annotate_links`, but without reading every doc.
+        """
+        for doc in docs:
+            yield Doc.update_meta(doc, {
+                "links": self.links(doc.id_path),
+                "backlinks": self.backlinks(doc.id_path)
+            })
+
+
+def open_store(path=None):
+    """
+    Open a doc store at `path`. Defaults to a store in the build's cache
+    directory (see `lettersmith.runtime`), so it persists between builds.
+    """
+    if path is None:
+        path = Path(runtime.options().cache_dir, "docs.sqlite")
+    return DocStore(path)
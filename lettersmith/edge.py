@@ -1,6 +1,7 @@
 """
 Data structure for describing directed graph connections.
 """
+from array import array
 from collections import namedtuple
 
 
@@ -9,4 +10,72 @@ Edge.__doc__ = """
 A directed edge that points from one thing to another.
 If you imagine an arrow, tail is the base of the arrow, and head is
 the pointy arrow head.
-"""
\ No newline at end of file
+"""
+
+
+class EdgeArray:
+    """
+    Compact storage for edges between integer ids (e.g. ids from a
+    `stub.Registry`). Tails and heads are kept in two parallel arrays,
+    so each edge costs 16 bytes, rather than a tuple of two objects.
+
+    Iterating yields `Edge` namedtuples of ids.
+    """
+    __slots__ = ("tails", "heads")
+
+    def __init__(self, edges=()):
+        self.tails = array("q")
+        self.heads = array("q")
+        self.extend(edges)
+
+    def __len__(self):
+        return len(self.tails)
+
+    def __iter__(self):
+        return map(Edge, self.tails, self.heads)
+
+    def append(self, tail, head):
+        """
+        Add an edge from id `tail` to id `head`.
+        """
+        self.tails.append(tail)
+        self.heads.append(head)
+
+    def extend(self, edges):
+        """
+        Add an iterable of `(tail, head)` pairs.
+        """
+        for tail, head in edges:
+            self.append(tail, head)
+
+    def adjacency(self, size, reverse=False):
+        """
+        Group edges by tail (or by head, if `reverse` is true) into a
+        compressed sparse row structure. `size` is the number of ids,
+        so every id must be less than `size`.
+
+        Returns a 2-tuple of arrays, `(offsets, targets)`. The targets for
+        id `i` are `targets[offsets[i]:offsets[i + 1]]`, sorted and
+        deduplicated.
+        """
+        sources, targets = (
+            (self.heads, self.tails) if reverse
+            else (self.tails, self.heads)
+        )
+        counts = array("q", bytes(8 * (size + 1)))
+        for source in sources:
+            counts[source + 1] += 1
+        for i in range(size):
+            counts[i + 1] += counts[i]
+        cursor = array("q", counts)
+        grouped = array("q", bytes(8 * len(targets)))
+        for source, target in zip(sources, targets):
+            grouped[cursor[source]] = target
+            cursor[source] += 1
+        offsets = array("q", bytes(8 * (size + 1)))
+        out = array("q")
+        for i in range(size):
+            row = sorted(set(grouped[counts[i]:counts[i + 1]]))
+            out.extend(row)
+            offsets[i + 1] = len(out)
+        return offsets, out
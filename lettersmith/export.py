@@ -0,0 +1,385 @@
+"""
+Tools for exporting docs and stubs as JSON, for use as a content API.
+
+Exports are streamed. Each doc is encoded and written as it passes
+through, so the full list of docs is never held in memory, or encoded
+all at once.
+
+Two formats are supported:
+
+- `ndjson` writes one JSON object per line to a single file.
+- `sections` writes a JSON array file per section (the top-level
+  directory of each doc's `id_path`), split into shards of at most
+  `shard_size` items, plus a small `index.json` that lists them.
+
+Both are pass-through stages. They yield every doc they are given,
+unchanged, so they can sit in the middle of a pipeline.
+
+Example:
+
+    posts = pipe(
+        posts,
+        export.ndjson("api/posts.ndjson", exclude=("content",))
+    )
+
+Use `fields` to pick which fields to export, or `exclude` to drop bulky
+ones, like `content`. Either can name a meta key with a dotted path,
+like `"meta.tags"`. Stubs found in meta (like links and backlinks) are
+exported as their `id_path`, so they can be looked up in the export.
+Dates in meta are exported as ISO 8601 strings.
+"""
+import json
+import os
+import shutil
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence, Set
+from datetime import date
+from pathlib import Path
+from lettersmith import doc as Doc
+from lettersmith import stub as Stub
+from lettersmith.path import to_slug
+
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+# Fields that are always exported, so each item can be identified.
+_KEEP = ("@type", "id_path")
+
+_ROOT_SECTION = "root"
+
+
+class _Unexportable(Exception):
+    def __init__(self, keys, value):
+        super().__init__(keys, value)
+        self.keys = keys
+        self.value = value
+
+
+def _compact(value, keys=()):
+    """
+    Convert a value into JSON-friendly data. Stubs become their
+    `id_path`, dates and datetimes become ISO 8601 strings, and
+    sequences become lists. `keys` is the path of mapping keys to
+    `value`, for error messages.
+
+    Raises `_Unexportable` for values of any other type.
+    """
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    elif isinstance(value, Stub.Stub):
+        return value.id_path
+    elif isinstance(value, date):
+        return value.isoformat()
+    elif isinstance(value, Mapping):
+        return {
+            str(k): _compact(v, keys + (str(k),))
+            for k, v in value.items()
+        }
+    elif isinstance(value, Set):
+        return sorted(_compact(v, keys) for v in value)
+    elif isinstance(value, Sequence):
+        return [_compact(v, keys) for v in value]
+    else:
+        raise _Unexportable(keys, value)
+
+
+def _stub_to_json(stub):
+    return {
+        "@type": "stub",
+        "id_path": stub.id_path,
+        "output_path": stub.output_path,
+        "created": stub.created.timestamp(),
+        "modified": stub.modified.timestamp(),
+        "title": stub.title,
+        "summary": stub.summary
+    }
+
+
+def _project(data, fields):
+    projected = {k: data[k] for k in _KEEP if k in data}
+    for field in fields:
+        head, dot, tail = field.partition(".")
+        if head not in data:
+            continue
+        if not dot:
+            projected[head] = data[head]
+        elif isinstance(data[head], Mapping) and tail in data[head]:
+            projected.setdefault(head, {})[tail] = data[head][tail]
+    return projected
+
+
+def _exclude(data, exclude):
+    data = dict(data)
+    for field in exclude:
+        head, dot, tail = field.partition(".")
+        if not dot:
+            data.pop(head, None)
+        elif isinstance(data.get(head), Mapping) and tail in data[head]:
+            data[head] = {k: v for k, v in data[head].items() if k != tail}
+    return data
+
+
+def to_data(thing, fields=None, exclude=()):
+    """
+    Convert a doc or stub to JSON-friendly data.
+
+    If `fields` is given, only those fields are kept (plus `@type` and
+    `id_path`). Fields in `exclude` are dropped. Meta keys can be named
+    with a dotted path, like `"meta.summary"`.
+
+    Dates and datetimes in meta are exported as ISO 8601 strings.
+    Raises a `TypeError`, naming the doc and meta key, for values that
+    can't be exported.
+    """
+    if isinstance(thing, Doc.Doc):
+        data = Doc.to_json(thing)
+    elif isinstance(thing, Stub.Stub):
+        data = _stub_to_json(thing)
+    else:
+        msg = "Don't know how to export {type} as JSON."
+        raise ValueError(msg.format(type=type(thing)))
+    if fields is not None:
+        data = _project(data, fields)
+    if exclude:
+        data = _exclude(data, exclude)
+    try:
+        return _compact(data)
+    except _Unexportable as e:
+        msg = "Can't export {type} at {key} of {id_path} as JSON."
+        raise TypeError(msg.format(
+            type=type(e.value).__name__,
+            key=".".join(e.keys),
+            id_path=thing.id_path
+        )) from e
+
+
+def encode(thing, fields=None, exclude=()):
+    """
+    Encode a doc or stub as a compact JSON string.
+    See `to_data` for `fields` and `exclude`.
+    """
+    return _encoder.encode(to_data(thing, fields=fields, exclude=exclude))
+
+
+def ndjson_lines(things, fields=None, exclude=()):
+    """
+    Encode docs or stubs as newline-delimited JSON.
+    Returns a generator of lines, one per item.
+    """
+    for thing in things:
+        yield encode(thing, fields=fields, exclude=exclude) + "\n"
+
+
+def _tmp_path(file_path):
+    return file_path.with_name(
+        "{}.{}.tmp".format(file_path.name, os.getpid())
+    )
+
+
+def _unlink(pathlike):
+    try:
+        os.unlink(pathlike)
+    except FileNotFoundError:
+        pass
+
+
+def dump_ndjson(things, pathlike, fields=None, exclude=()):
+    """
+    Write docs or stubs to an NDJSON file, as they pass through.
+
+    Returns a generator that yields each item after writing it. The file
+    only replaces any existing file once every item has been read.
+    """
+    file_path = Path(pathlike)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = _tmp_path(file_path)
+    complete = False
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for thing in things:
+                f.write(encode(thing, fields=fields, exclude=exclude))
+                f.write("\n")
+                yield thing
+        os.replace(tmp_path, file_path)
+        complete = True
+    finally:
+        if not complete:
+            _unlink(tmp_path)
+
+
+def ndjson(pathlike, fields=None, exclude=()):
+    """
+    Create a stage that exports docs or stubs to an NDJSON file at
+    `pathlike`, passing them through unchanged. See `to_data` for
+    `fields` and `exclude`.
+    """
+    def export_ndjson(things):
+        return dump_ndjson(things, pathlike, fields=fields, exclude=exclude)
+    return export_ndjson
+
+
+def section_name(thing):
+    """
+    Get the export section for a doc or stub: the slug of the top-level
+    directory of its `id_path`, or "root" for top-level files.
+    """
+    return to_slug(Doc.id_tld(thing)) or _ROOT_SECTION
+
+
+class _Shard:
+    """
+    A JSON array file that is written one item at a time.
+
+    The file can be closed between writes with `suspend`. It is reopened
+    for appending the next time it is written to.
+    """
+    def __init__(self, file_path):
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        self.file_path = file_path
+        self.file = open(file_path, "w", encoding="utf-8")
+        self.count = 0
+        self.file.write("[")
+
+    def _open(self):
+        if self.file is None:
+            self.file = open(self.file_path, "a", encoding="utf-8")
+        return self.file
+
+    def write(self, encoded):
+        f = self._open()
+        if self.count > 0:
+            f.write(",\n")
+        f.write(encoded)
+        self.count = self.count + 1
+
+    def suspend(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def close(self):
+        self._open().write("]\n")
+        self.suspend()
+
+
+def _swap_directory(staging, dir_path):
+    """
+    Put the finished `staging` directory in place of `dir_path`.
+    Any old directory is moved aside first, then removed.
+    """
+    old_path = _tmp_path(dir_path).with_suffix(".old")
+    shutil.rmtree(old_path, ignore_errors=True)
+    try:
+        os.rename(dir_path, old_path)
+    except FileNotFoundError:
+        old_path = None
+    os.rename(staging, dir_path)
+    if old_path is not None:
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def dump_sections(
+    things,
+    directory,
+    section=section_name,
+    shard_size=1000,
+    fields=None,
+    exclude=(),
+    max_open=64
+):
+    """
+    Write docs or stubs to sharded JSON files, as they pass through.
+
+    Items are grouped by `section(thing)`. Each section is written to
+    `{directory}/{section}/{n}.json` files, each holding a JSON array of
+    at most `shard_size` items, in stream order. At most `max_open`
+    shard files are held open at a time. When there are more sections
+    than that, the least recently written shard is closed, and reopened
+    for appending when its section comes up again.
+
+    Once every item has been read, `{directory}/index.json` is written.
+    It lists the shards and item count for each section:
+
+        {
+            "@type": "index",
+            "sections": {
+                "posts": {"count": 1200, "shards": ["posts/0.json", ...]}
+            }
+        }
+
+    The export is written to a staging directory next to `directory`,
+    which replaces `directory` once every item has been read. Readers
+    never see a half-written shard, and shards for sections that no
+    longer exist are removed. If the stream fails, or isn't read to the
+    end, `directory` is left as it was.
+
+    Returns a generator that yields each item after writing it.
+    """
+    dir_path = Path(directory)
+    staging = _tmp_path(dir_path)
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    # The current shard for each section
+    shards = {}
+    # Sections with an open shard file, least recently written first
+    open_sections = OrderedDict()
+    sections = {}
+    complete = False
+    try:
+        for thing in things:
+            name = section(thing)
+            info = sections.setdefault(name, {"count": 0, "shards": []})
+            shard = shards.get(name)
+            if shard is not None and shard.count >= shard_size:
+                shard.close()
+                shard = None
+            if shard is None:
+                shard_path = "{}/{}.json".format(name, len(info["shards"]))
+                shard = _Shard(staging.joinpath(shard_path))
+                shards[name] = shard
+                info["shards"].append(shard_path)
+            shard.write(encode(thing, fields=fields, exclude=exclude))
+            open_sections[name] = True
+            open_sections.move_to_end(name)
+            if len(open_sections) > max_open:
+                idle, _ = open_sections.popitem(last=False)
+                shards[idle].suspend()
+            info["count"] = info["count"] + 1
+            yield thing
+        for shard in shards.values():
+            shard.close()
+        with open(staging.joinpath("index.json"), "w", encoding="utf-8") as f:
+            json.dump({"@type": "index", "sections": sections}, f, indent=2)
+        _swap_directory(staging, dir_path)
+        complete = True
+    finally:
+        if not complete:
+            for shard in shards.values():
+                shard.suspend()
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+def sections(
+    directory,
+    section=section_name,
+    shard_size=1000,
+    fields=None,
+    exclude=(),
+    max_open=64
+):
+    """
+    Create a stage that exports docs or stubs to sharded per-section
+    JSON files in `directory`, passing them through unchanged.
+    See `dump_sections`.
+    """
+    def export_sections(things):
+        return dump_sections(
+            things,
+            directory,
+            section=section,
+            shard_size=shard_size,
+            fields=fields,
+            exclude=exclude,
+            max_open=max_open
+        )
+    return export_sections
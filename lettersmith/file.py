@@ -6,6 +6,7 @@ copied or transformed.
 """
 from collections import namedtuple
 from pathlib import PurePath
+from lettersmith.io import read_blob as _read_blob
 from lettersmith.date import read_file_times, EPOCH, to_datetime
 from lettersmith import doc as Doc
 
@@ -19,6 +20,8 @@ Files are namedtuples that represent the raw bytes in a file to be
 copied or transformed.
 
 Files contain a `blob` field that contains the bytes of the file.
+Lazy files have a `blob` of None. Their bytes are read from
+`input_path` only when they are needed.
 """
 
 
@@ -33,36 +36,76 @@ def create(id_path, output_path, blob,
         input_path=str(input_path) if input_path is not None else None,
         created=to_datetime(created),
         modified=to_datetime(modified),
-        blob=bytes(blob)
+        blob=bytes(blob) if blob is not None else None
     )
 
 
-def load(pathlike):
-    """
-    Loads a File namedtuple from a file path.
-    `blob` field will contain bytes of file.
-    Returns a File.
-    """
-    file_created, file_modified = read_file_times(pathlike)
-    with open(pathlike, 'rb') as f:
-        blob = f.read()
+def _load(pathlike, created, modified, lazy=False):
+    if lazy:
+        blob = None
+    else:
+        with open(pathlike, 'rb') as f:
+            blob = f.read()
     return create(
         id_path=pathlike,
         output_path=pathlike,
         input_path=pathlike,
-        created=file_created,
-        modified=file_modified,
+        created=created,
+        modified=modified,
         blob=blob
     )
 
 
+def load(pathlike, lazy=False):
+    """
+    Loads a File namedtuple from a file path.
+    `blob` field will contain bytes of file, or None if `lazy` is true.
+    Returns a File.
+    """
+    file_created, file_modified = read_file_times(pathlike)
+    return _load(pathlike, file_created, file_modified, lazy)
+
+
+def load_entry(entry, lazy=False):
+    """
+    Loads a File namedtuple from a `path.FileEntry`, using the file
+    times already read by `path.walk_files`.
+    Returns a File.
+    """
+    return _load(entry.path, entry.created, entry.modified, lazy)
+
+
+def load_entry_lazy(entry):
+    """
+    Loads a lazy File namedtuple from a `path.FileEntry`. The file
+    isn't read.
+    """
+    return load_entry(entry, lazy=True)
+
+
+def read_blob(file):
+    """
+    Get the bytes of a file, reading them from `input_path` if the
+    file is lazy.
+    """
+    if file.blob is None:
+        return _read_blob(PurePath(file.input_path))
+    return file.blob
+
+
 def writeable(file):
     """
     Return a writeable tuple for file.
 
     writeable tuple is any 2-tuple of `output_path`, `bytes`.
     `lettersmith.write` knows how to write these tuples to disk.
+
+    For lazy files, the second item is the `PurePath` of the input
+    file instead, so writers can copy or stream it without reading it
+    into memory.
     """
+    if file.blob is None:
+        return file.output_path, PurePath(file.input_path)
     return file.output_path, file.blob
 
 
@@ -76,7 +119,7 @@ def to_doc(file):
         input_path=file.input_path,
         created=file.created,
         modified=file.modified,
-        content=file.blob.decode()
+        content=read_blob(file).decode()
     )
 
 
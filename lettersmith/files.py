@@ -1,23 +1,37 @@
 """
 Tools for working with collections of files
 """
-from lettersmith.path import glob_files
+from lettersmith.path import walk_files
 from lettersmith import file as File
 from lettersmith import query
+from lettersmith import runtime
 
 
 load = query.maps(File.load)
+load_entries = query.maps(File.load_entry)
+load_entries_lazy = query.maps(File.load_entry_lazy)
 
 
-def find(glob):
+def find(*globs, exclude=(), lazy=False):
     """
-    Load all docs under input path that match a glob pattern.
+    Load all files under input path that match any of the glob patterns,
+    skipping any that match a pattern in `exclude`.
+
+    If the build's `only` option is set (see `lettersmith.runtime`),
+    only matching files are loaded.
+
+    If `lazy` is true, files aren't read. Their bytes are copied or
+    streamed from disk when they are written (see `file.writeable`).
 
     Example:
 
-        docs.find("posts/*.md")
+        files.find("static/**/*")
     """
-    return load(glob_files(".", glob))
+    entries = walk_files(".", globs, exclude=exclude)
+    load = load_entries_lazy if lazy else load_entries
+    return load(
+        entry for entry in entries if runtime.is_selected(entry.path)
+    )
 
 
 to_doc = query.maps(File.to_doc)
@@ -0,0 +1,293 @@
+"""
+Tools for querying the graph of wikilinks between docs.
+
+The graph is built once from `wikidoc` edges and stored as compressed
+sparse rows (CSR): an array of offsets and an array of target ids, for
+both links and backlinks. Nodes are numbered densely from 0, one per doc
+in the graph, and `LinkGraph.ids` maps them back to `stub.Registry` ids,
+so query results can be turned back into stubs cheaply. Stubs in a shared
+registry that aren't part of the graph don't become nodes.
+
+If NumPy is installed, it is used to speed up PageRank. Otherwise,
+everything runs on plain Python arrays.
+"""
+from array import array
+from collections import deque
+from lettersmith import doc as Doc
+from lettersmith import stub as Stub
+from lettersmith import wikidoc
+from lettersmith.edge import EdgeArray
+from lettersmith.lens import lens_compose, key
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class LinkGraph:
+    """
+    A directed graph of links between nodes `0..size - 1`, stored as CSR
+    adjacency arrays.
+
+    `ids` is a sequence of the registry id for each node. If None, nodes
+    are their own registry ids.
+    """
+    def __init__(self, size, edges, ids=None):
+        self.size = size
+        self.ids = ids if ids is not None else range(size)
+        self._nodes = {
+            registry_id: i for i, registry_id in enumerate(self.ids)
+        }
+        self.link_offsets, self.link_targets = edges.adjacency(size)
+        self.backlink_offsets, self.backlink_targets = edges.adjacency(
+            size,
+            reverse=True
+        )
+
+    def __len__(self):
+        return self.size
+
+    def node(self, registry_id):
+        """
+        Get the node for a registry id. Raises KeyError if the id isn't
+        part of the graph.
+        """
+        return self._nodes[registry_id]
+
+    def registry_ids(self, nodes):
+        """
+        Map an iterable of nodes to their registry ids.
+        """
+        ids = self.ids
+        return (ids[i] for i in nodes)
+
+    def links(self, i):
+        """
+        Get the nodes that `i` links to.
+        """
+        return self.link_targets[
+            self.link_offsets[i]:self.link_offsets[i + 1]
+        ]
+
+    def backlinks(self, i):
+        """
+        Get the nodes that link to `i`.
+        """
+        return self.backlink_targets[
+            self.backlink_offsets[i]:self.backlink_offsets[i + 1]
+        ]
+
+    def out_degree(self, i):
+        return self.link_offsets[i + 1] - self.link_offsets[i]
+
+    def in_degree(self, i):
+        return self.backlink_offsets[i + 1] - self.backlink_offsets[i]
+
+    def neighborhood(self, i, hops=1, direction="both"):
+        """
+        Get the nodes within `hops` steps of `i` (not including `i`).
+
+        `direction` is one of "links", "backlinks" or "both".
+        Returns a tuple of nodes, ordered by distance, then by node.
+        """
+        steps = {
+            "links": (self.links,),
+            "backlinks": (self.backlinks,),
+            "both": (self.links, self.backlinks)
+        }[direction]
+        seen = {i}
+        found = []
+        frontier = [i]
+        for hop in range(hops):
+            ring = set()
+            for node in frontier:
+                for step in steps:
+                    ring.update(step(node))
+            ring.difference_update(seen)
+            if not ring:
+                break
+            frontier = sorted(ring)
+            seen.update(frontier)
+            found.extend(frontier)
+        return tuple(found)
+
+    def orphans(self):
+        """
+        Get nodes that have no backlinks.
+        """
+        offsets = self.backlink_offsets
+        return tuple(
+            i for i in range(self.size)
+            if offsets[i] == offsets[i + 1]
+        )
+
+    def dead_ends(self):
+        """
+        Get nodes that don't link anywhere.
+        """
+        offsets = self.link_offsets
+        return tuple(
+            i for i in range(self.size)
+            if offsets[i] == offsets[i + 1]
+        )
+
+    def components(self):
+        """
+        Label the weakly connected components of the graph.
+
+        Returns an array of component numbers, one per node. Components are
+        numbered from 0, in order of their lowest node.
+        """
+        labels = array("q", (-1 for i in range(self.size)))
+        component = 0
+        for start in range(self.size):
+            if labels[start] != -1:
+                continue
+            labels[start] = component
+            queue = deque((start,))
+            while queue:
+                node = queue.popleft()
+                for step in (self.links, self.backlinks):
+                    for other in step(node):
+                        if labels[other] == -1:
+                            labels[other] = component
+                            queue.append(other)
+            component = component + 1
+        return labels
+
+    def pagerank(self, damping=0.85, iterations=100, tolerance=1.0e-8):
+        """
+        Compute PageRank importance for every node, using power iteration.
+        Rank from dead ends is spread evenly over the whole graph.
+
+        Returns an array of floats, one per node, summing to 1.
+        """
+        if self.size == 0:
+            return array("d")
+        if numpy is not None:
+            return array("d", _pagerank_numpy(
+                self, damping, iterations, tolerance
+            ))
+        return _pagerank_python(self, damping, iterations, tolerance)
+
+
+def _pagerank_python(graph, damping, iterations, tolerance):
+    size = graph.size
+    out_degree = tuple(graph.out_degree(i) for i in range(size))
+    rank = [1.0 / size] * size
+    for iteration in range(iterations):
+        dangling = sum(r for r, d in zip(rank, out_degree) if d == 0)
+        base = (1.0 - damping + damping * dangling) / size
+        share = [
+            r / d if d else 0.0
+            for r, d in zip(rank, out_degree)
+        ]
+        offsets = graph.backlink_offsets
+        sources = graph.backlink_targets
+        updated = [
+            base + damping * sum(
+                share[j] for j in sources[offsets[i]:offsets[i + 1]]
+            )
+            for i in range(size)
+        ]
+        delta = sum(abs(a - b) for a, b in zip(updated, rank))
+        rank = updated
+        if delta < tolerance:
+            break
+    return array("d", rank)
+
+
+def _pagerank_numpy(graph, damping, iterations, tolerance):
+    size = graph.size
+    offsets = numpy.frombuffer(graph.link_offsets, dtype=numpy.int64)
+    targets = numpy.frombuffer(graph.link_targets, dtype=numpy.int64)
+    out_degree = numpy.diff(offsets)
+    sources = numpy.repeat(numpy.arange(size), out_degree)
+    dangling = out_degree == 0
+    rank = numpy.full(size, 1.0 / size)
+    for iteration in range(iterations):
+        share = numpy.divide(
+            rank,
+            out_degree,
+            out=numpy.zeros(size),
+            where=~dangling
+        )
+        base = (1.0 - damping + damping * rank[dangling].sum()) / size
+        updated = base + damping * numpy.bincount(
+            targets,
+            weights=share[sources],
+            minlength=size
+        )
+        delta = numpy.abs(updated - rank).sum()
+        rank = updated
+        if delta < tolerance:
+            break
+    return rank.tolist()
+
+
+def link_graph(docs, registry):
+    """
+    Build a `LinkGraph` from the wikilinks in `docs`.
+
+    Docs are interned in `registry`. There is one node per doc, numbered
+    in the order docs are given. Use `LinkGraph.node` and
+    `LinkGraph.registry_ids` to map between nodes and registry ids.
+    """
+    docs = tuple(docs)
+    edges = wikidoc.link_edges(docs, registry)
+    ids = array("q", dict.fromkeys(registry.id(doc.id_path) for doc in docs))
+    nodes = {registry_id: i for i, registry_id in enumerate(ids)}
+    dense = EdgeArray(
+        (nodes[tail], nodes[head]) for tail, head in edges
+    )
+    return LinkGraph(len(ids), dense, ids)
+
+
+meta_rank = lens_compose(Doc.meta, key("rank", 0.0))
+meta_component = lens_compose(Doc.meta, key("component", 0))
+meta_neighborhood = lens_compose(Doc.meta, key("neighborhood", tuple()))
+
+
+def annotate_graph(docs, registry=None, hops=0, damping=0.85):
+    """
+    Annotate docs with the results of link graph queries.
+
+    Builds the graph once, then sets these meta fields on each doc,
+    in a single pass:
+
+    - links: stubs this doc links to
+    - backlinks: stubs linking to this doc, most important first
+    - rank: PageRank importance of this doc
+    - component: number of the connected component this doc belongs to
+    - orphan: True if nothing links to this doc
+    - dead_end: True if this doc doesn't link anywhere
+    - neighborhood: stubs within `hops` links of this doc, in either
+      direction (only if `hops` is greater than 0)
+
+    This can be used in place of `wikidoc.annotate_links`.
+    """
+    docs = tuple(docs)
+    registry = registry if registry is not None else Stub.Registry()
+    graph = link_graph(docs, registry)
+    rank = graph.pagerank(damping=damping)
+    components = graph.components()
+    by_rank = lambda j: (-rank[j], j)
+    stub_list = lambda nodes: registry.stub_list(graph.registry_ids(nodes))
+    for doc in docs:
+        i = graph.node(registry.id(doc.id_path))
+        links = graph.links(i)
+        backlinks = graph.backlinks(i)
+        patch = {
+            "links": stub_list(links),
+            "backlinks": stub_list(sorted(backlinks, key=by_rank)),
+            "rank": rank[i],
+            "component": components[i],
+            "orphan": len(backlinks) == 0,
+            "dead_end": len(links) == 0
+        }
+        if hops > 0:
+            patch["neighborhood"] = stub_list(
+                graph.neighborhood(i, hops=hops)
+            )
+        yield Doc.update_meta(doc, patch)
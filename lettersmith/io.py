@@ -5,9 +5,55 @@ import shutil
 from pathlib import Path, PurePath
 
 
-def write_file_deep(pathlike, content, mode="w"):
-    """Write a file to filepath, creating directories if necessary"""
+def write_file_deep(pathlike, content, mode="w", known_dirs=None):
+    """
+    Write a file to filepath, creating directories if necessary.
+
+    If `known_dirs` is a set, it is used as a cache of directories that
+    already exist, so the same directory isn't created more than once.
+    """
     file_path = Path(pathlike)
-    file_path.parent.mkdir(exist_ok=True, parents=True)
+    parent = file_path.parent
+    if known_dirs is None:
+        parent.mkdir(exist_ok=True, parents=True)
+    elif parent not in known_dirs:
+        parent.mkdir(exist_ok=True, parents=True)
+        known_dirs.add(parent)
     with open(file_path, mode) as f:
-        f.write(content)
\ No newline at end of file
+        f.write(content)
+
+
+def read_blob(blob):
+    """
+    Read the bytes of a blob. A blob is either bytes, or a `PurePath`
+    to a file that holds the bytes (see `file.writeable`).
+    """
+    if isinstance(blob, PurePath):
+        return Path(blob).read_bytes()
+    return blob
+
+
+def blob_size(blob):
+    """
+    Get the size of a blob in bytes, without reading it.
+    """
+    if isinstance(blob, PurePath):
+        return Path(blob).stat().st_size
+    return len(blob)
+
+
+def write_blob_deep(pathlike, blob, known_dirs=None):
+    """
+    Write a blob to filepath, creating directories if necessary.
+    Blobs that are paths are copied from their file.
+    """
+    if isinstance(blob, PurePath):
+        file_path = Path(pathlike)
+        parent = file_path.parent
+        if known_dirs is None or parent not in known_dirs:
+            parent.mkdir(exist_ok=True, parents=True)
+            if known_dirs is not None:
+                known_dirs.add(parent)
+        shutil.copyfile(blob, file_path)
+    else:
+        write_file_deep(pathlike, blob, mode="wb", known_dirs=known_dirs)
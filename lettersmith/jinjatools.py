@@ -1,8 +1,13 @@
 import random
 import itertools
+import time
+from contextlib import ExitStack
 from datetime import datetime
+from functools import wraps
 
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, Template, TemplateNotFound
+from jinja2 import meta as jinja_meta
+from jinja2 import nodes as jinja_nodes
 
 from lettersmith import util
 from lettersmith import docs as Docs
@@ -11,6 +16,9 @@ from lettersmith import query
 from lettersmith.lens import get, put
 from lettersmith import path as pathtools
 from lettersmith.markdowntools import markdown
+from lettersmith.data import LazyData
+from lettersmith import cache
+from lettersmith import runtime
 
 
 def _choice(iterable):
@@ -48,6 +56,163 @@ def _permalink(base_url):
     return permalink_bound
 
 
+def _qualified_name(func):
+    return "{}.{}".format(
+        getattr(func, "__module__", None),
+        getattr(func, "__qualname__", type(func).__qualname__)
+    )
+
+
+class RenderProfile:
+    """
+    Collects render timings for templates, blocks, filters and docs.
+
+    Each timing is recorded under a `(kind, name)` key, where kind is
+    one of "template", "block", "filter", "function" or "doc". Template
+    times are inclusive. They include time spent in included templates,
+    `extends` parents and filters called while rendering.
+    """
+    def __init__(self):
+        self._stats = {}
+
+    def record(self, kind, name, seconds):
+        """
+        Record one timing.
+        """
+        key = (kind, name)
+        try:
+            count, total, longest = self._stats[key]
+        except KeyError:
+            count, total, longest = 0, 0.0, 0.0
+        self._stats[key] = (count + 1, total + seconds, max(longest, seconds))
+
+    def report(self, kind=None, limit=None):
+        """
+        Get a ranked report of the slowest items, by total time.
+        If `kind` is given, only items of that kind are included.
+
+        Returns a list of dicts with `kind`, `name`, `count`, `total`,
+        `max` and `mean`.
+        """
+        rows = sorted(
+            (
+                {
+                    "kind": key[0],
+                    "name": key[1],
+                    "count": count,
+                    "total": total,
+                    "max": longest,
+                    "mean": total / count
+                }
+                for key, (count, total, longest) in self._stats.items()
+                if kind is None or key[0] == kind
+            ),
+            key=lambda row: row["total"],
+            reverse=True
+        )
+        return rows[:limit] if limit is not None else rows
+
+    def format_report(self, limit=10):
+        """
+        Format the report as plain-text tables, one per kind, with the
+        `limit` slowest items in each.
+        """
+        lines = []
+        for kind in ("template", "block", "filter", "function", "doc"):
+            rows = self.report(kind, limit)
+            if not rows:
+                continue
+            lines.append("{:<48}{:>8}{:>12}{:>12}".format(
+                kind, "count", "total ms", "max ms"
+            ))
+            for row in rows:
+                lines.append("{:<48}{:>8}{:>12.2f}{:>12.2f}".format(
+                    row["name"][:47],
+                    row["count"],
+                    row["total"] * 1000,
+                    row["max"] * 1000
+                ))
+            lines.append("")
+        return "\n".join(lines)
+
+
+def _timed_render_func(render_func, profile, kind, name):
+    """
+    Wrap a compiled template render function (a generator) so it records
+    the time spent producing output, but not the time the caller spends
+    between chunks.
+    """
+    @wraps(render_func)
+    def timed(*args, **kwargs):
+        chunks = render_func(*args, **kwargs)
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    elapsed = elapsed + time.perf_counter() - start
+                    return
+                elapsed = elapsed + time.perf_counter() - start
+                yield chunk
+        finally:
+            profile.record(kind, name, elapsed)
+    return timed
+
+
+def _timed_func(func, profile, kind, name):
+    @wraps(func)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.record(kind, name, time.perf_counter() - start)
+    return timed
+
+
+def _profiling_template_class(profile):
+    """
+    Create a Template class that times its root render function and
+    blocks. Included and `extends` parent templates are loaded through
+    the same environment, so they are timed too.
+
+    Templates are wrapped as they are created, in `from_code` (used by
+    loaders and `Environment.from_string`) and `from_module_dict` (used
+    for precompiled templates). These are the public constructors Jinja
+    uses for every template class.
+    """
+    def timed(t):
+        t.root_render_func = _timed_render_func(
+            t.root_render_func, profile, "template", t.name
+        )
+        t.blocks = {
+            block: _timed_render_func(
+                func,
+                profile,
+                "block",
+                "{}#{}".format(t.name, block)
+            )
+            for block, func in t.blocks.items()
+        }
+        return t
+
+    class ProfilingTemplate(Template):
+        @classmethod
+        def from_code(cls, environment, code, globals, uptodate=None):
+            return timed(
+                super().from_code(environment, code, globals, uptodate)
+            )
+
+        @classmethod
+        def from_module_dict(cls, environment, module_dict, globals):
+            return timed(
+                super().from_module_dict(environment, module_dict, globals)
+            )
+    return ProfilingTemplate
+
+
 class FileSystemEnvironment(Environment):
     def __init__(self, templates_path, filters={}, context={}):
         loader = FileSystemLoader(templates_path)
@@ -73,8 +238,12 @@ class LettersmithEnvironment(FileSystemEnvironment):
     """
     Specialized version of default Jinja environment class that
     offers additional filters and environment variables.
+
+    If `profile` (a `RenderProfile`) is given, every template, block,
+    Lettersmith filter and template function records its render time
+    in it.
     """
-    def __init__(self, templates_path, filters={}, context={}):
+    def __init__(self, templates_path, filters={}, context={}, profile=None):
         loader = FileSystemLoader(templates_path)
         super().__init__(
             templates_path,
@@ -83,6 +252,17 @@ class LettersmithEnvironment(FileSystemEnvironment):
         )
         self.filters.update(filters)
         self.globals.update(context)
+        self.profile = profile
+        if profile is not None:
+            self.template_class = _profiling_template_class(profile)
+            for name in (*TEMPLATE_FUNCTIONS, *filters):
+                self.filters[name] = _timed_func(
+                    self.filters[name], profile, "filter", name
+                )
+            for name in TEMPLATE_FUNCTIONS:
+                self.globals[name] = _timed_func(
+                    self.globals[name], profile, "function", name
+                )
 
 
 def should_template(doc):
@@ -92,28 +272,274 @@ def should_template(doc):
     return get(Doc.template, doc) is not ""
 
 
-def jinja(templates_path, base_url, context={}, filters={}):
+class TemplateDependencies:
+    """
+    Works out what a template depends on, by statically analyzing its
+    source and the sources it pulls in through `extends`, `include`
+    and `import`.
+
+    Results are cached for the lifetime of the object, so create one
+    per build.
+    """
+    def __init__(self, env):
+        self.env = env
+        self._closures = {}
+        self._digests = {}
+        self._names = {}
+
+    def _parse(self, name):
+        source, filename, uptodate = self.env.loader.get_source(
+            self.env,
+            name
+        )
+        self._digests[name] = cache.digest(source.encode())
+        return self.env.parse(source)
+
+    def _direct(self, name):
+        """
+        Returns a tuple of `(referenced_templates, variable_names)` for
+        a single template.
+        """
+        try:
+            return self._names[name]
+        except KeyError:
+            pass
+        try:
+            ast = self._parse(name)
+            refs = tuple(jinja_meta.find_referenced_templates(ast))
+            variables = frozenset(
+                node.name for node in ast.find_all(jinja_nodes.Name)
+                if node.ctx == "load"
+            )
+        except TemplateNotFound:
+            self._digests[name] = None
+            refs = ()
+            variables = frozenset()
+        self._names[name] = (refs, variables)
+        return self._names[name]
+
+    def closure(self, name):
+        """
+        Get the names of every template `name` depends on, including
+        itself. If a template references another template by a dynamic
+        expression, every template is included, to be safe.
+        """
+        try:
+            return self._closures[name]
+        except KeyError:
+            pass
+        seen = set()
+        stack = [name]
+        while stack:
+            current = stack.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            refs, variables = self._direct(current)
+            for ref in refs:
+                if ref is None:
+                    stack.extend(self.env.list_templates())
+                else:
+                    stack.append(ref)
+        self._closures[name] = frozenset(seen)
+        return self._closures[name]
+
+    def digest(self, name):
+        """
+        Get a digest of a template's source (None if it doesn't exist).
+        """
+        self._direct(name)
+        return self._digests[name]
+
+    def variables(self, name):
+        """
+        Get the names of variables read anywhere in the closure of
+        template `name`. This may include some local variables, so
+        intersect it with the names you care about.
+        """
+        return frozenset().union(*(
+            self._direct(dep)[1] for dep in self.closure(name)
+        ))
+
+
+def dependencies(cache_dir, id_path):
+    """
+    Read the dependencies recorded for a doc by an incremental `jinja`
+    render. Returns a dict with the keys:
+
+    - templates: `{template_name: digest}` for the full template closure
+    - globals: `{name: fingerprint}` for the context globals it reads
+    - data: `{(context_name, data_key): signature}` for the lazy data
+      keys read while rendering
+
+    Returns None if nothing was recorded for `id_path`.
+    """
+    record = cache.read_pickle(cache.key_path(cache_dir, "render", id_path))
+    if record is None:
+        return None
+    return {
+        "templates": record["templates"],
+        "globals": record["globals"],
+        "data": record["data"]
+    }
+
+
+def jinja(
+    templates_path,
+    base_url,
+    context={},
+    filters={},
+    cache_dir=None,
+    profile=None
+):
     """
     Wraps up the gory details of creating a Jinja renderer.
     Returns a render function that takes a doc and returns a rendered doc.
     Template comes preloaded with Jinja default filters, and
     Lettersmith default filters and globals.
+
+    If any context value is a `data.LazyData` mapping, the data keys read
+    while rendering are recorded under the doc's template name. Call
+    `report()` on the mapping after rendering to see them.
+
+    If `cache_dir` is given, rendering is incremental. For each doc, the
+    full template closure (`extends`, `include`, `import`), the context
+    globals it reads, and the lazy data keys it reads are recorded in
+    `cache_dir`, along with the rendered content. On the next build, a
+    doc is only re-rendered if the doc itself, or one of those
+    dependencies changed. Changing `base_url` or the set of filters
+    re-renders every doc. Note that globals that change on every build
+    (like `now`), or that can't be fingerprinted (like iterators), will
+    cause templates that read them to always re-render.
+
+    If `cache_dir` isn't given, the build's cache directory is used for
+    incremental builds (see `lettersmith.runtime`).
+
+    If `profile` (a `RenderProfile`) is given, render times are recorded
+    for each template, block, filter and doc. Print
+    `profile.format_report()` after rendering to see the slowest ones.
     """
+    cache_dir = cache_dir if cache_dir is not None else runtime.cache_dir()
     now = datetime.now()
     env = LettersmithEnvironment(
         templates_path,
         filters={"permalink": _permalink(base_url), **filters},
-        context={"now": now, **context}
+        context={"now": now, **context},
+        profile=profile
     )
+    lazy_data = {
+        name: value for name, value in context.items()
+        if isinstance(value, LazyData)
+    }
+    deps = TemplateDependencies(env)
+    global_names = frozenset(("now", *context.keys())) - lazy_data.keys()
+    global_fingerprints = {}
+    # Filters can't be fingerprinted by value, so the filter set is
+    # fingerprinted by name and the qualified name of each function.
+    env_fingerprint = cache.fingerprint({
+        "base_url": base_url,
+        "filters": {
+            name: _qualified_name(func)
+            for name, func in {**TEMPLATE_FUNCTIONS, **filters}.items()
+        }
+    })
+
+    def fingerprint_global(name):
+        try:
+            return global_fingerprints[name]
+        except KeyError:
+            try:
+                value = cache.fingerprint(env.globals[name])
+            except KeyError:
+                # Global was removed, so anything that read it is stale.
+                value = None
+            global_fingerprints[name] = value
+            return value
+
+    def data_signature(name, key):
+        try:
+            return lazy_data[name].signature(key)
+        except KeyError:
+            return None
+
+    def is_fresh(record):
+        return (
+            env_fingerprint is not None
+            and record.get("env") == env_fingerprint
+            and all(
+                digest is not None and deps.digest(name) == digest
+                for name, digest in record["templates"].items()
+            )
+            and all(
+                value is not None and fingerprint_global(name) == value
+                for name, value in record["globals"].items()
+            )
+            and all(
+                signature is not None
+                and data_signature(name, key) == signature
+                for (name, key), signature in record["data"].items()
+            )
+        )
+
+    def render_template(doc):
+        with ExitStack() as stack:
+            touched = {
+                name: stack.enter_context(data.recording(doc.template))
+                for name, data in lazy_data.items()
+            }
+            template = env.get_template(doc.template)
+            if profile is not None:
+                start = time.perf_counter()
+                rendered = template.render({"doc": doc})
+                profile.record(
+                    "doc",
+                    doc.id_path,
+                    time.perf_counter() - start
+                )
+            else:
+                rendered = template.render({"doc": doc})
+        return rendered, touched
+
+    def render_incremental(doc):
+        record_path = cache.key_path(cache_dir, "render", doc.id_path)
+        doc_fingerprint = cache.fingerprint(doc)
+        record = cache.read_pickle(record_path)
+        if (
+            record is not None
+            and doc_fingerprint is not None
+            and record["doc"] == doc_fingerprint
+            and is_fresh(record)
+        ):
+            return record["content"]
+        rendered, touched = render_template(doc)
+        closure = deps.closure(doc.template)
+        cache.write_pickle(record_path, {
+            "env": env_fingerprint,
+            "doc": doc_fingerprint,
+            "templates": {name: deps.digest(name) for name in closure},
+            "globals": {
+                name: fingerprint_global(name)
+                for name in deps.variables(doc.template) & global_names
+            },
+            "data": {
+                (name, key): lazy_data[name].signature(key)
+                for name, keys in touched.items()
+                for key in keys
+            },
+            "content": rendered
+        })
+        return rendered
 
     @query.maps
     @Doc.annotate_exceptions
     def render(doc):
         if should_template(doc):
-            template = env.get_template(doc.template)
-            rendered = template.render({"doc": doc})
+            if cache_dir is not None:
+                rendered = render_incremental(doc)
+            else:
+                rendered, touched = render_template(doc)
             return put(Doc.content, doc, rendered)
         else:
             return doc
 
-    return render
\ No newline at end of file
+    return render
@@ -0,0 +1,242 @@
+"""
+Tools for finding broken internal links in a site, before it is written.
+
+`validate_links` is a stage that sits in front of `write`. It passes
+docs and files through untouched, while collecting their output paths
+and the `href`/`src` URLs in rendered docs. Once every doc has gone by,
+each internal URL is checked against the set of output URLs, with a
+single set lookup. Nothing is read back from disk.
+
+Example:
+
+    checked = pipe(
+        chain(static, rendered_docs),
+        linkcheck.validate_links(base_url)
+    )
+    write(checked, directory="public")
+"""
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin, urlparse, urldefrag, unquote
+from lettersmith import doc as Doc
+from lettersmith import rewrite
+from lettersmith import runtime
+from lettersmith.path import qualify_url, to_url
+
+
+class BrokenLinksError(Exception):
+    """
+    Raised when a site has broken internal links.
+    `broken` is a dict of `{id_path: (url, ...)}`.
+    """
+    def __init__(self, msg, broken):
+        super().__init__(msg)
+        self.broken = broken
+
+
+_SCHEMES = ("", "http", "https")
+
+
+def _extract_urls(contents):
+    """
+    Collect the URLs in each of a batch of HTML strings.
+    A module-level function, so it can run in worker processes.
+    """
+    collect = (rewrite.collect_urls("urls"),)
+    results = []
+    for content in contents:
+        patch = {}
+        rewrite.rewrite_content(content, collect, None, patch)
+        results.append(tuple(patch.get("urls", ())))
+    return results
+
+
+def _normalize(url):
+    """
+    Normalize a URL for comparison. Drops the fragment and query, and
+    decodes percent-escapes.
+    """
+    url, fragment = urldefrag(url)
+    return unquote(url.split("?", 1)[0])
+
+
+def output_urls(output_path, base_url):
+    """
+    Get every URL that an output path can be reached at.
+
+    Includes the URL made by `path.to_url` (e.g. `/some/file/`), and the
+    plain qualified path (e.g. `/some/file/index.html`). Index files
+    can also be reached by their directory, with or without a trailing
+    slash.
+    """
+    qualified = _normalize(qualify_url(output_path, base=base_url))
+    urls = {_normalize(to_url(output_path, base=base_url)), qualified}
+    if qualified.endswith("/index.html"):
+        urls.add(qualified[:-len("index.html")])
+    for url in tuple(urls):
+        if url.endswith("/"):
+            urls.add(url.rstrip("/"))
+    return urls
+
+
+class LinkIndex:
+    """
+    An index of output URLs for a site, for checking links.
+    """
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self._netloc = urlparse(qualify_url("/", base=base_url)).netloc
+        self._urls = set()
+
+    def add(self, output_path):
+        """
+        Add an output path to the index.
+        """
+        self._urls.update(output_urls(output_path, self.base_url))
+
+    def is_internal(self, url):
+        """
+        Check if a URL points inside the site.
+        """
+        parsed = urlparse(url)
+        return (
+            parsed.scheme in _SCHEMES
+            and parsed.netloc == self._netloc
+        )
+
+    def is_broken(self, href, page_url=None):
+        """
+        Check if a link is an internal link to a URL that isn't in the
+        index. Links are resolved against `page_url`, the URL of the
+        page they appear on, like a browser would. If there is no
+        `page_url`, they are qualified with `path.qualify_url`, like
+        `absolutize` does. Fragment-only links are never broken.
+        """
+        if href == "" or href.startswith("#"):
+            return False
+        if page_url is not None:
+            url = urljoin(page_url, href)
+        else:
+            url = qualify_url(href, base=self.base_url)
+        if not self.is_internal(url):
+            return False
+        return _normalize(url) not in self._urls
+
+
+def _batches(things, size):
+    batch = []
+    for thing in things:
+        batch.append(thing)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def find_broken(things, base_url, jobs=None, batch_size=64):
+    """
+    Pass docs and files through, collecting output paths and links.
+    Returns a tuple of `(things, broken)`, where `things` is a generator
+    of the same docs and files, and `broken` is a dict that is filled in
+    with `{id_path: (url, ...)}` once `things` has been read.
+
+    URLs are extracted from doc content in a pool of `jobs` worker
+    processes, while docs stream by. If `jobs` is None, the build's
+    `jobs` option is used (see `lettersmith.runtime`), or 1.
+    """
+    jobs = jobs if jobs is not None else runtime.jobs(1)
+    index = LinkIndex(base_url)
+    broken = {}
+
+    def scan(things):
+        pending = []
+        executor = (
+            ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+        )
+        try:
+            for batch in _batches(things, batch_size):
+                docs = []
+                for thing in batch:
+                    index.add(thing.output_path)
+                    if isinstance(thing, Doc.Doc):
+                        docs.append(thing)
+                if docs:
+                    contents = tuple(doc.content for doc in docs)
+                    id_paths = tuple(doc.id_path for doc in docs)
+                    page_urls = tuple(
+                        to_url(doc.output_path, base=base_url)
+                        for doc in docs
+                    )
+                    if executor is not None:
+                        urls = executor.submit(_extract_urls, contents)
+                    else:
+                        urls = _extract_urls(contents)
+                    pending.append((id_paths, page_urls, urls))
+                yield from batch
+            for id_paths, page_urls, urls in pending:
+                if executor is not None:
+                    urls = urls.result()
+                for id_path, page_url, doc_urls in zip(
+                    id_paths, page_urls, urls
+                ):
+                    bad = tuple(
+                        url for url in dict.fromkeys(doc_urls)
+                        if index.is_broken(url, page_url)
+                    )
+                    if bad:
+                        broken[id_path] = bad
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    return scan(things), broken
+
+
+def format_report(broken):
+    """
+    Format broken links as plain text, grouped by source doc.
+    """
+    lines = []
+    for id_path in sorted(broken):
+        lines.append(id_path)
+        for url in broken[id_path]:
+            lines.append("  " + url)
+    return "\n".join(lines)
+
+
+def raise_broken(broken):
+    """
+    Raise a `BrokenLinksError` if there are any broken links.
+    """
+    if broken:
+        count = sum(len(urls) for urls in broken.values())
+        msg = "{count} broken links in {docs} docs:\n{report}".format(
+            count=count,
+            docs=len(broken),
+            report=format_report(broken)
+        )
+        raise BrokenLinksError(msg, broken)
+
+
+def print_broken(broken):
+    """
+    Print a report of broken links, if there are any.
+    """
+    if broken:
+        print("Broken links:\n" + format_report(broken))
+
+
+def validate_links(base_url, on_broken=raise_broken, jobs=None):
+    """
+    Create a stage that checks internal links between docs and files
+    as they stream by, and calls `on_broken(broken)` once they have all
+    gone by. `broken` is a dict of `{id_path: (url, ...)}`.
+
+    By default, raises a `BrokenLinksError`. Use `print_broken` to just
+    print a report.
+    """
+    def validate(things):
+        checked, broken = find_broken(things, base_url, jobs=jobs)
+        yield from checked
+        on_broken(broken)
+    return validate
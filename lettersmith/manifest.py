@@ -0,0 +1,221 @@
+"""
+Tools for recording what a build wrote, and what changed since the
+last build.
+
+A manifest maps each output path to its size, digest, ETag, content
+type and the `id_path` of the doc or file it came from. It is recorded
+while files are written, from the same bytes the writer writes, so
+nothing is read back from disk.
+
+Example:
+
+    write = manifest.writer()
+    stats = write(chain(static, rendered_docs), directory="public")
+    print(stats["added"], stats["changed"], stats["removed"])
+
+The manifest is saved next to the output directory
+(`public.manifest.json`). The next build compares against it, so
+deploy tools can upload only what changed, and purge only changed and
+removed paths from a CDN.
+"""
+import hashlib
+import json
+import mimetypes
+from collections import namedtuple
+from pathlib import Path, PurePath
+from lettersmith.cache import write_atomic
+from lettersmith.io import read_blob
+from lettersmith.write import writer as _writer, writeable as _writeable
+
+
+Entry = namedtuple("Entry", (
+    "output_path", "size", "digest", "content_type", "id_path"
+))
+Entry.__doc__ = """
+A manifest entry for one output file. `digest` is a SHA-1 hex digest
+of the file's bytes. `id_path` is the doc or file it came from, or None.
+"""
+
+
+Diff = namedtuple("Diff", ("added", "changed", "removed"))
+Diff.__doc__ = """
+The output paths added, changed and removed between two manifests,
+each as a sorted tuple.
+"""
+
+
+_CHUNK_SIZE = 1 << 16
+
+
+def etag(entry):
+    """
+    Get an HTTP ETag for a manifest entry.
+    """
+    return '"{}"'.format(entry.digest)
+
+
+def content_type(output_path):
+    """
+    Guess the content type of an output path from its extension.
+    """
+    guessed, encoding = mimetypes.guess_type(str(output_path))
+    return guessed if guessed is not None else "application/octet-stream"
+
+
+def _digest_blob(blob):
+    """
+    Get the size and SHA-1 digest of a blob. Blobs that are paths
+    (lazy files) are read in chunks.
+    """
+    if isinstance(blob, PurePath):
+        sha1 = hashlib.sha1()
+        size = 0
+        with open(blob, "rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+                sha1.update(chunk)
+                size = size + len(chunk)
+        return size, sha1.hexdigest()
+    return len(blob), hashlib.sha1(blob).hexdigest()
+
+
+def entry(output_path, blob, id_path=None):
+    """
+    Create a manifest entry for a `(output_path, blob)` pair.
+    """
+    size, digest = _digest_blob(blob)
+    return Entry(
+        output_path=PurePath(output_path).as_posix(),
+        size=size,
+        digest=digest,
+        content_type=content_type(output_path),
+        id_path=id_path
+    )
+
+
+def recording(writeable, manifest):
+    """
+    Wrap a `writeable` function so it records an `Entry` for every
+    `(output_path, blob)` it returns in `manifest` (a dict of output
+    path to `Entry`). The wrapped function can be passed to any writer.
+
+    Blobs that are paths (lazy files) are read once, and the bytes that
+    were recorded are passed on to the writer, so the file isn't read a
+    second time to be copied.
+    """
+    def record(thing):
+        output_path, blob = writeable(thing)
+        blob = read_blob(blob)
+        item = entry(output_path, blob, getattr(thing, "id_path", None))
+        manifest[item.output_path] = item
+        return output_path, blob
+    return record
+
+
+def diff(old, new):
+    """
+    Compare two manifests. Returns a `Diff`. A path is changed if its
+    digest changed.
+    """
+    return Diff(
+        added=tuple(sorted(path for path in new if path not in old)),
+        changed=tuple(sorted(
+            path for path, item in new.items()
+            if path in old and old[path].digest != item.digest
+        )),
+        removed=tuple(sorted(path for path in old if path not in new))
+    )
+
+
+def to_json(manifest):
+    """
+    Serialize a manifest as JSON-serializable data.
+    """
+    return {
+        "@type": "manifest",
+        "files": {
+            path: {
+                "size": item.size,
+                "digest": item.digest,
+                "etag": etag(item),
+                "content_type": item.content_type,
+                "id_path": item.id_path
+            }
+            for path, item in sorted(manifest.items())
+        }
+    }
+
+
+def from_json(data):
+    """
+    Read a manifest from data made by `to_json`.
+    """
+    return {
+        path: Entry(
+            output_path=path,
+            size=row["size"],
+            digest=row["digest"],
+            content_type=row["content_type"],
+            id_path=row["id_path"]
+        )
+        for path, row in data["files"].items()
+    }
+
+
+def dump(manifest, pathlike):
+    """
+    Write a manifest to a JSON file.
+    """
+    data = json.dumps(to_json(manifest), indent=2)
+    write_atomic(pathlike, data.encode("utf-8"))
+
+
+def load(pathlike):
+    """
+    Read a manifest from a JSON file written by `dump`.
+    Returns an empty manifest if the file doesn't exist.
+    """
+    try:
+        with open(pathlike, "r") as f:
+            return from_json(json.load(f))
+    except FileNotFoundError:
+        return {}
+
+
+def manifest_path(directory):
+    """
+    Get the default manifest path for an output directory or archive:
+    a `.manifest.json` file next to it.
+    """
+    path = Path(directory)
+    return path.with_name(path.name + ".manifest.json")
+
+
+def writer(
+    writeable=_writeable,
+    make_writer=_writer,
+    path=None
+):
+    """
+    Create a `write` function that records a manifest of what it writes.
+
+    Files are written by `make_writer(writeable)` (e.g. `write.writer`,
+    `write.threaded_writer` or `write.snapshot_writer`). Once they are
+    written, the manifest is compared with the previous build's
+    manifest, then saved in its place, at `path` (or next to the output
+    directory, if None).
+
+    Returns the writer's stats, plus the `Diff` fields: `added`,
+    `changed` and `removed`.
+    """
+    def write(things, directory):
+        """
+        Write files to `directory`, and save a manifest of them.
+        """
+        file_path = path if path is not None else manifest_path(directory)
+        previous = load(file_path)
+        manifest = {}
+        stats = make_writer(recording(writeable, manifest))(things, directory)
+        changes = diff(previous, manifest)
+        dump(manifest, file_path)
+        return {**stats, **changes._asdict()}
+    return write
@@ -0,0 +1,403 @@
+"""
+Tools for working with markdown as a parsed syntax tree.
+
+`parse` parses each doc's markdown content once, and keeps the
+commonmark AST on `doc.meta["ast"]`. Later stages read structure from
+the tree instead of re-parsing text:
+
+- `heading_ids` gives every heading a unique `id` attribute
+- `toc` builds a table of contents from headings
+- `summary` reads a summary from the first sentence of text
+- `annotate_links` finds wikilinks in text (but not in code)
+- `render` renders the tree (and wikilinks) to HTML content, and
+  removes the tree from meta
+
+`content_markdown` does all of the above, like
+`wikidoc.content_markdown`, but parses each doc once.
+
+The tree is a commonmark tree, so this only works with the "commonmark"
+`markdowntools` backend. If another backend is selected,
+`content_markdown` falls back to `wikidoc.content_markdown` with that
+backend.
+
+Example:
+
+    compose(
+        markdownast.render(base_url),
+        markdownast.toc,
+        markdownast.parse
+    )
+"""
+import re
+from collections import namedtuple
+from html import escape
+from commonmark import Parser
+from commonmark.render.html import HtmlRenderer
+from lettersmith import doc as Doc
+from lettersmith import stub as Stub
+from lettersmith import query
+from lettersmith import wikidoc
+from lettersmith import wikimarkup
+from lettersmith import markdowntools
+from lettersmith.path import to_slug
+from lettersmith.lens import lens_compose, key, get, put
+from lettersmith.func import compose, composable, rest
+from lettersmith.stringtools import first_sentence
+
+
+# The markdowntools backend that parses to the same tree as `parse`
+AST_BACKEND = "commonmark"
+
+
+meta_ast = lens_compose(Doc.meta, key("ast", None))
+meta_toc = lens_compose(Doc.meta, key("toc", ()))
+
+
+Heading = namedtuple("Heading", ("level", "title", "id"))
+Heading.__doc__ = """
+A table of contents entry for a heading.
+`id` is the heading's `id` attribute, for use in `#fragment` links.
+"""
+
+
+_TRANSCLUDE = re.compile(r'^\s*\[\[([^\]]+)\]\]\s*$')
+
+
+def _merge_text(ast):
+    """
+    Merge runs of adjacent text nodes into one node.
+
+    The commonmark parser splits text at every `[` and `]`, so a wikilink
+    ends up spread across several nodes. Merging them means wikilinks can
+    be found in a single text literal.
+    """
+    text_nodes = [
+        node for node, entering in ast.walker()
+        if entering and node.t == "text"
+    ]
+    for node in text_nodes:
+        prev = node.prv
+        if prev is not None and prev.t == "text":
+            prev.literal = prev.literal + node.literal
+            node.unlink()
+    return ast
+
+
+def parse_markdown(text):
+    """
+    Parse markdown text into a commonmark AST.
+    """
+    return _merge_text(Parser().parse(text))
+
+
+def _parse_doc(doc):
+    if get(meta_ast, doc) is not None:
+        return doc
+    return put(meta_ast, doc, parse_markdown(doc.content))
+
+
+parse = query.maps(Doc.annotate_exceptions(_parse_doc))
+
+
+def _ast(doc):
+    ast = get(meta_ast, doc)
+    if ast is None:
+        ast = parse_markdown(doc.content)
+    return ast
+
+
+def _transclude(node):
+    """
+    If paragraph node contains nothing but a wikilink, return it as a
+    `(slug, title)` tuple. Otherwise, return None.
+    """
+    child = node.first_child
+    if child is None or child.t != "text" or child.nxt is not None:
+        return None
+    if not _TRANSCLUDE.match(child.literal):
+        return None
+    return wikimarkup.parse_wikilink(child.literal)
+
+
+def _plain_text(node):
+    """
+    Get the plain text under a node. Wikilinks are replaced by their
+    title, and transcludes are left out.
+    """
+    parts = []
+    for child, entering in node.walker():
+        if not entering:
+            if child.is_container() and child.t not in (
+                "emph", "strong", "link", "image"
+            ):
+                parts.append("\n")
+            continue
+        if child.t == "paragraph" and _transclude(child):
+            continue
+        if child.t == "text":
+            if child.parent.t == "paragraph" and _transclude(child.parent):
+                continue
+            # Transclude paragraphs are skipped above. Every other
+            # wikilink is inline, even if it is the whole text node.
+            parts.append(wikimarkup.wikilink_titles(child.literal))
+        elif child.t == "code":
+            parts.append(child.literal)
+        elif child.t in ("softbreak", "linebreak"):
+            parts.append("\n")
+    return "".join(parts)
+
+
+def _headings(ast):
+    """
+    Walk headings in the tree, giving each one a unique id, if it doesn't
+    have one already. Yields `Heading`s in document order.
+    """
+    seen = {}
+    for node, entering in ast.walker():
+        if not entering or node.t != "heading":
+            continue
+        title = _plain_text(node).strip()
+        heading_id = getattr(node, "heading_id", None)
+        if heading_id is None:
+            slug = to_slug(title) or "section"
+            count = seen.get(slug, 0)
+            heading_id = slug if count == 0 else "{}-{}".format(slug, count)
+            seen[slug] = count + 1
+            node.heading_id = heading_id
+        yield Heading(level=node.level, title=title, id=heading_id)
+
+
+def headings(doc):
+    """
+    Get the headings for a doc, as a tuple of `Heading`s.
+    """
+    return tuple(_headings(_ast(doc)))
+
+
+@Doc.annotate_exceptions
+def _heading_ids_doc(doc):
+    for heading in _headings(get(meta_ast, doc)):
+        pass
+    return doc
+
+
+heading_ids = compose(query.maps(_heading_ids_doc), parse)
+heading_ids.__doc__ = """
+Give every heading in the tree a unique id attribute, made from its
+title. Duplicate titles get a numbered suffix.
+"""
+
+
+@Doc.annotate_exceptions
+def _toc_doc(doc):
+    return put(meta_toc, doc, headings(doc))
+
+
+toc = compose(query.maps(_toc_doc), parse)
+toc.__doc__ = """
+Annotate docs with a table of contents at `doc.meta["toc"]`.
+This is a flat tuple of `Heading`s. Use `heading.level` to nest them.
+Also gives headings id attributes, so TOC entries can link to them.
+"""
+
+
+def read_summary(doc):
+    """
+    Read a summary from the first sentence of text in a parsed doc.
+    """
+    return first_sentence(_plain_text(_ast(doc)).strip())
+
+
+@Doc.annotate_exceptions
+def _summary_doc(doc):
+    if get(Doc.meta_summary, doc):
+        return doc
+    return put(Doc.meta_summary, doc, read_summary(doc))
+
+
+summary = compose(query.maps(_summary_doc), parse)
+summary.__doc__ = """
+Set `doc.meta["summary"]` from the first sentence of the doc.
+If doc already has a summary, it is left alone.
+"""
+
+
+def find_wikilinks(doc):
+    """
+    Find the wikilinks in a parsed doc. Only text and raw HTML are
+    searched, so wikilinks in code spans and code blocks are ignored.
+
+    Returns an iterator of `(slug, title)` tuples.
+    """
+    for node, entering in _ast(doc).walker():
+        if entering and node.t in ("text", "html_block", "html_inline"):
+            yield from wikimarkup.find_wikilinks(node.literal)
+
+
+def annotate_links(docs, registry=None):
+    """
+    Annotate docs with links and backlinks, like
+    `wikidoc.annotate_links`, but reading wikilinks from the tree.
+    """
+    return wikidoc.annotate_links(
+        docs,
+        registry=registry,
+        find_wikilinks=find_wikilinks
+    )
+
+
+_WIKILINK = re.compile(wikimarkup.WIKILINK)
+
+
+class WikiHtmlRenderer(HtmlRenderer):
+    """
+    A commonmark HTML renderer that renders wikilinks in text and raw
+    HTML, and heading id attributes.
+
+    `render_wikilink` is a function of `(slug, title, type)` that returns
+    an HTML string, like the one returned by `wikidoc.link_renderer`.
+    """
+    def __init__(self, render_wikilink, options={}):
+        super().__init__(options)
+        self.render_wikilink = render_wikilink
+        # Raw HTML is rendered like the rendered HTML in
+        # `wikidoc.content_wikilinks`, including transcludes.
+        self.render_html_wikilinks = wikimarkup.renderer(render_wikilink)
+
+    def html_inline(self, node, entering):
+        if self.options.get("safe"):
+            super().html_inline(node, entering)
+        else:
+            self.lit(self.render_html_wikilinks(node.literal))
+
+    def html_block(self, node, entering):
+        if self.options.get("safe"):
+            super().html_block(node, entering)
+        else:
+            self.cr()
+            self.lit(self.render_html_wikilinks(node.literal))
+            self.cr()
+
+    def heading(self, node, entering):
+        tagname = "h" + str(node.level)
+        attrs = self.attrs(node)
+        heading_id = getattr(node, "heading_id", None)
+        if heading_id is not None:
+            attrs.append(["id", escape(heading_id)])
+        if entering:
+            self.cr()
+            self.tag(tagname, attrs)
+        else:
+            self.tag("/" + tagname)
+            self.cr()
+
+    def paragraph(self, node, entering):
+        if _transclude(node):
+            self.cr()
+        else:
+            super().paragraph(node, entering)
+
+    def text(self, node, entering=None):
+        if node.parent.t == "paragraph":
+            transclude = _transclude(node.parent)
+            if transclude:
+                slug, title = transclude
+                self.lit(self.render_wikilink(
+                    slug,
+                    escape(title),
+                    "transclude"
+                ))
+                return
+        pos = 0
+        for match in _WIKILINK.finditer(node.literal):
+            self.out(node.literal[pos:match.start()])
+            slug, title = wikimarkup.parse_wikilink(match.group(0))
+            self.lit(self.render_wikilink(slug, escape(title), "inline"))
+            pos = match.end()
+        self.out(node.literal[pos:])
+
+
+@composable
+def render(
+    docs,
+    base_url,
+    link_template=wikidoc._LINK_TEMPLATE,
+    nolink_template=wikidoc._NOLINK_TEMPLATE,
+    transclude_template=wikidoc._TRANSCLUDE_TEMPLATE,
+    registry=None
+):
+    """
+    Render parsed docs to HTML content, including wikilinks, and remove
+    the tree from `doc.meta`.
+
+    Wikilinks are resolved against the docs being rendered. Stubs for
+    linked docs are interned in `registry`, if given.
+    """
+    docs = tuple(docs)
+    registry = registry if registry is not None else Stub.Registry()
+    ids = tuple(registry.intern(doc) for doc in docs)
+    renderer = WikiHtmlRenderer(wikidoc.link_renderer(
+        registry,
+        wikidoc._index_by_slug(docs, ids),
+        base_url,
+        link_template,
+        nolink_template,
+        transclude_template
+    ))
+    for doc in docs:
+        try:
+            content = renderer.render(_ast(doc))
+        except Exception as e:
+            msg = "Error while rendering {}".format(doc.id_path)
+            raise Doc.DocException(msg) from e
+        meta = {k: v for k, v in doc.meta.items() if k != "ast"}
+        yield doc._replace(content=content, meta=meta)
+
+
+def content_markdown(
+    base_url,
+    link_template=wikidoc._LINK_TEMPLATE,
+    nolink_template=wikidoc._NOLINK_TEMPLATE,
+    transclude_template=wikidoc._TRANSCLUDE_TEMPLATE,
+    registry=None,
+    backend=None
+):
+    """
+    Render markdown and wikilinks, parsing each doc only once.
+
+    Also annotates doc meta with:
+
+    - A summary
+    - A table of contents
+    - A list of links and backlinks.
+
+    Headings get id attributes, so they can be linked to.
+
+    `backend` is the `markdowntools` backend to use (the default backend
+    if None). Only "commonmark" has a tree. With any other backend,
+    this renders with `wikidoc.content_markdown` instead, so there is no
+    table of contents, and headings don't get ids.
+    """
+    backend = backend if backend is not None else markdowntools.default()
+    if backend != AST_BACKEND:
+        return wikidoc.content_markdown(
+            base_url,
+            link_template,
+            nolink_template,
+            transclude_template,
+            registry,
+            backend=backend
+        )
+    return compose(
+        render(
+            base_url,
+            link_template,
+            nolink_template,
+            transclude_template,
+            registry
+        ),
+        rest(annotate_links, registry=registry),
+        summary,
+        toc,
+        parse
+    )
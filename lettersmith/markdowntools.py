@@ -1,9 +1,164 @@
-from commonmark import commonmark
+"""
+Tools for rendering markdown.
+
+Markdown rendering goes through a registry of backends, so you can use
+any installed markdown library. Every backend is a function that takes a
+markdown string and returns an HTML string.
+
+Built-in backends:
+
+- commonmark (the default, requires `commonmark`)
+- cmarkgfm (requires `cmarkgfm`)
+- markdown_it (requires `markdown-it-py`)
+- mistune (requires `mistune`)
+- python_markdown (requires `Markdown`)
+
+Backend libraries are only imported the first time they are used.
+Use `use` to change the default backend, or `content_with` and
+`strip_markdown_with` to render with a specific backend. See `lettersmith.benchmark` to compare speed
+and output of installed backends.
+"""
 from lettersmith.html import strip_html
 from lettersmith import docs as Docs
 from lettersmith.func import compose
 
 
-markdown = commonmark
+class BackendError(Exception):
+    pass
+
+
+def _commonmark():
+    from commonmark import commonmark
+    return commonmark
+
+
+def _cmarkgfm():
+    import cmarkgfm
+    return cmarkgfm.markdown_to_html
+
+
+def _markdown_it():
+    from markdown_it import MarkdownIt
+    return MarkdownIt("commonmark").render
+
+
+def _mistune():
+    import mistune
+    return mistune.create_markdown(escape=False)
+
+
+def _python_markdown():
+    import markdown
+    return markdown.markdown
+
+
+_factories = {
+    "commonmark": _commonmark,
+    "cmarkgfm": _cmarkgfm,
+    "markdown_it": _markdown_it,
+    "mistune": _mistune,
+    "python_markdown": _python_markdown
+}
+_renderers = {}
+_default = "commonmark"
+
+
+def register(name, factory):
+    """
+    Register a markdown backend.
+
+    `factory` is a function with no arguments that returns a render
+    function (markdown string to HTML string). It is called once, the
+    first time the backend is used, so it can import the library it
+    wraps. If the library isn't installed, it should raise ImportError.
+    """
+    _factories[name] = factory
+    _renderers.pop(name, None)
+
+
+def renderer(name):
+    """
+    Get the render function for backend `name`.
+    Raises a `BackendError` if the backend is unknown or not installed.
+    """
+    try:
+        return _renderers[name]
+    except KeyError:
+        pass
+    try:
+        factory = _factories[name]
+    except KeyError:
+        raise BackendError("Unknown markdown backend: {}".format(name))
+    try:
+        render = factory()
+    except ImportError as e:
+        raise BackendError(
+            "Markdown backend {} is not installed".format(name)
+        ) from e
+    _renderers[name] = render
+    return render
+
+
+def backends():
+    """
+    Get the names of all registered backends.
+    """
+    return tuple(_factories)
+
+
+def available():
+    """
+    Get the names of the registered backends that are installed.
+    """
+    names = []
+    for name in _factories:
+        try:
+            renderer(name)
+            names.append(name)
+        except BackendError:
+            pass
+    return tuple(names)
+
+
+def use(name):
+    """
+    Set the default markdown backend, used by `markdown`, `content`
+    and `strip_markdown`.
+    """
+    global _default
+    renderer(name)
+    _default = name
+
+
+def default():
+    """
+    Get the name of the default markdown backend.
+    """
+    return _default
+
+
+def markdown(text):
+    """
+    Render markdown text to HTML, using the default backend.
+    """
+    return renderer(_default)(text)
+
+
+def content_with(name):
+    """
+    Create a docs renderer that renders markdown content with
+    backend `name`.
+    """
+    return Docs.renderer(renderer(name))
+
+
+def strip_markdown_with(name):
+    """
+    Create a function that renders markdown text with backend `name`,
+    then strips the HTML, leaving plain text.
+    """
+    return compose(strip_html, renderer(name))
+
+
 strip_markdown = compose(strip_html, markdown)
-content = Docs.renderer(markdown)
\ No newline at end of file
+content = Docs.renderer(markdown)
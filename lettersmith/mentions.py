@@ -0,0 +1,325 @@
+"""
+Tools for finding plain-text mentions of other docs' titles.
+
+A wikilink is only made when you write `[[Title]]`. This module finds
+the places where a doc mentions another doc's title without linking to
+it, so you can list them ("unlinked mentions"), or turn them into
+wikilinks before `wikidoc.content_wikilinks` runs.
+
+Titles are matched case-insensitively, word by word, using the same
+normalization as `path.to_slug`. Every title is compiled into a single
+Aho-Corasick automaton, so each doc is scanned once, no matter how many
+titles there are.
+
+Example:
+
+    docs = pipe(
+        docs,
+        mentions.link_mentions(),
+        wikidoc.content_markdown(base_url)
+    )
+"""
+import re
+from collections import deque, namedtuple
+from functools import lru_cache
+from lettersmith import doc as Doc
+from lettersmith import stub as Stub
+from lettersmith import wikimarkup
+from lettersmith.path import to_slug
+from lettersmith.lens import lens_compose, key, put, over
+from lettersmith.func import composable
+
+
+_WORD = re.compile(r"\w+(?:['.-]\w+)*")
+
+# Words repeat a lot, so cache their slugs.
+_word_slug = lru_cache(maxsize=1 << 16)(to_slug)
+
+# Regions of content that are never scanned for mentions: wikilinks,
+# code, HTML tags, HTML links, markdown links and bare URLs.
+_SKIP = re.compile(
+    r"\[\[[^\]]+\]\]"
+    r"|```.*?```"
+    r"|`[^`\n]*`"
+    r"|<a\b.*?</a>"
+    r"|<[^>]+>"
+    r"|\[[^\]]*\]\([^)]*\)"
+    r"|\w+://\S+",
+    flags=re.DOTALL | re.IGNORECASE
+)
+
+
+Mention = namedtuple("Mention", ("slug", "start", "end", "text"))
+Mention.__doc__ = """
+A plain-text mention of a title. `slug` is the slug of the mentioned
+title. `start` and `end` are offsets of the mention in the scanned text,
+and `text` is the mention, as written.
+"""
+
+
+def words(text):
+    """
+    Split text into normalized words, with their offsets.
+    Yields `(word, start, end)` tuples.
+    """
+    for match in _WORD.finditer(text):
+        word = _word_slug(match.group(0))
+        if word:
+            yield word, match.start(), match.end()
+
+
+def title_words(title):
+    """
+    Get the tuple of normalized words for a title.
+    """
+    return tuple(word for word, start, end in words(title))
+
+
+class Automaton:
+    """
+    An Aho-Corasick automaton over sequences of words.
+
+    Add patterns with `add`, then call `build` once before searching.
+    `find` scans a sequence of words in one pass, and reports every
+    pattern that occurs in it, including overlapping ones.
+    """
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]
+        self._output_link = [-1]
+        self._built = False
+
+    def __len__(self):
+        return sum(1 for output in self._output if output is not None)
+
+    def add(self, pattern, value):
+        """
+        Add a pattern (a tuple of words) with a value. If the pattern was
+        already added, the first value is kept.
+        """
+        if self._built:
+            raise ValueError("Can't add patterns after the automaton is built")
+        if not pattern:
+            return
+        node = 0
+        for word in pattern:
+            try:
+                node = self._goto[node][word]
+            except KeyError:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._output_link.append(-1)
+                self._goto[node][word] = len(self._goto) - 1
+                node = len(self._goto) - 1
+        if self._output[node] is None:
+            self._output[node] = (len(pattern), value)
+
+    def build(self):
+        """
+        Compute failure links, breadth-first. Returns the automaton.
+        """
+        goto, fail = self._goto, self._fail
+        output, output_link = self._output, self._output_link
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for word, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and word not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(word, 0)
+                if fail[child] == child:
+                    fail[child] = 0
+                link = fail[child]
+                output_link[child] = (
+                    link if output[link] is not None else output_link[link]
+                )
+        self._built = True
+        return self
+
+    def find(self, sequence):
+        """
+        Find every pattern in a sequence of words.
+        Yields `(start, end, value)` tuples, where `start` and `end` are
+        word indexes.
+        """
+        if not self._built:
+            self.build()
+        goto, fail = self._goto, self._fail
+        output, output_link = self._output, self._output_link
+        node = 0
+        for i, word in enumerate(sequence):
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            hit = node if output[node] is not None else output_link[node]
+            while hit > 0:
+                length, value = output[hit]
+                yield i + 1 - length, i + 1, value
+                hit = output_link[hit]
+
+
+def automaton(titles, min_length=3):
+    """
+    Build an `Automaton` that matches `titles`. Each title's value is
+    its slug. Titles with slugs shorter than `min_length` characters
+    are skipped, since they would match almost everywhere.
+    """
+    matcher = Automaton()
+    for title in titles:
+        slug = to_slug(title)
+        if len(slug) >= min_length:
+            matcher.add(title_words(title), slug)
+    return matcher.build()
+
+
+def _segments(text):
+    """
+    Yield `(start, end)` spans of text outside of `_SKIP` regions.
+    """
+    pos = 0
+    for match in _SKIP.finditer(text):
+        yield pos, match.start()
+        pos = match.end()
+    yield pos, len(text)
+
+
+def _find_mentions(matcher, text, skip):
+    """
+    Yield mentions in order, resolving overlaps as it goes. `skip` is
+    checked for each mention as it is reached, so the caller can add to
+    it while iterating.
+    """
+    for seg_start, seg_end in _segments(text):
+        spans = tuple(words(text[seg_start:seg_end]))
+        if not spans:
+            continue
+        matches = sorted(
+            matcher.find(word for word, start, end in spans),
+            key=lambda match: (match[0], -match[1])
+        )
+        last = 0
+        for start, end, slug in matches:
+            if start < last or slug in skip:
+                continue
+            last = end
+            first = seg_start + spans[start][1]
+            stop = seg_start + spans[end - 1][2]
+            yield Mention(slug, first, stop, text[first:stop])
+
+
+def find_mentions(matcher, text, skip=frozenset()):
+    """
+    Find mentions of titles in text, using `matcher` (an `Automaton`).
+    Wikilinks, code, links and HTML tags are skipped.
+
+    Mentions of slugs in `skip` are dropped before overlaps are
+    resolved, so a skipped mention doesn't hide a shorter mention
+    inside it. Where the remaining mentions overlap, the longest one
+    that starts first wins. Returns a tuple of `Mention`s, in order.
+    """
+    return tuple(_find_mentions(matcher, text, skip))
+
+
+_empty = tuple()
+meta_unlinked_mentions = lens_compose(
+    Doc.meta,
+    key("unlinked_mentions", _empty)
+)
+
+
+def _linked_slugs(doc):
+    return frozenset(
+        slug for slug, title in wikimarkup.find_wikilinks(doc.content)
+    )
+
+
+@composable
+def annotate_mentions(docs, min_length=3, registry=None):
+    """
+    Annotate docs with the docs they mention by title, but don't link
+    to. Mentioned docs are put in `meta["unlinked_mentions"]`, as a
+    sequence of `Stub`s, in the order they are first mentioned.
+
+    Stubs are interned in `registry` (a `stub.Registry`), if given.
+    """
+    docs = tuple(docs)
+    registry = registry if registry is not None else Stub.Registry()
+    slug_to_id = {
+        to_slug(doc.title): registry.intern(doc)
+        for doc in docs
+    }
+    matcher = automaton((doc.title for doc in docs), min_length)
+    for doc in docs:
+        skip = _linked_slugs(doc) | {to_slug(doc.title)}
+        mentioned = {}
+        for mention in find_mentions(matcher, doc.content, skip):
+            mentioned.setdefault(mention.slug, slug_to_id[mention.slug])
+        yield put(
+            meta_unlinked_mentions,
+            doc,
+            registry.stub_list(mentioned.values())
+        )
+
+
+def _wikilink(mention):
+    if to_slug(mention.text) == mention.slug:
+        return "[[{}]]".format(mention.text)
+    return "[[{} | {}]]".format(mention.slug, mention.text)
+
+
+def mention_linker(titles, self_title=None, first_only=True, min_length=3):
+    """
+    Create a function that rewrites plain-text mentions of `titles` in
+    text into `[[wikilinks]]`. Mentions of `self_title` and titles
+    that are already wikilinked in the text are left alone.
+
+    If `first_only` is true, only the first mention of each title
+    is linked.
+    """
+    matcher = automaton(titles, min_length)
+    def link_text(text, self_title=self_title):
+        skip = set(slug for slug, title in wikimarkup.find_wikilinks(text))
+        if self_title is not None:
+            skip.add(to_slug(self_title))
+        chunks = []
+        pos = 0
+        # Titles linked so far are added to `skip` as we go, so a later,
+        # longer mention of one doesn't hide a shorter mention inside it.
+        for mention in _find_mentions(matcher, text, skip):
+            if first_only:
+                skip.add(mention.slug)
+            chunks.append(text[pos:mention.start])
+            chunks.append(_wikilink(mention))
+            pos = mention.end
+        chunks.append(text[pos:])
+        return "".join(chunks)
+    return link_text
+
+
+@composable
+def link_mentions(docs, first_only=True, min_length=3):
+    """
+    Rewrite plain-text mentions of other docs' titles into
+    `[[wikilinks]]`, so `wikidoc.content_wikilinks` links them.
+    Run it before rendering wikilinks.
+
+    A doc's mentions of its own title, and of titles it already
+    wikilinks to, are left alone. If `first_only` is true, only the
+    first mention of each title in a doc is linked.
+    """
+    docs = tuple(docs)
+    link_text = mention_linker(
+        (doc.title for doc in docs),
+        first_only=first_only,
+        min_length=min_length
+    )
+    for doc in docs:
+        yield over(
+            Doc.content,
+            lambda content: link_text(content, self_title=doc.title),
+            doc
+        )
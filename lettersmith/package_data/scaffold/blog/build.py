@@ -11,7 +11,7 @@ site_description = "A very cool website"
 site_author = "A very cool person"
 
 # Load data directory
-template_data = data.find("data")
+template_data = data.lazy("data")
 
 # Load static and binary files
 static = files.find("static/**/*")
@@ -1,6 +1,10 @@
 from urllib.parse import urlparse, urljoin
-from pathlib import Path, PurePath
+from pathlib import Path, PurePath, PurePosixPath
+from collections import namedtuple
+from fnmatch import translate
+import os
 import re
+from lettersmith.date import stat_file_times
 from lettersmith.func import compose
 from lettersmith.lens import Lens, put
 from lettersmith import query
@@ -232,4 +236,173 @@ def glob_all(pathlike, globs):
     realpath = Path(pathlike)
     for glob_pattern in globs:
         for p in realpath.glob(glob_pattern):
-            yield p
\ No newline at end of file
+            yield p
+
+
+FileEntry = namedtuple("FileEntry", ("path", "created", "modified"))
+FileEntry.__doc__ = """
+A file found by `walk_files`. `path` is a path string, `created` and
+`modified` are datetimes, read from the directory scan.
+"""
+
+
+# Matcher for a `*` path part, which matches any name
+_match_any = re.compile(translate("*")).match
+
+
+def _compile_part(part):
+    if part == "**":
+        return None
+    elif part == "*":
+        return _match_any
+    return re.compile(translate(part)).match
+
+
+def _compile_glob(glob):
+    """
+    Compile a glob pattern into a tuple of matchers, one per path part.
+    `**` is compiled to None, meaning "any number of directories".
+    """
+    return tuple(_compile_part(part) for part in PurePosixPath(glob).parts)
+
+
+def _match_parts(matchers, parts, i=0, j=0):
+    """
+    Check if all path `parts` match the compiled glob `matchers`.
+    """
+    if i == len(matchers):
+        return j == len(parts)
+    match = matchers[i]
+    if match is None:
+        return any(
+            _match_parts(matchers, parts, i + 1, k)
+            for k in range(j, len(parts) + 1)
+        )
+    return (
+        j < len(parts)
+        and match(parts[j]) is not None
+        and _match_parts(matchers, parts, i + 1, j + 1)
+    )
+
+
+def _could_contain(matchers, parts, i=0, j=0):
+    """
+    Check if a directory with path `parts` could contain files matching
+    the compiled glob `matchers`.
+    """
+    if j == len(parts):
+        return i < len(matchers)
+    if i == len(matchers):
+        return False
+    match = matchers[i]
+    if match is None:
+        return True
+    return (
+        match(parts[j]) is not None
+        and _could_contain(matchers, parts, i + 1, j + 1)
+    )
+
+
+def _matches_anything(matchers):
+    """
+    Check if the rest of a compiled glob matches every file path:
+    `**`, or `**/*`.
+    """
+    if not matchers or matchers[-1] is None:
+        return bool(matchers) and all(m is None for m in matchers)
+    return (
+        len(matchers) > 1
+        and matchers[-1] is _match_any
+        and all(m is None for m in matchers[:-1])
+    )
+
+
+def _covers(matchers, parts, i=0, j=0):
+    """
+    Check if the compiled glob `matchers` matches every file under a
+    directory with path `parts`, so the directory can be skipped.
+    """
+    if j == len(parts):
+        return _matches_anything(matchers[i:])
+    if i == len(matchers):
+        return False
+    match = matchers[i]
+    if match is None:
+        return (
+            _covers(matchers, parts, i + 1, j)
+            or _covers(matchers, parts, i, j + 1)
+        )
+    return (
+        match(parts[j]) is not None
+        and _covers(matchers, parts, i + 1, j + 1)
+    )
+
+
+def _entry_name(entry):
+    return entry.name
+
+
+def _walk(dir_path, parts, includes, excludes, ancestors=frozenset()):
+    try:
+        with os.scandir(dir_path) as scan:
+            entries = sorted(scan, key=_entry_name)
+        stat = os.stat(dir_path)
+    except OSError:
+        return
+    # Directories on the current path, to stop symlink loops
+    ancestors = ancestors | {(stat.st_dev, stat.st_ino)}
+    for entry in entries:
+        child = parts + (entry.name,)
+        if entry.is_dir():
+            if (
+                any(_could_contain(m, child) for m in includes)
+                and not any(_covers(m, child) for m in excludes)
+            ):
+                try:
+                    entry_stat = entry.stat()
+                except OSError:
+                    continue
+                if (entry_stat.st_dev, entry_stat.st_ino) not in ancestors:
+                    yield from _walk(
+                        entry.path,
+                        child,
+                        includes,
+                        excludes,
+                        ancestors
+                    )
+        elif (
+            entry.is_file()
+            and any(_match_parts(m, child) for m in includes)
+            and not any(_match_parts(m, child) for m in excludes)
+        ):
+            yield entry, child
+
+
+def walk_files(directory, globs, exclude=()):
+    """
+    Find files under `directory` that match any of the glob patterns in
+    `globs`, and none of the patterns in `exclude`. Patterns are relative
+    to `directory`, and support `**` like `Path.glob`.
+
+    The directory tree is scanned once for all patterns. Directories
+    that can't contain a match, or that are entirely excluded (like
+    `node_modules/**`), are skipped without being scanned. Symlinked
+    directories are followed, but a symlink back to a directory that
+    is already being walked is skipped. File type and times are read
+    from the scan, so no extra `stat` calls are made per file.
+
+    Returns a generator of `FileEntry`, sorted by path.
+    """
+    includes = tuple(_compile_glob(glob) for glob in globs)
+    excludes = tuple(_compile_glob(glob) for glob in exclude)
+    for entry, parts in _walk(str(directory), (), includes, excludes):
+        created, modified = stat_file_times(entry.stat())
+        yield FileEntry(str(PurePath(directory, *parts)), created, modified)
+
+
+def match_glob(pathlike, glob):
+    """
+    Check if a relative path matches a glob pattern, using the same
+    rules as `walk_files` (`**` matches any number of directories).
+    """
+    return _match_parts(_compile_glob(glob), PurePosixPath(pathlike).parts)
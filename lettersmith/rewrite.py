@@ -0,0 +1,266 @@
+"""
+Tools for rewriting tags in rendered HTML, in a single pass.
+
+`rewrite_html` tokenizes each doc's content once, and hands every start
+tag to a list of rewriters. A rewriter is any function that takes
+`(tag, doc, patch)` and returns a tag, either the same one or a new one.
+
+- `tag` is a `Tag` namedtuple.
+- `doc` is the doc being rewritten (read-only).
+- `patch` is a dict. Anything a rewriter puts in it is mixed into
+  `doc.meta` once the scan is finished.
+
+Only tags that a rewriter changes are re-serialized. Everything else,
+including comments and the contents of `<script>` and `<style>`, is
+copied through untouched.
+
+Example:
+
+    rewrite_html(
+        qualify_urls(base_url),
+        collect_urls("urls"),
+        inject_attrs("img", {"loading": "lazy"})
+    )
+"""
+import re
+from collections import namedtuple
+from html import escape
+from lettersmith import doc as Doc
+from lettersmith import query
+from lettersmith import path as pathtools
+
+
+Tag = namedtuple("Tag", ("name", "attrs", "closed"))
+Tag.__doc__ = """
+A start tag. `attrs` is a tuple of `(name, value)` pairs, in source
+order. `value` is None for bare attributes like `<input disabled>`.
+Values are kept exactly as written in the source, entities and all.
+`closed` is True for self-closing tags like `<br/>`.
+"""
+
+
+URL_ATTRS = ("href", "src")
+
+
+_TOKEN = re.compile(
+    r"""
+    (?P<comment><!--.*?-->)
+    |<(?P<name>[a-zA-Z][a-zA-Z0-9:-]*)
+    (?P<attrs>(?:[^>"']|"[^"]*"|'[^']*')*?)
+    (?P<closed>/?)>
+    """,
+    flags=re.DOTALL | re.VERBOSE
+)
+
+_ATTR = re.compile(
+    r"""([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?"""
+)
+
+_RAW_TEXT_ELS = ("script", "style")
+
+
+def _parse_attrs(attrs_str):
+    attrs = []
+    for match in _ATTR.finditer(attrs_str):
+        name, double, single, bare = match.groups()
+        if double is not None:
+            value = double
+        elif single is not None:
+            value = single
+        else:
+            value = bare
+        attrs.append((name, value))
+    return tuple(attrs)
+
+
+def _render_attr(name, value):
+    if value is None:
+        return " " + name
+    return ' {name}="{value}"'.format(
+        name=name,
+        value=value.replace('"', "&quot;")
+    )
+
+
+def render_tag(tag):
+    """
+    Render a `Tag` as an HTML start tag string.
+    """
+    return "<{name}{attrs}{closed}>".format(
+        name=tag.name,
+        attrs="".join(_render_attr(k, v) for k, v in tag.attrs),
+        closed=" /" if tag.closed else ""
+    )
+
+
+def get_attr(tag, name, default=None):
+    """
+    Get the value of attribute `name` (case insensitive) on a tag.
+    """
+    name = name.lower()
+    for k, v in tag.attrs:
+        if k.lower() == name:
+            return v
+    return default
+
+
+def has_attr(tag, name):
+    """
+    Check if tag has attribute `name` (case insensitive).
+    """
+    name = name.lower()
+    return any(k.lower() == name for k, v in tag.attrs)
+
+
+def set_attr(tag, name, value):
+    """
+    Set attribute `name` on a tag, replacing any existing value.
+    Returns a new tag. If the value is unchanged, returns the same tag.
+    """
+    lower = name.lower()
+    attrs = []
+    found = False
+    for k, v in tag.attrs:
+        if k.lower() == lower:
+            if found:
+                continue
+            found = True
+            if v == value:
+                return tag
+            attrs.append((k, value))
+        else:
+            attrs.append((k, v))
+    if not found:
+        attrs.append((name, value))
+    return tag._replace(attrs=tuple(attrs))
+
+
+def rewrite_content(content, rewriters, doc=None, patch=None):
+    """
+    Rewrite the start tags in an HTML string with a sequence of rewriters,
+    scanning the string once.
+
+    Returns the rewritten string.
+    """
+    patch = patch if patch is not None else {}
+    out = []
+    pos = 0
+    end = len(content)
+    while pos < end:
+        match = _TOKEN.search(content, pos)
+        if match is None:
+            break
+        if match.group("comment") is not None:
+            out.append(content[pos:match.end()])
+            pos = match.end()
+            continue
+        out.append(content[pos:match.start()])
+        original = Tag(
+            name=match.group("name"),
+            attrs=_parse_attrs(match.group("attrs")),
+            closed=match.group("closed") == "/"
+        )
+        tag = original
+        for rewriter in rewriters:
+            tag = rewriter(tag, doc, patch)
+        out.append(
+            match.group(0) if tag is original else render_tag(tag)
+        )
+        pos = match.end()
+        if tag.name.lower() in _RAW_TEXT_ELS and not tag.closed:
+            close = re.compile(
+                "</{}\\s*>".format(tag.name),
+                flags=re.IGNORECASE
+            ).search(content, pos)
+            raw_end = close.start() if close is not None else end
+            out.append(content[pos:raw_end])
+            pos = raw_end
+    out.append(content[pos:])
+    return "".join(out)
+
+
+def rewrite_html(*rewriters):
+    """
+    Create a stage that rewrites the HTML content of docs with
+    `rewriters`, in a single scan per doc.
+
+    Anything the rewriters put in `patch` is mixed into `doc.meta`.
+    """
+    @Doc.annotate_exceptions
+    def rewrite_doc(doc):
+        patch = {}
+        content = rewrite_content(doc.content, rewriters, doc, patch)
+        doc = doc._replace(content=content)
+        return Doc.update_meta(doc, patch) if patch else doc
+    return query.maps(rewrite_doc)
+
+
+def _url_attrs(tag, attrs):
+    for name, value in tag.attrs:
+        if value is not None and name.lower() in attrs:
+            yield name, value
+
+
+def qualify_urls(base_url, attrs=URL_ATTRS):
+    """
+    Rewriter that qualifies relative URLs in `attrs` with `base_url`.
+    See `path.qualify_url`.
+    """
+    def qualify(tag, doc, patch):
+        for name, value in tuple(_url_attrs(tag, attrs)):
+            tag = set_attr(tag, name, pathtools.qualify_url(value, base_url))
+        return tag
+    return qualify
+
+
+def fingerprint_assets(fingerprints, attrs=URL_ATTRS):
+    """
+    Rewriter that swaps asset URLs for fingerprinted ones.
+
+    `fingerprints` is a mapping of original URL to fingerprinted URL,
+    e.g. `{"/style.css": "/style.3f2a9c.css"}`. URLs that are not in
+    the mapping are left alone.
+    """
+    def fingerprint(tag, doc, patch):
+        for name, value in tuple(_url_attrs(tag, attrs)):
+            try:
+                tag = set_attr(tag, name, fingerprints[value])
+            except KeyError:
+                pass
+        return tag
+    return fingerprint
+
+
+def collect_urls(key="urls", attrs=URL_ATTRS):
+    """
+    Rewriter that collects the URLs in `attrs` into a list at
+    `doc.meta[key]`, in document order.
+    """
+    def collect(tag, doc, patch):
+        for name, value in _url_attrs(tag, attrs):
+            patch.setdefault(key, []).append(value)
+        return tag
+    return collect
+
+
+def inject_attrs(tag_name, attrs, predicate=None):
+    """
+    Rewriter that adds `attrs` (a dict) to every `tag_name` tag, unless
+    the tag already sets them. If `predicate` is given, only tags where
+    `predicate(tag)` is true are touched.
+
+    Example:
+
+        inject_attrs("img", {"loading": "lazy"})
+    """
+    tag_name = tag_name.lower()
+    def inject(tag, doc, patch):
+        if tag.name.lower() != tag_name:
+            return tag
+        if predicate is not None and not predicate(tag):
+            return tag
+        for name, value in attrs.items():
+            if not has_attr(tag, name):
+                tag = set_attr(tag, name, escape(value))
+        return tag
+    return inject
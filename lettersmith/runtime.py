@@ -0,0 +1,156 @@
+"""
+The execution context for a build.
+
+Build options like worker counts and cache directories are set once for
+the whole build, usually by `lettersmith build` on the command line,
+and read by library stages that support them. Build scripts don't have
+to pass them around.
+
+- jobs: number of workers for stages that run in parallel (e.g. `write`).
+  None means "use the stage's default".
+- cache_dir: directory for on-disk build caches.
+- incremental: if True, stages that support caching (e.g.
+  `jinjatools.jinja` and `data.lazy`) cache in `cache_dir`.
+- profile: path to write a JSON profile of the build to, or None.
+- only: a glob pattern. If set, `docs.find` and `files.find` only load
+  matching files.
+- serve: a "host:port" address. If set, `write` serves the site from
+  memory at that address, instead of writing it (see `lettersmith.serve`).
+
+Options are also copied to environment variables, so worker processes
+started during the build see the same options.
+"""
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+from lettersmith.path import match_glob
+
+
+Options = namedtuple("Options", (
+    "jobs", "cache_dir", "incremental", "profile", "only", "serve"
+))
+Options.__doc__ = """
+Build options. See `lettersmith.runtime`.
+"""
+
+
+DEFAULT_CACHE_DIR = ".lettersmith_cache"
+
+
+_ENV = {
+    "jobs": "LETTERSMITH_JOBS",
+    "cache_dir": "LETTERSMITH_CACHE_DIR",
+    "incremental": "LETTERSMITH_INCREMENTAL",
+    "profile": "LETTERSMITH_PROFILE",
+    "only": "LETTERSMITH_ONLY",
+    "serve": "LETTERSMITH_SERVE"
+}
+
+
+def create(jobs=None, cache_dir=DEFAULT_CACHE_DIR, incremental=False,
+    profile=None, only=None, serve=None):
+    """
+    Create an Options tuple, populating it with sensible defaults
+    """
+    return Options(
+        jobs=int(jobs) if jobs is not None else None,
+        cache_dir=str(cache_dir),
+        incremental=bool(incremental),
+        profile=str(profile) if profile is not None else None,
+        only=str(only) if only is not None else None,
+        serve=str(serve) if serve is not None else None
+    )
+
+
+def from_env(environ):
+    """
+    Read options from a mapping of environment variables.
+    Missing variables get default values.
+    """
+    return create(
+        jobs=environ.get(_ENV["jobs"]) or None,
+        cache_dir=environ.get(_ENV["cache_dir"]) or DEFAULT_CACHE_DIR,
+        incremental=environ.get(_ENV["incremental"]) == "1",
+        profile=environ.get(_ENV["profile"]) or None,
+        only=environ.get(_ENV["only"]) or None,
+        serve=environ.get(_ENV["serve"]) or None
+    )
+
+
+def to_env(options):
+    """
+    Get options as a dict of environment variables.
+    """
+    return {
+        _ENV["jobs"]: str(options.jobs) if options.jobs is not None else "",
+        _ENV["cache_dir"]: options.cache_dir,
+        _ENV["incremental"]: "1" if options.incremental else "",
+        _ENV["profile"]: options.profile or "",
+        _ENV["only"]: options.only or "",
+        _ENV["serve"]: options.serve or ""
+    }
+
+
+_options = from_env(os.environ)
+
+
+def options():
+    """
+    Get the current build options.
+    """
+    return _options
+
+
+@contextmanager
+def using(options):
+    """
+    Use `options` for the build inside this `with` block.
+    """
+    global _options
+    prev_options = _options
+    prev_env = {name: os.environ.get(name) for name in _ENV.values()}
+    _options = options
+    os.environ.update(to_env(options))
+    try:
+        yield options
+    finally:
+        _options = prev_options
+        for name, value in prev_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def jobs(default):
+    """
+    Get the number of workers to use, or `default` if not set.
+    """
+    return _options.jobs if _options.jobs is not None else default
+
+
+def cache_dir():
+    """
+    Get the cache directory, if incremental builds are on.
+    Otherwise, returns None.
+    """
+    return _options.cache_dir if _options.incremental else None
+
+
+def serve_address():
+    """
+    Get the `(host, port)` to serve the site on, or None if the site
+    should be written to disk.
+    """
+    if _options.serve is None:
+        return None
+    host, port = _options.serve.rsplit(":", 1)
+    return host, int(port)
+
+
+def is_selected(pathlike):
+    """
+    Check if a path is selected by the `only` option.
+    Every path is selected if `only` isn't set.
+    """
+    return _options.only is None or match_glob(pathlike, _options.only)
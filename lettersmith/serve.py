@@ -0,0 +1,268 @@
+"""
+A local preview server that serves a site from memory.
+
+Instead of writing the site to disk and running a static server, pass
+the stream of docs and files you would give to `write` to `serve`.
+Pages are looked up by output path, and the stream is only read as far
+as it takes to find the page you ask for, so pages you don't open are
+never rendered. Each response is cached in memory, with an ETag, and a
+gzipped copy for clients that accept it.
+
+Example:
+
+    serve.serve(chain(static, rendered_docs), port=8000)
+
+Or run a build script with `lettersmith serve build.py`, which serves
+whatever the script passes to `write`.
+
+Tip: build with a `base_url` of "http://localhost:8000", so absolute
+links point at the preview server.
+"""
+import gzip
+import hashlib
+import mimetypes
+import traceback
+from collections import namedtuple
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import PurePosixPath
+from threading import Lock
+from urllib.parse import urlsplit, unquote
+from lettersmith.write import writeable as _writeable
+from lettersmith.io import read_blob
+
+
+Response = namedtuple("Response", (
+    "body", "gzipped", "etag", "content_type"
+))
+Response.__doc__ = """
+A cached response for one output path. `gzipped` is None if the body
+isn't worth compressing.
+"""
+
+
+_COMPRESSIBLE = (
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "application/rss+xml",
+    "image/svg+xml"
+)
+_MIN_GZIP_SIZE = 256
+
+
+def _is_compressible(content_type):
+    return content_type.startswith("text/") or content_type in _COMPRESSIBLE
+
+
+def _content_type(output_path):
+    content_type, encoding = mimetypes.guess_type(output_path)
+    if content_type is None:
+        return "application/octet-stream"
+    if content_type.startswith("text/"):
+        return content_type + "; charset=utf-8"
+    return content_type
+
+
+def _response(output_path, blob):
+    content_type = _content_type(output_path)
+    gzipped = (
+        gzip.compress(blob, compresslevel=6)
+        if _is_compressible(content_type) and len(blob) >= _MIN_GZIP_SIZE
+        else None
+    )
+    return Response(
+        body=blob,
+        gzipped=gzipped,
+        etag='"{}"'.format(hashlib.sha1(blob).hexdigest()),
+        content_type=content_type
+    )
+
+
+def _normalize_path(pathlike):
+    return str(PurePosixPath(pathlike))
+
+
+class PreviewSite:
+    """
+    A lazy, in-memory map of output path to response.
+
+    `things` is a stream of docs and files. It is read one item at a
+    time, only as far as needed to find a requested output path. If
+    `render` is given, it is a stage that is run on each doc only when
+    it is requested (e.g. `jinjatools.jinja(...)`). It must render docs
+    one at a time, like stages made with `query.maps`.
+    """
+    def __init__(self, things, render=None, writeable=_writeable):
+        self._things = iter(things)
+        self._render = render
+        self._writeable = writeable
+        self._pending = {}
+        self._responses = {}
+        self._lock = Lock()
+
+    def _pull(self, output_path):
+        """
+        Read from the stream until `output_path` is found.
+        Returns the thing, or None if the stream runs out.
+        """
+        for thing in self._things:
+            key = _normalize_path(thing.output_path)
+            self._pending[key] = thing
+            if key == output_path:
+                return thing
+        return None
+
+    def _render_thing(self, thing):
+        if self._render is not None:
+            for rendered in self._render((thing,)):
+                thing = rendered
+        output_path, blob = self._writeable(thing)
+        return _response(output_path, read_blob(blob))
+
+    def get(self, output_path):
+        """
+        Get the response for an output path, rendering it if needed.
+        Returns None if there is no such output path.
+        """
+        output_path = _normalize_path(output_path)
+        with self._lock:
+            try:
+                return self._responses[output_path]
+            except KeyError:
+                pass
+            thing = self._pending.pop(output_path, None)
+            if thing is None:
+                thing = self._pull(output_path)
+                self._pending.pop(output_path, None)
+            if thing is None:
+                return None
+            response = self._render_thing(thing)
+            self._responses[output_path] = response
+            return response
+
+    def rendered(self):
+        """
+        Get the number of output paths rendered so far.
+        """
+        with self._lock:
+            return len(self._responses)
+
+    def resolve(self, url_path):
+        """
+        Find the output path and response for a URL path.
+        Directory URLs are served from their `index.html`.
+        Returns a tuple of `(output_path, response)`, or None.
+        """
+        path = unquote(url_path).lstrip("/")
+        if path == "" or path.endswith("/"):
+            candidates = (path + "index.html",)
+        else:
+            candidates = (path, path + "/index.html")
+        for candidate in candidates:
+            response = self.get(candidate)
+            if response is not None:
+                return candidate, response
+        return None
+
+
+def _accepts_gzip(accept_encoding):
+    return any(
+        part.split(";")[0].strip() == "gzip"
+        for part in accept_encoding.split(",")
+    )
+
+
+def _etag_matches(if_none_match, etag):
+    return any(
+        tag.strip() in (etag, "*", "W/" + etag)
+        for tag in if_none_match.split(",")
+    )
+
+
+def handler(site):
+    """
+    Create a request handler class that serves `site`, a `PreviewSite`.
+    """
+    class PreviewHandler(BaseHTTPRequestHandler):
+        def _send(self, head_only):
+            url_path = urlsplit(self.path).path
+            try:
+                found = site.resolve(url_path)
+            except Exception as e:
+                self.log_error("%s", traceback.format_exc())
+                self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+                return
+            if found is None:
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return
+            output_path, response = found
+            if (
+                output_path.endswith("index.html")
+                and not url_path.endswith("/")
+                and not url_path.endswith("index.html")
+            ):
+                self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+                self.send_header("Location", url_path + "/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if_none_match = self.headers.get("If-None-Match", "")
+            if _etag_matches(if_none_match, response.etag):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header("ETag", response.etag)
+                self.end_headers()
+                return
+            use_gzip = (
+                response.gzipped is not None
+                and _accepts_gzip(self.headers.get("Accept-Encoding", ""))
+            )
+            body = response.gzipped if use_gzip else response.body
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", response.content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", response.etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Vary", "Accept-Encoding")
+            if use_gzip:
+                self.send_header("Content-Encoding", "gzip")
+            self.end_headers()
+            if not head_only:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            self._send(head_only=False)
+
+        def do_HEAD(self):
+            self._send(head_only=True)
+
+    return PreviewHandler
+
+
+def server(things, render=None, host="localhost", port=8000):
+    """
+    Create a preview server for a stream of docs and files, without
+    starting it. Returns a `ThreadingHTTPServer`.
+    """
+    site = PreviewSite(things, render=render)
+    return ThreadingHTTPServer((host, port), handler(site))
+
+
+def serve(things, render=None, host="localhost", port=8000):
+    """
+    Serve a stream of docs and files from memory. See `PreviewSite`
+    for `render`.
+
+    Blocks until interrupted (Ctrl-C). Then returns a dict of stats:
+    the number of output paths that were rendered.
+    """
+    site = PreviewSite(things, render=render)
+    httpd = ThreadingHTTPServer((host, port), handler(site))
+    print("Serving on http://{}:{}/ (Ctrl-C to stop)".format(host, port))
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+    return {"rendered": site.rendered()}
@@ -0,0 +1,330 @@
+"""
+Tools for splitting a site build across processes (or machines).
+
+A sharded build runs in two phases:
+
+1. Index. Each shard loads only its own docs (see `in_shard`), and
+   writes a small `ShardIndex` of stubs, unresolved wikilinks and
+   taxonomy terms with `index_shard` and `dump`.
+2. Render. The shard indexes are combined with `merge` into one
+   `SiteIndex`. Each shard then renders its docs against the site
+   index, so wikilinks, backlinks and taxonomies can point at docs in
+   other shards. Global pages (archives, sitemap, feeds) are built once,
+   from the site index.
+
+`run` runs a function for every shard in a pool of worker processes,
+so the whole thing can be tried out on one machine.
+
+Example:
+
+    def index(n, count):
+        posts = pipe(
+            docs.find("post/*.md"),
+            shard.in_shard(n, count),
+            docs.uplift_frontmatter
+        )
+        shard.dump(shard.index_shard(posts), f"index/{n}.json")
+
+    shard.run(index, 4)
+    site = shard.merge(shard.load(p) for p in glob("index/*.json"))
+"""
+import json
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from lettersmith import doc as Doc
+from lettersmith import stub as Stub
+from lettersmith import edge as Edge
+from lettersmith import query
+from lettersmith import wikimarkup
+from lettersmith import wikidoc
+from lettersmith import runtime
+from lettersmith.path import to_slug
+from lettersmith.io import write_file_deep
+
+
+def by_id_path(doc):
+    """
+    Shard key that spreads docs evenly by id_path.
+    """
+    return doc.id_path
+
+
+def by_tld(doc):
+    """
+    Shard key that keeps each top-level directory in one shard.
+    """
+    return Doc.id_tld(doc)
+
+
+def shard_of(key, count):
+    """
+    Get the shard number (0 to `count - 1`) for a string key.
+    Uses a stable hash, so every process agrees on the answer.
+    """
+    return zlib.crc32(key.encode()) % count
+
+
+def in_shard(shard, count, key=by_id_path):
+    """
+    Keep only the docs that belong to `shard`, out of `count` shards,
+    partitioned by `key(doc)`.
+    """
+    return query.filters(lambda doc: shard_of(key(doc), count) == shard)
+
+
+ShardIndex = namedtuple("ShardIndex", ("stubs", "wikilinks", "taxonomies"))
+ShardIndex.__doc__ = """
+The partial index produced by one shard.
+
+- stubs: a tuple of `Stub`s for the shard's docs
+- wikilinks: a tuple of `(tail_id_path, slug)` pairs. Slugs are resolved
+  to docs when indexes are merged.
+- taxonomies: a dict of `{taxonomy: {term: (id_path, ...)}}`
+"""
+
+
+def index_shard(docs, taxonomies=("tags",)):
+    """
+    Build a `ShardIndex` for the docs in one shard.
+
+    Docs should be indexed before wikilinks are rendered, since the
+    index records the raw `[[wikilinks]]` found in content.
+    """
+    stubs = []
+    wikilinks = []
+    tax_index = {tax: {} for tax in taxonomies}
+    for doc in docs:
+        stubs.append(Stub.from_doc(doc))
+        for slug, title in frozenset(wikimarkup.find_wikilinks(doc.content)):
+            wikilinks.append((doc.id_path, slug))
+        for tax in taxonomies:
+            for term in doc.meta.get(tax, ()):
+                tax_index[tax].setdefault(term, []).append(doc.id_path)
+    return ShardIndex(
+        stubs=tuple(stubs),
+        wikilinks=tuple(wikilinks),
+        taxonomies={
+            tax: {term: tuple(id_paths) for term, id_paths in terms.items()}
+            for tax, terms in tax_index.items()
+        }
+    )
+
+
+def _stub_to_json(stub):
+    return (
+        stub.id_path,
+        stub.output_path,
+        stub.created.timestamp(),
+        stub.modified.timestamp(),
+        stub.title,
+        stub.summary
+    )
+
+
+def _stub_from_json(row):
+    id_path, output_path, created, modified, title, summary = row
+    return Stub.Stub(
+        id_path,
+        output_path,
+        datetime.fromtimestamp(created),
+        datetime.fromtimestamp(modified),
+        title,
+        summary
+    )
+
+
+def _term_to_json(term):
+    """
+    Encode a taxonomy term so it keeps its type through JSON.
+    Strings, numbers and booleans are kept as is. Dates and datetimes
+    are tagged with their type.
+    """
+    if isinstance(term, (str, int, float, bool)):
+        return term
+    elif isinstance(term, datetime):
+        return {"@type": "datetime", "value": term.isoformat()}
+    elif isinstance(term, date):
+        return {"@type": "date", "value": term.isoformat()}
+    else:
+        msg = "Can't write taxonomy term {term!r} of type {type} as JSON."
+        raise TypeError(msg.format(term=term, type=type(term).__name__))
+
+
+def _term_from_json(term):
+    if isinstance(term, dict):
+        if term["@type"] == "datetime":
+            return datetime.fromisoformat(term["value"])
+        return date.fromisoformat(term["value"])
+    return term
+
+
+def dump(index, pathlike):
+    """
+    Write a `ShardIndex` to a JSON file.
+
+    Taxonomy terms are written as `[term, id_paths]` pairs rather than
+    object keys, so terms that aren't strings (like numbers and dates)
+    come back from `load` with the same type.
+    """
+    data = {
+        "@type": "shard_index",
+        "stubs": [_stub_to_json(stub) for stub in index.stubs],
+        "wikilinks": index.wikilinks,
+        "taxonomies": {
+            tax: [
+                [_term_to_json(term), id_paths]
+                for term, id_paths in terms.items()
+            ]
+            for tax, terms in index.taxonomies.items()
+        }
+    }
+    write_file_deep(pathlike, json.dumps(data))
+
+
+def load(pathlike):
+    """
+    Read a `ShardIndex` from a JSON file written by `dump`.
+    """
+    with open(pathlike, "r") as f:
+        data = json.load(f)
+    return ShardIndex(
+        stubs=tuple(_stub_from_json(row) for row in data["stubs"]),
+        wikilinks=tuple((tail, slug) for tail, slug in data["wikilinks"]),
+        taxonomies={
+            tax: {
+                _term_from_json(term): tuple(id_paths)
+                for term, id_paths in terms
+            }
+            for tax, terms in data["taxonomies"].items()
+        }
+    )
+
+
+SiteIndex = namedtuple("SiteIndex", (
+    "registry", "slugs", "links", "backlinks", "taxonomies"
+))
+SiteIndex.__doc__ = """
+The global index produced by merging every `ShardIndex`.
+
+- registry: a `stub.Registry` holding every doc's stub
+- slugs: a dict of title slug to registry id
+- links, backlinks: CSR `(offsets, targets)` adjacency arrays of ids
+- taxonomies: a dict of `{taxonomy: {term: StubList}}`, in the same
+  shape as `taxonomy.index_taxonomy`
+"""
+
+
+def merge(indexes):
+    """
+    Merge shard indexes into a `SiteIndex`, resolving wikilinks
+    between shards.
+
+    Shards are merged in the order given, so pass them in shard order
+    for deterministic results.
+    """
+    indexes = tuple(indexes)
+    registry = Stub.Registry()
+    slugs = {}
+    for index in indexes:
+        for stub in index.stubs:
+            slugs[to_slug(stub.title)] = registry.intern_stub(stub)
+    edges = Edge.EdgeArray()
+    taxonomies = {}
+    for index in indexes:
+        for tail, slug in index.wikilinks:
+            try:
+                edges.append(registry.id(tail), slugs[slug])
+            except KeyError:
+                pass
+        for tax, terms in index.taxonomies.items():
+            tax_index = taxonomies.setdefault(tax, {})
+            for term, id_paths in terms.items():
+                tax_index.setdefault(term, []).extend(
+                    registry.id(id_path) for id_path in id_paths
+                )
+    size = len(registry)
+    return SiteIndex(
+        registry=registry,
+        slugs=slugs,
+        links=edges.adjacency(size),
+        backlinks=edges.adjacency(size, reverse=True),
+        taxonomies={
+            tax: {
+                term: registry.stub_list(ids)
+                for term, ids in terms.items()
+            }
+            for tax, terms in taxonomies.items()
+        }
+    )
+
+
+def stubs(site):
+    """
+    Get every stub in the site index, in merge order.
+
+    Useful for building global pages. `archive.archive` and
+    `sitemap.sitemap` both accept stubs. Feeds need full content, so
+    have each shard return its most recent docs from the render phase,
+    and pass the combined docs to `rss.rss`, which keeps the newest.
+    """
+    registry = site.registry
+    return registry.stub_list(range(len(registry)))
+
+
+def _row(adjacency, i):
+    offsets, targets = adjacency
+    if i + 1 >= len(offsets):
+        return targets[0:0]
+    return targets[offsets[i]:offsets[i + 1]]
+
+
+def annotate_links(site):
+    """
+    Annotate docs with links and backlinks from the whole site, like
+    `wikidoc.annotate_links`, but using the merged site index.
+    """
+    registry = site.registry
+    def annotate(docs):
+        for doc in docs:
+            i = registry.intern(doc)
+            yield Doc.update_meta(doc, {
+                "links": registry.stub_list(_row(site.links, i)),
+                "backlinks": registry.stub_list(_row(site.backlinks, i))
+            })
+    return annotate
+
+
+def content_wikilinks(site, base_url, **kwargs):
+    """
+    Render `[[wikilinks]]` like `wikidoc.content_wikilinks`, resolving
+    links against every doc in the site index, not just this shard.
+    Keyword arguments are passed to `wikidoc.wikilink_renderer`.
+    """
+    render = wikidoc.wikilink_renderer(
+        site.registry,
+        site.slugs,
+        base_url,
+        **kwargs
+    )
+    return query.maps(Doc.renderer(render))
+
+
+def run(build_shard, count, jobs=None):
+    """
+    Run `build_shard(shard, count)` for every shard from 0 to
+    `count - 1`, in a pool of `jobs` worker processes (defaults to the
+    build's `jobs` option, or `count`). `build_shard` must be a
+    picklable, module-level function.
+
+    Returns a list of results, in shard order. If any shard raises, the
+    exception from the lowest-numbered failing shard is raised.
+    """
+    jobs = jobs if jobs is not None else runtime.jobs(count)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(
+            build_shard,
+            range(count),
+            (count,) * count
+        ))
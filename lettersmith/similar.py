@@ -0,0 +1,270 @@
+"""
+Tools for finding related docs by content similarity.
+
+Each doc's plain text is turned into a TF-IDF vector, and the `k` docs
+with the most similar vectors (by cosine similarity) are its related
+docs. Unlike `taxonomy.related`, this works on docs without tags.
+
+If NumPy and SciPy are installed, similarities are computed with sparse
+matrix products, one block of rows at a time, so memory use stays
+bounded no matter how many docs there are. Otherwise, a pure Python
+inverted index is used, which is fine for small sites.
+
+Example:
+
+    posts = pipe(
+        posts,
+        similar.related(k=5)
+    )
+
+Related docs are written to `meta["related"]` as stubs, just like
+`taxonomy.related`.
+"""
+import re
+import heapq
+import math
+from array import array
+from collections import Counter
+from lettersmith import stub as Stub
+from lettersmith.html import strip_html
+from lettersmith.markdowntools import strip_markdown
+from lettersmith.taxonomy import meta_related
+from lettersmith.lens import put
+
+try:
+    import numpy
+    from scipy import sparse
+except ImportError:
+    numpy = None
+    sparse = None
+
+
+_WORD = re.compile(r"[^\W\d_]{2,}")
+_MARKDOWN_SUFFIXES = (".md", ".markdown")
+_HTML_SUFFIXES = (".html", ".htm")
+
+# Number of similarity scores to hold in memory at once (float32),
+# when computing with NumPy. Rows per block is this divided by the
+# number of docs.
+_BLOCK_CELLS = 1 << 22
+
+
+def tokenize(text):
+    """
+    Split text into lowercase words. Numbers and single letters are
+    skipped.
+    """
+    return _WORD.findall(text.lower())
+
+
+def _is_markdown(doc):
+    """
+    Check if doc content is still markdown source. Content from a
+    markdown file counts as rendered once the doc's output path is
+    HTML, or its content starts with an HTML tag.
+    """
+    return (
+        doc.id_path.endswith(_MARKDOWN_SUFFIXES)
+        and not doc.output_path.endswith(_HTML_SUFFIXES)
+        and not doc.content.lstrip().startswith("<")
+    )
+
+
+def plain_text(doc):
+    """
+    Get the plain text of a doc. Markdown source that hasn't been
+    rendered yet is rendered and stripped with
+    `markdowntools.strip_markdown`. Everything else is treated as HTML,
+    and stripped with `html.strip_html`.
+    """
+    if _is_markdown(doc):
+        return strip_markdown(doc.content)
+    return strip_html(doc.content)
+
+
+class Vectors:
+    """
+    L2-normalized TF-IDF vectors for a list of texts, stored as
+    compressed sparse rows: `offsets`, `terms` and `weights` arrays.
+    Row `i` is `terms[offsets[i]:offsets[i + 1]]`.
+    """
+    def __init__(self, offsets, terms, weights, vocabulary):
+        self.offsets = offsets
+        self.terms = terms
+        self.weights = weights
+        self.vocabulary = vocabulary
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def row(self, i):
+        """
+        Get row `i` as a tuple of `(term_id, weight)` pairs.
+        """
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return tuple(zip(self.terms[start:stop], self.weights[start:stop]))
+
+
+def vectorize(texts, min_df=2, max_df=0.5, max_terms=64):
+    """
+    Build TF-IDF vectors for an iterable of texts.
+
+    Term frequency is sublinear (`1 + log(tf)`), and inverse document
+    frequency is smoothed (`log((1 + n) / (1 + df)) + 1`). Vectors are
+    normalized over every term, then terms found in fewer than `min_df`
+    texts, or more than `max_df` (a fraction) of texts, are dropped.
+    A term found in one text can't make two texts similar, so the
+    default `min_df` of 2 doesn't change any similarity scores.
+
+    On small sites, `max_df` never drops terms found in just `min_df`
+    texts. Otherwise, with 3 texts or fewer, the defaults would drop
+    every term, and no texts would be similar.
+
+    Only the `max_terms` highest weighted terms are kept for each text
+    (all of them if `max_terms` is None). This keeps the terms that say
+    the most about a text, and makes finding neighbors much faster on
+    large sites, since the cost grows with the number of terms each
+    pair of texts shares.
+
+    Returns a `Vectors`.
+    """
+    counts = [Counter(tokenize(text)) for text in texts]
+    n = len(counts)
+    df = Counter()
+    for count in counts:
+        df.update(count.keys())
+    idf = {
+        term: math.log((1 + n) / (1 + freq)) + 1
+        for term, freq in df.items()
+    }
+    max_count = max(max_df * n, min_df)
+    vocabulary = {}
+    for term, freq in sorted(df.items()):
+        if freq >= min_df and freq <= max_count:
+            vocabulary[term] = len(vocabulary)
+    offsets = array("q", (0,))
+    terms = array("l")
+    weights = array("d")
+    for count in counts:
+        row = {
+            term: (1 + math.log(tf)) * idf[term]
+            for term, tf in count.items()
+        }
+        norm = math.sqrt(sum(w * w for w in row.values()))
+        kept = [
+            (vocabulary[term], w) for term, w in row.items()
+            if term in vocabulary
+        ]
+        if max_terms is not None and len(kept) > max_terms:
+            kept = heapq.nlargest(max_terms, kept, key=lambda pair: pair[1])
+        for term_id, w in sorted(kept):
+            terms.append(term_id)
+            weights.append(w / norm)
+        offsets.append(len(terms))
+    return Vectors(offsets, terms, weights, vocabulary)
+
+
+def _nearest_python(vectors, k, min_score):
+    postings = [[] for term in vectors.vocabulary]
+    for i in range(len(vectors)):
+        for term, w in vectors.row(i):
+            postings[term].append((i, w))
+    for i in range(len(vectors)):
+        scores = {}
+        for term, w in vectors.row(i):
+            for j, wj in postings[term]:
+                scores[j] = scores.get(j, 0.0) + w * wj
+        scores.pop(i, None)
+        best = heapq.nlargest(
+            k,
+            (
+                (score, -j) for j, score in scores.items()
+                if score > min_score
+            )
+        )
+        yield tuple(-j for score, j in best)
+
+
+def _nearest_numpy(vectors, k, min_score, block_size):
+    n = len(vectors)
+    matrix = sparse.csr_matrix(
+        (
+            numpy.asarray(vectors.weights, dtype=numpy.float32),
+            numpy.asarray(vectors.terms, dtype=numpy.int64),
+            numpy.asarray(vectors.offsets, dtype=numpy.int64)
+        ),
+        shape=(n, max(len(vectors.vocabulary), 1))
+    )
+    matrix_t = matrix.T.tocsr()
+    k = min(k, n - 1)
+    block_size = block_size or max(1, _BLOCK_CELLS // max(n, 1))
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        rows = numpy.arange(stop - start)
+        scores = (matrix[start:stop] @ matrix_t).toarray()
+        scores[rows, rows + start] = -1.0
+        top = numpy.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = numpy.take_along_axis(scores, top, axis=1)
+        order = numpy.lexsort((top, -top_scores), axis=1)
+        top = numpy.take_along_axis(top, order, axis=1)
+        top_scores = numpy.take_along_axis(top_scores, order, axis=1)
+        for ids, row_scores in zip(top.tolist(), top_scores.tolist()):
+            yield tuple(
+                j for j, score in zip(ids, row_scores)
+                if score > min_score
+            )
+
+
+def nearest(vectors, k=5, min_score=0.0, block_size=None):
+    """
+    Find the `k` most similar rows for each row of `vectors`, by cosine
+    similarity. Rows with a similarity of `min_score` or less are
+    skipped. Yields a tuple of row indexes for each row, most similar
+    first (ties go to the lower index).
+
+    Uses NumPy and SciPy if they are installed, comparing `block_size`
+    rows against every row at a time. If `block_size` is None, it is
+    picked so each block holds about 4 million scores.
+    """
+    if k < 1 or len(vectors) < 2:
+        return (() for i in range(len(vectors)))
+    if numpy is None:
+        return _nearest_python(vectors, k, min_score)
+    return _nearest_numpy(vectors, k, min_score, block_size)
+
+
+def related(
+    k=5,
+    text=plain_text,
+    min_df=2,
+    max_df=0.5,
+    max_terms=64,
+    min_score=0.0,
+    lens=meta_related,
+    registry=None
+):
+    """
+    Create a stage that annotates doc meta with stubs for the `k` docs
+    with the most similar content.
+
+    `text` is a function that gets plain text from a doc (`plain_text`
+    by default). Related stubs are put at `lens` (`meta["related"]` by
+    default), as a `StubList` interned in `registry`. See `vectorize`
+    for `min_df`, `max_df` and `max_terms`, and `nearest` for
+    `min_score`.
+    """
+    def add_related(docs):
+        docs = tuple(docs)
+        _registry = registry if registry is not None else Stub.Registry()
+        ids = tuple(_registry.intern(doc) for doc in docs)
+        vectors = vectorize(
+            (text(doc) for doc in docs),
+            min_df=min_df,
+            max_df=max_df,
+            max_terms=max_terms
+        )
+        neighbors = nearest(vectors, k=k, min_score=min_score)
+        for doc, near in zip(docs, neighbors):
+            stubs = _registry.stub_list(ids[j] for j in near)
+            yield put(lens, doc, stubs)
+    return add_related
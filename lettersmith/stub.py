@@ -1,7 +1,9 @@
 """
 Stubs are summary details for a document.
 """
+from array import array
 from collections import namedtuple
+from collections.abc import Sequence
 from lettersmith import doc as Doc
 from lettersmith.lens import get
 from lettersmith import query
@@ -25,8 +27,11 @@ Only hashable properties, so stubs can be used in sets.
 
 def from_doc(doc):
     """
-    Read stub from doc
+    Read stub from doc. Stubs are returned as-is, so functions that take
+    docs and read stubs (like `archive.archive`) also work on stubs.
     """
+    if isinstance(doc, Stub):
+        return doc
     return Stub(
         get(Doc.id_path, doc),
         get(Doc.output_path, doc),
@@ -37,4 +42,126 @@ def from_doc(doc):
     )
 
 
-stubs = query.maps(from_doc)
\ No newline at end of file
+stubs = query.maps(from_doc)
+
+class Registry:
+    """
+    Interns doc stubs for a build.
+
+    Each doc is assigned a small integer id the first time it is
+    interned. The stub fields are stored once, column-wise, and `Stub`
+    namedtuples are only materialized when somebody reads them. Indexes
+    (links, backlinks, taxonomies) can then hold compact arrays of ids
+    instead of many copies of the same stub.
+
+    Interning a doc with an `id_path` that is already registered keeps the
+    id, but refreshes the stored fields, so the registry always holds the
+    latest stub for each doc.
+    """
+    def __init__(self):
+        self._ids = {}
+        self._columns = tuple([] for field in Stub._fields)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, id_path):
+        return id_path in self._ids
+
+    def intern(self, doc):
+        """
+        Intern the stub for `doc`. Returns the stub's integer id.
+        """
+        return self.intern_stub(from_doc(doc))
+
+    def intern_stub(self, stub):
+        """
+        Intern a `Stub` directly. Returns the stub's integer id.
+        """
+        row = tuple(stub)
+        try:
+            i = self._ids[row[0]]
+            for column, value in zip(self._columns, row):
+                column[i] = value
+        except KeyError:
+            i = len(self._ids)
+            self._ids[row[0]] = i
+            for column, value in zip(self._columns, row):
+                column.append(value)
+        return i
+
+    def id(self, id_path):
+        """
+        Get the id for an `id_path`. Raises a `KeyError` if the id_path
+        was never interned.
+        """
+        return self._ids[id_path]
+
+    def stub(self, i):
+        """
+        Materialize the `Stub` for id `i`.
+        """
+        return Stub._make(column[i] for column in self._columns)
+
+    def stub_list(self, ids):
+        """
+        Create a lazy, read-only sequence of stubs from an iterable of ids.
+        """
+        return StubList(self, ids)
+
+
+class StubList(Sequence):
+    """
+    A read-only sequence of stubs, stored as an array of registry ids.
+    Stubs are materialized from the registry as they are read, so a
+    `StubList` costs 8 bytes per item instead of a full `Stub`.
+
+    Pickles (and copies) as a plain tuple of stubs.
+    """
+    __slots__ = ("_registry", "_ids")
+
+    def __init__(self, registry, ids):
+        self._registry = registry
+        self._ids = ids if isinstance(ids, array) else array("q", ids)
+
+    @property
+    def ids(self):
+        """
+        The registry ids in this list.
+        """
+        return self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return StubList(self._registry, self._ids[i])
+        return self._registry.stub(self._ids[i])
+
+    def __iter__(self):
+        stub = self._registry.stub
+        for i in self._ids:
+            yield stub(i)
+
+    def __contains__(self, item):
+        try:
+            i = self._registry.id(item.id_path)
+        except (AttributeError, KeyError):
+            return False
+        return i in self._ids and self._registry.stub(i) == item
+
+    def __eq__(self, other):
+        if isinstance(other, StubList) and other._registry is self._registry:
+            return self._ids == other._ids
+        if isinstance(other, Sequence):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (tuple, (tuple(self),))
+
+    def __repr__(self):
+        return "StubList({})".format(repr(tuple(self)))
@@ -1,13 +1,23 @@
 """
 Tools for indexing docs by tag (taxonomy).
+
+`index_taxonomies` builds a `TaxonomyIndex` for any number of taxonomy
+keys in one pass over docs. Archives, related docs, tag clouds and
+per-term feeds can all share the same index:
+
+    tax_index = index_taxonomies(("tags", "series"))(posts)
+    tag_pages = archives(tax_index, "tags")
+    series_pages = archives(tax_index, "series")
+    posts = related("tags", tax_index=tax_index)(posts)
 """
+from array import array
+from collections import namedtuple
 from datetime import datetime
-from lettersmith.func import composable, pipe
+from lettersmith.func import composable
 from lettersmith import path as pathtools
 from lettersmith import stub as Stub
 from lettersmith import doc as Doc
-from lettersmith import docs as Docs
-from lettersmith.lens import lens_compose, key, get, put
+from lettersmith.lens import lens_compose, key, put
 
 
 _empty = tuple()
@@ -26,24 +36,181 @@ def meta_taxonomy(tax):
 meta_tags = meta_taxonomy("tags")
 
 
+def _terms_of(doc, tax):
+    """
+    Get the distinct terms a doc has in a taxonomy, in order.
+    A single string is treated as one term.
+    """
+    terms = doc.meta.get(tax, _empty)
+    if isinstance(terms, str):
+        return (terms,)
+    return tuple(dict.fromkeys(terms))
+
+
+def _term_key(term):
+    return (str(term).lower(), str(term))
+
+
+CloudTerm = namedtuple("CloudTerm", ("term", "slug", "count", "weight"))
+CloudTerm.__doc__ = """
+A term in a tag cloud. `weight` is a step from 1 (fewest docs)
+to the number of steps in the cloud (most docs).
+"""
+
+
+class TaxonomyIndex:
+    """
+    An index of docs by term, for one or more taxonomies.
+
+    Docs are stored as `stub.Registry` ids, in the order they were
+    indexed. Terms are kept in a stable order: sorted by name, case
+    insensitive. Build one with `index_taxonomies`.
+    """
+    def __init__(self, registry, taxonomies):
+        self.registry = registry
+        self._taxonomies = {
+            tax: {
+                term: terms[term]
+                for term in sorted(terms, key=_term_key)
+            }
+            for tax, terms in taxonomies.items()
+        }
+
+    def taxonomies(self):
+        """
+        Get the taxonomy keys in the index.
+        """
+        return tuple(self._taxonomies)
+
+    def terms(self, tax, by_count=False):
+        """
+        Get the terms in a taxonomy, sorted by name. If `by_count` is
+        true, terms are sorted by number of docs, most first, then
+        by name.
+        """
+        terms = self._taxonomies.get(tax, {})
+        if by_count:
+            return tuple(sorted(terms, key=lambda term: -len(terms[term])))
+        return tuple(terms)
+
+    def counts(self, tax):
+        """
+        Get the number of docs for each term in a taxonomy.
+        Returns a dict of `{term: count}`, sorted by term.
+        """
+        return {
+            term: len(ids)
+            for term, ids in self._taxonomies.get(tax, {}).items()
+        }
+
+    def count(self, tax, term):
+        """
+        Get the number of docs with `term` in taxonomy `tax`.
+        """
+        return len(self.ids(tax, term))
+
+    def ids(self, tax, term):
+        """
+        Get the registry ids of docs with `term` in taxonomy `tax`.
+        """
+        return self._taxonomies.get(tax, {}).get(term, _empty)
+
+    def docs(self, tax, term):
+        """
+        Get the stubs for docs with `term` in taxonomy `tax`,
+        as a `StubList`.
+        """
+        return self.registry.stub_list(self.ids(tax, term))
+
+    def index(self, tax):
+        """
+        Get a dict of `{term: StubList}` for a taxonomy, in the same
+        shape as `index_taxonomy`.
+        """
+        return {
+            term: self.registry.stub_list(ids)
+            for term, ids in self._taxonomies.get(tax, {}).items()
+        }
+
+    def related_ids(self, tax, terms, i):
+        """
+        Get the ids of docs that share any of `terms` in taxonomy `tax`,
+        not including id `i`. Each id is included once.
+        """
+        seen = set((i,))
+        for term in terms:
+            for j in self.ids(tax, term):
+                if j not in seen:
+                    seen.add(j)
+                    yield j
+
+    def cloud(self, tax, steps=5):
+        """
+        Get a tag cloud for a taxonomy: a tuple of `CloudTerm`s, sorted
+        by term, each weighted from 1 to `steps` by its number of docs.
+        """
+        counts = self.counts(tax)
+        if not counts:
+            return _empty
+        least = min(counts.values())
+        spread = max(counts.values()) - least
+        return tuple(
+            CloudTerm(
+                term=term,
+                slug=pathtools.to_slug(term),
+                count=count,
+                weight=(
+                    1 + round((count - least) * (steps - 1) / spread)
+                    if spread else 1
+                )
+            )
+            for term, count in counts.items()
+        )
+
+
 @composable
-def taxonomy_archives(
-    docs,
+def index_taxonomies(docs, keys, registry=None):
+    """
+    Index docs by term for every taxonomy in `keys`, in a single pass.
+    `keys` are meta keys that should be treated as taxonomy fields.
+
+    Stubs are interned in `registry` (a `stub.Registry`). If no registry
+    is given, a new one is created.
+
+    Returns a `TaxonomyIndex`.
+    """
+    registry = registry if registry is not None else Stub.Registry()
+    taxonomies = {tax: {} for tax in keys}
+    for doc in docs:
+        if not any(tax in doc.meta for tax in keys):
+            continue
+        i = registry.intern(doc)
+        for tax, terms in taxonomies.items():
+            for term in _terms_of(doc, tax):
+                try:
+                    terms[term].append(i)
+                except KeyError:
+                    terms[term] = array("q", (i,))
+    return TaxonomyIndex(registry, taxonomies)
+
+
+def archives(
+    tax_index,
     key,
     template="taxonomy.html",
     output_path_template="{taxonomy}/{term}/index.html"
 ):
     """
-    Creates an archive page for each taxonomy term. One page per term.
+    Create an archive page for each term of taxonomy `key` in a
+    `TaxonomyIndex`. One page per term.
     """
-    tax_index = index_taxonomy(docs, key)
-    for term, docs in tax_index.items():
+    now = datetime.now()
+    for term, docs in tax_index.index(key).items():
         output_path = output_path_template.format(
             taxonomy=pathtools.to_slug(key),
             term=pathtools.to_slug(term)
         )
         meta = {"docs": docs}
-        now = datetime.now()
         yield Doc.create(
             id_path=output_path,
             output_path=output_path,
@@ -55,17 +222,33 @@ def taxonomy_archives(
         )
 
 
-tag_archives = taxonomy_archives("tags")
+@composable
+def taxonomy_archives(
+    docs,
+    key,
+    template="taxonomy.html",
+    output_path_template="{taxonomy}/{term}/index.html",
+    registry=None,
+    tax_index=None
+):
+    """
+    Creates an archive page for each taxonomy term. One page per term.
+
+    Pass a `TaxonomyIndex` as `tax_index` to reuse it, instead of
+    indexing docs again.
+    """
+    tax_index = (
+        tax_index if tax_index is not None
+        else index_taxonomies((key,), registry=registry)(docs)
+    )
+    return archives(tax_index, key, template, output_path_template)
 
 
-def _get_indexes(index, keys):
-    for key in keys:
-        for item in index[key]:
-            yield item
+tag_archives = taxonomy_archives("tags")
 
 
 @composable
-def index_taxonomy(docs, key):
+def index_taxonomy(docs, key, registry=None):
     """
     Create a new index for a taxonomy.
     `key` is a whitelisted meta keys that should
@@ -77,42 +260,87 @@ def index_taxonomy(docs, key):
             "term_a": [stub, ...],
             "term_b": [stub, ...]
         }
+
+    Stubs are interned in `registry` (a `stub.Registry`), and each term
+    holds a lazy `StubList`. If no registry is given, a new one is created.
+
+    To index several taxonomies at once, use `index_taxonomies`.
     """
-    tax_index = {}
-    for doc in docs:
-        if key in doc.meta:
-            for term in doc.meta[key]:
-                if term not in tax_index:
-                    tax_index[term] = []
-                tax_index[term].append(Stub.from_doc(doc))
-    return tax_index
+    return index_taxonomies((key,), registry=registry)(docs).index(key)
 
 
 index_tags = index_taxonomy("tags")
 
 
-def related(tax):
+def related(tax, registry=None, tax_index=None):
     """
     Annotate doc meta with a list of related doc stubs.
 
     A doc is related if it shares any of the same tags in the
     same taxonomy.
+
+    Pass a `TaxonomyIndex` as `tax_index` to reuse it, instead of
+    indexing docs again.
     """
-    taxonomy = meta_taxonomy(tax)
-    build_index = index_taxonomy(tax)
     def add_related(docs):
         docs = tuple(docs)
-        index = build_index(docs)
+        _index = (
+            tax_index if tax_index is not None
+            else index_taxonomies((tax,), registry=registry)(docs)
+        )
+        _registry = _index.registry
         for doc in docs:
-            tags = get(taxonomy, doc)
-            related = pipe(
-                _get_indexes(index, tags),
-                Docs.dedupe,
-                Docs.remove_id_path(doc.id_path),
-                tuple
+            i = _registry.intern(doc)
+            related = _registry.stub_list(
+                _index.related_ids(tax, _terms_of(doc, tax), i)
             )
             yield put(meta_related, doc, related)
     return add_related
 
 
-related_by_tag = related("tags")
\ No newline at end of file
+related_by_tag = related("tags")
+
+
+@composable
+def term_feeds(
+    docs,
+    key,
+    base_url,
+    title,
+    description,
+    author,
+    output_path_template="{taxonomy}/{term}/rss.xml",
+    tax_index=None
+):
+    """
+    Create an RSS doc for each term of taxonomy `key`, with the most
+    recent docs for that term.
+
+    `title` and `description` can include `{term}` and `{taxonomy}`,
+    e.g. "Posts tagged {term}". Feeds need full docs, so `docs` are
+    always read. Pass a `TaxonomyIndex` as `tax_index` to reuse it.
+    """
+    # Imported here, so indexing doesn't need Jinja.
+    from lettersmith.rss import rss
+    docs = tuple(docs)
+    tax_index = (
+        tax_index if tax_index is not None
+        else index_taxonomies((key,))(docs)
+    )
+    by_id_path = {doc.id_path: doc for doc in docs}
+    for term in tax_index.terms(key):
+        term_docs = tuple(
+            by_id_path[stub.id_path]
+            for stub in tax_index.docs(key, term)
+            if stub.id_path in by_id_path
+        )
+        yield rss(
+            base_url,
+            title.format(term=term, taxonomy=key),
+            description.format(term=term, taxonomy=key),
+            author,
+            output_path=output_path_template.format(
+                taxonomy=pathtools.to_slug(key),
+                term=pathtools.to_slug(term)
+            )
+        )(term_docs)
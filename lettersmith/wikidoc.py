@@ -11,9 +11,8 @@ from lettersmith import html
 from lettersmith import wikimarkup
 from lettersmith import markdowntools
 from lettersmith.path import to_slug, to_url
-from lettersmith.util import index_sets, expand
 from lettersmith.lens import lens_compose, key, get, put, over
-from lettersmith.func import compose, composable
+from lettersmith.func import compose, composable, rest
 from lettersmith.stringtools import first_sentence
 
 
@@ -24,6 +23,18 @@ read_summary_html = compose(
     html.strip_html
 )
 
+def read_summary_markdown_with(backend):
+    """
+    Create a function that reads a summary from a markdown text blob,
+    rendering markdown with `backend`.
+    """
+    return compose(
+        first_sentence,
+        wikimarkup.strip_wikilinks,
+        markdowntools.strip_markdown_with(backend)
+    )
+
+
 # Read a summary from a markdown text blob
 read_summary_markdown = compose(
     first_sentence,
@@ -52,40 +63,63 @@ summary_html = _summary(read_summary_html)
 summary_markdown = _summary(read_summary_markdown)
 
 
-def _index_by_slug(docs):
+def summary_markdown_with(backend):
+    """
+    Create a stage that sets summaries from markdown content, like
+    `summary_markdown`, but rendering markdown with `backend`.
+    """
+    return _summary(read_summary_markdown_with(backend))
+
+
+def _index_by_slug(docs, ids):
     return {
-        to_slug(doc.title): Stub.from_doc(doc)
-        for doc in docs
+        to_slug(doc.title): i
+        for doc, i in zip(docs, ids)
     }
 
 
-def _extract_links(content, slug_to_stub):
-    wikilinks = frozenset(wikimarkup.find_wikilinks(content))
+def find_wikilinks(doc):
+    """
+    Find the wikilinks in doc content.
+    Returns an iterator of `(slug, title)` tuples.
+    """
+    return wikimarkup.find_wikilinks(doc.content)
+
+
+def _extract_links(doc, slug_to_id, find_wikilinks):
+    wikilinks = frozenset(find_wikilinks(doc))
     for slug, title in wikilinks:
         try:
-            yield slug_to_stub[slug]
+            yield slug_to_id[slug]
         except KeyError:
             pass
 
 
-def _expand_edges(doc, slug_to_stub):
-    tail = Stub.from_doc(doc)
-    for head in _extract_links(doc.content, slug_to_stub):
-        yield Edge.Edge(tail, head)
-
-
-def _collect_edges(docs):
-    docs = tuple(docs)
-    slug_to_stub = _index_by_slug(docs)
-    return expand(_expand_edges, docs, slug_to_stub)
-
+def _collect_edges(docs, ids, slug_to_id, find_wikilinks=find_wikilinks):
+    edges = Edge.EdgeArray()
+    for doc, tail in zip(docs, ids):
+        for head in _extract_links(doc, slug_to_id, find_wikilinks):
+            edges.append(tail, head)
+    return edges
 
-def _index_by_link(edge):
-    return edge.tail.id_path, edge.head
 
+def link_edges(docs, registry, find_wikilinks=find_wikilinks):
+    """
+    Collect the wikilinks between `docs` as an `edge.EdgeArray`.
+    Docs are interned in `registry`, and edges point between registry ids.
+    Wikilinks to docs that don't exist are skipped.
 
-def _index_by_backlink(edge):
-    return edge.head.id_path, edge.tail
+    Wikilinks are read from each doc with `find_wikilinks(doc)`, which
+    scans doc content by default.
+    """
+    docs = tuple(docs)
+    ids = tuple(registry.intern(doc) for doc in docs)
+    return _collect_edges(
+        docs,
+        ids,
+        _index_by_slug(docs, ids),
+        find_wikilinks
+    )
 
 
 _empty = tuple()
@@ -101,24 +135,32 @@ def has_backlinks(doc):
     return len(get(meta_backlinks, doc)) > 0
 
 
-def annotate_links(docs):
+def annotate_links(docs, registry=None, find_wikilinks=find_wikilinks):
     """
     Annotate docs with links and backlinks.
 
     Returns an iterator for docs with 2 new meta fields: links and backlinks.
-    Each contains a tuple of `Stub`s.
+    Each contains a sequence of `Stub`s.
+
+    Stubs are interned in `registry` (a `stub.Registry`). Pass the same
+    registry to other stages to share stubs across a build. If no registry
+    is given, a new one is created.
     """
     docs = tuple(docs)
-    edges = tuple(_collect_edges(docs))
-    link_index = index_sets(_index_by_link(edge) for edge in edges)
-    backlink_index = index_sets(_index_by_backlink(edge) for edge in edges)
-    empty = tuple()
+    registry = registry if registry is not None else Stub.Registry()
+    edges = link_edges(docs, registry, find_wikilinks)
+    size = len(registry)
+    link_offsets, link_heads = edges.adjacency(size)
+    backlink_offsets, backlink_tails = edges.adjacency(size, reverse=True)
     for doc in docs:
-        backlinks = frozenset(backlink_index.get(doc.id_path, empty))
-        links = frozenset(link_index.get(doc.id_path, empty))
+        i = registry.id(doc.id_path)
         yield Doc.update_meta(doc, {
-            "links": links,
-            "backlinks": backlinks,
+            "links": registry.stub_list(
+                link_heads[link_offsets[i]:link_offsets[i + 1]]
+            ),
+            "backlinks": registry.stub_list(
+                backlink_tails[backlink_offsets[i]:backlink_offsets[i + 1]]
+            ),
         })
 
 
@@ -132,28 +174,24 @@ _TRANSCLUDE_TEMPLATE = '''<aside class="transclude">
 </aside>'''
 
 
-@composable
-def content_wikilinks(
-    docs,
+def link_renderer(
+    registry,
+    slug_to_id,
     base_url,
     link_template=_LINK_TEMPLATE,
     nolink_template=_NOLINK_TEMPLATE,
     transclude_template=_TRANSCLUDE_TEMPLATE
 ):
     """
-    `[[wikilink]]` is replaced with a link to a doc with the same title
-    (case insensitive), using the `link_template`.
-
-    If no doc exists with that title it will be rendered
-    using `nolink_template`.
+    Create a function `render_wikilink(slug, title, type)` that renders
+    a single parsed wikilink as HTML, looking up linked stubs by slug in
+    `slug_to_id` (a dict of slug to `registry` id). `type` is either
+    "inline" or "transclude".
     """
-    docs = tuple(docs)
-    slug_to_stub = _index_by_slug(docs)
-
     def render_wikilink(slug, title, type):
-        if type is "transclude":
+        if type == "transclude":
             try:
-                link = slug_to_stub[slug]
+                link = registry.stub(slug_to_id[slug])
                 url = to_url(link.output_path, base=base_url)
                 return transclude_template.format(
                     url=url,
@@ -164,14 +202,67 @@ def content_wikilinks(
                 return ""
         else:
             try:
-                link = slug_to_stub[slug]
+                link = registry.stub(slug_to_id[slug])
                 url = to_url(link.output_path, base=base_url)
                 return link_template.format(url=url, title=title)
             except KeyError:
                 return nolink_template.format(title=title)
 
-    render_wikilinks = wikimarkup.renderer(render_wikilink)
+    return render_wikilink
+
+
+def wikilink_renderer(
+    registry,
+    slug_to_id,
+    base_url,
+    link_template=_LINK_TEMPLATE,
+    nolink_template=_NOLINK_TEMPLATE,
+    transclude_template=_TRANSCLUDE_TEMPLATE
+):
+    """
+    Create a function that renders `[[wikilinks]]` in a string, looking
+    up linked stubs by slug in `slug_to_id` (a dict of slug to
+    `registry` id).
+    """
+    return wikimarkup.renderer(link_renderer(
+        registry,
+        slug_to_id,
+        base_url,
+        link_template,
+        nolink_template,
+        transclude_template
+    ))
+
 
+@composable
+def content_wikilinks(
+    docs,
+    base_url,
+    link_template=_LINK_TEMPLATE,
+    nolink_template=_NOLINK_TEMPLATE,
+    transclude_template=_TRANSCLUDE_TEMPLATE,
+    registry=None
+):
+    """
+    `[[wikilink]]` is replaced with a link to a doc with the same title
+    (case insensitive), using the `link_template`.
+
+    If no doc exists with that title it will be rendered
+    using `nolink_template`.
+
+    Stubs for linked docs are interned in `registry`, if given.
+    """
+    docs = tuple(docs)
+    registry = registry if registry is not None else Stub.Registry()
+    ids = tuple(registry.intern(doc) for doc in docs)
+    render_wikilinks = wikilink_renderer(
+        registry,
+        _index_by_slug(docs, ids),
+        base_url,
+        link_template,
+        nolink_template,
+        transclude_template
+    )
     for doc in docs:
         yield over(Doc.content, render_wikilinks, doc)
 
@@ -180,7 +271,9 @@ def content_markdown(
     base_url,
     link_template=_LINK_TEMPLATE,
     nolink_template=_NOLINK_TEMPLATE,
-    transclude_template=_TRANSCLUDE_TEMPLATE
+    transclude_template=_TRANSCLUDE_TEMPLATE,
+    registry=None,
+    backend=None
 ):
     """
     Render markdown and wikilinks.
@@ -190,6 +283,9 @@ def content_markdown(
     - A summary
     - A list of links and backlinks.
 
+    Markdown (content and summary) is rendered with the default
+    `markdowntools` backend, or with `backend`, if given.
+
     Example:
 
         Write _markdown_ like normal.
@@ -204,16 +300,23 @@ def content_markdown(
 
         If you put a wikilink on it's own line, as above, it will be rendered as a rich snippet (transclude).
     """
+    if backend is None:
+        render_markdown = markdowntools.content
+        summary = summary_markdown
+    else:
+        render_markdown = markdowntools.content_with(backend)
+        summary = summary_markdown_with(backend)
     return compose(
-        markdowntools.content,
+        render_markdown,
         content_wikilinks(
             base_url,
             link_template,
             nolink_template,
-            transclude_template
+            transclude_template,
+            registry
         ),
-        annotate_links,
-        summary_markdown
+        rest(annotate_links, registry=registry),
+        summary
     )
 
 
@@ -221,7 +324,8 @@ def content_html(
     base_url,
     link_template=_LINK_TEMPLATE,
     nolink_template=_NOLINK_TEMPLATE,
-    transclude_template=_TRANSCLUDE_TEMPLATE
+    transclude_template=_TRANSCLUDE_TEMPLATE,
+    registry=None
 ):
     """
     Render html (wrap bare lines with paragraphs) and wikilinks.
@@ -259,8 +363,9 @@ def content_html(
             base_url,
             link_template,
             nolink_template,
-            transclude_template
+            transclude_template,
+            registry
         ),
-        annotate_links,
+        rest(annotate_links, registry=registry),
         summary_html
     )
\ No newline at end of file
@@ -5,27 +5,39 @@ import re
 from lettersmith.path import to_slug
 
 
-_WIKILINK = r'\[\[([^\]]+)\]\]'
-_TRANSCLUDE = r'^\[\[([^\]]+)\]\]$'
+# Regular expression source for a `[[wikilink]]`, anywhere in text
+WIKILINK = r'\[\[([^\]]+)\]\]'
+# Regular expression source for a `[[wikilink]]` alone on a line
+# (a transclude). Use with `re.MULTILINE`.
+TRANSCLUDE = r'^\[\[([^\]]+)\]\]$'
 
 
 def _sub_wikilink_title(match):
-    slug, title = _parse_wikilink(match.group(0))
+    slug, title = parse_wikilink(match.group(0))
     return title
 
 
+def wikilink_titles(text):
+    """
+    Replace every wikilink in text with its title, including wikilinks
+    that are alone on a line. Unlike `strip_wikilinks`, no text is
+    removed.
+    """
+    return re.sub(WIKILINK, _sub_wikilink_title, text)
+
+
 def strip_wikilinks(text):
     """
     Strip markup from text
     """
     # Remove transcludes completely
-    text = re.sub(_TRANSCLUDE, "", text, flags=re.MULTILINE)
+    text = re.sub(TRANSCLUDE, "", text, flags=re.MULTILINE)
     # Remove inline wikilinks, but leaves bare text
-    text = re.sub(_WIKILINK, _sub_wikilink_title, text)
+    text = re.sub(WIKILINK, _sub_wikilink_title, text)
     return text
 
 
-def _parse_wikilink(wikilink_str):
+def parse_wikilink(wikilink_str):
     """
     Given a `[[WikiLink]]` or a `[[wikilink | Title]]`, return a
     tuple of `(wikilink, Title)`.
@@ -48,8 +60,8 @@ def find_wikilinks(s):
     Find all wikilinks in a string (if any)
     Returns an iterator of 2-tuples for slug, title.
     """
-    for match in re.finditer(_WIKILINK, s):
-        yield _parse_wikilink(match.group(0))
+    for match in re.finditer(WIKILINK, s):
+        yield parse_wikilink(match.group(0))
 
 
 def renderer(render_wikilink):
@@ -57,16 +69,16 @@ def renderer(render_wikilink):
     Creates a renderer function
     """
     def _render_wikilink(match):
-        slug, title = _parse_wikilink(match.group(0))
+        slug, title = parse_wikilink(match.group(0))
         return render_wikilink(slug, title, "inline")
 
     def _render_transclude(match):
-        slug, title = _parse_wikilink(match.group(0))
+        slug, title = parse_wikilink(match.group(0))
         return render_wikilink(slug, title, "transclude")
 
     def render_text(text):
-        text = re.sub(_TRANSCLUDE, _render_transclude, text, flags=re.MULTILINE)
-        text = re.sub(_WIKILINK, _render_wikilink, text)
+        text = re.sub(TRANSCLUDE, _render_transclude, text, flags=re.MULTILINE)
+        text = re.sub(WIKILINK, _render_wikilink, text)
         return text
 
     return render_text
\ No newline at end of file
@@ -1,37 +1,452 @@
-from pathlib import PurePath
+from pathlib import Path, PurePath
+from queue import Queue
+from threading import Thread
+from datetime import datetime
+from io import BytesIO
+import gzip
+import os
 import shutil
+import tarfile
+import time
+import zipfile
 from lettersmith import doc as Doc
 from lettersmith import file as File
-from lettersmith.io import write_file_deep
+from lettersmith.io import write_blob_deep, blob_size
+from lettersmith import runtime
+
+
+def _clear_directory(dir_path):
+    """
+    Remove a directory before writing a fresh build into it.
+
+    Refuses to clear a symlink. `rmtree` won't remove one, so files
+    would be written through it, into whatever it points at (like the
+    hardlinked files of a `snapshot_writer` snapshot).
+    """
+    if os.path.islink(dir_path):
+        msg = (
+            "Can't write to {path}, because it is a symlink. "
+            "If it was published by snapshot_writer, keep writing it "
+            "with snapshot_writer, or remove the symlink first."
+        )
+        raise ValueError(msg.format(path=dir_path))
+    shutil.rmtree(dir_path, ignore_errors=True)
 
 
 def writer(writeable):
     """
     Lift a `writeable` function that reads a data object and returns
-    a 2-tuple of `(pathlike, bytes)`.
+    a 2-tuple of `(pathlike, bytes)`. The bytes can also be a
+    `PurePath` to a file to copy (see `file.writeable`).
 
     Returns a `write` function that knows how to take these 2-tuples
-    and write them to disk.
+    and write them to disk. If `directory` is an archive path
+    (see `archive_format`), they are written into an archive instead,
+    using `archive_writer`.
     """
+    write_archive = archive_writer(writeable)
+
     def write(things, directory):
         """
         Write files to `directory`.
         """
+        if archive_format(directory) is not None:
+            return write_archive(things, directory)
         dir_path = PurePath(directory)
-        shutil.rmtree(dir_path, ignore_errors=True)
+        _clear_directory(dir_path)
+        known_dirs = set()
         written = 0
         for thing in things:
             written = written + 1
             output_path, blob = writeable(thing)
-            write_file_deep(
+            write_blob_deep(
                 dir_path.joinpath(output_path),
                 blob,
-                mode="wb"
+                known_dirs=known_dirs
             )
         return {"written": written}
     return write
 
 
+_ARCHIVE_SUFFIXES = (
+    (".tar.gz", "tar.gz"),
+    (".tgz", "tar.gz"),
+    (".tar", "tar"),
+    (".zip", "zip")
+)
+
+# The earliest time a zip file can hold (1980-01-01 UTC).
+_ZIP_EPOCH = 315532800
+
+
+def archive_format(pathlike):
+    """
+    Get the archive format for a path, from its suffix: "tar", "tar.gz"
+    or "zip". Returns None if the path isn't an archive path.
+    """
+    name = PurePath(pathlike).name.lower()
+    for suffix, kind in _ARCHIVE_SUFFIXES:
+        if name.endswith(suffix):
+            return kind
+    return None
+
+
+def _source_date_epoch():
+    """
+    Get the timestamp for archive entries. Uses `SOURCE_DATE_EPOCH`
+    if it is set (see reproducible-builds.org), so archives are
+    byte-for-byte reproducible.
+    """
+    try:
+        return max(int(os.environ["SOURCE_DATE_EPOCH"]), _ZIP_EPOCH)
+    except (KeyError, ValueError):
+        return _ZIP_EPOCH
+
+
+def _archive_name(output_path):
+    return PurePath(output_path).as_posix()
+
+
+class _TarSink:
+    def __init__(self, f, mtime, compress):
+        self._gzip = (
+            gzip.GzipFile(
+                filename="",
+                mode="wb",
+                fileobj=f,
+                mtime=mtime,
+                compresslevel=6
+            )
+            if compress else None
+        )
+        self._tar = tarfile.open(
+            fileobj=self._gzip if compress else f,
+            mode="w",
+            format=tarfile.PAX_FORMAT
+        )
+        self._mtime = mtime
+
+    def add(self, name, blob):
+        info = tarfile.TarInfo(name)
+        info.size = blob_size(blob)
+        info.mtime = self._mtime
+        info.mode = 0o644
+        if isinstance(blob, PurePath):
+            with open(blob, "rb") as src:
+                self._tar.addfile(info, src)
+        else:
+            self._tar.addfile(info, BytesIO(blob))
+        return info.size
+
+    def close(self):
+        self._tar.close()
+        if self._gzip is not None:
+            self._gzip.close()
+
+
+class _ZipSink:
+    def __init__(self, f, mtime):
+        self._zip = zipfile.ZipFile(f, mode="w")
+        self._date_time = time.gmtime(mtime)[:6]
+
+    def add(self, name, blob):
+        info = zipfile.ZipInfo(name, date_time=self._date_time)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        if isinstance(blob, PurePath):
+            size = blob_size(blob)
+            with open(blob, "rb") as src:
+                with self._zip.open(info, "w", force_zip64=True) as dst:
+                    shutil.copyfileobj(src, dst)
+            return size
+        self._zip.writestr(info, blob)
+        return len(blob)
+
+    def close(self):
+        self._zip.close()
+
+
+def archive_writer(writeable, mtime=None):
+    """
+    Lift a `writeable` function into a `write` function that writes
+    into a single archive file, instead of a directory. The archive
+    format ("tar", "tar.gz" or "zip") comes from the archive path's
+    suffix (see `archive_format`).
+
+    Each `(path, bytes)` pair is streamed into the archive as it is
+    made, in one sequential write. Blobs that are paths (lazy files)
+    are streamed in from disk. Entries are written in stream order,
+    with the same timestamp (`mtime`, or `SOURCE_DATE_EPOCH`, or
+    1980-01-01), permissions and owner, so the same build makes the
+    same archive, byte for byte.
+
+    The archive replaces any existing file only once it is complete.
+    Returns a dict of stats: files written and bytes written
+    (uncompressed).
+    """
+    def write(things, archive_path):
+        """
+        Write files into the archive at `archive_path`.
+        """
+        kind = archive_format(archive_path)
+        if kind is None:
+            raise ValueError(
+                "Unknown archive format for {}".format(archive_path)
+            )
+        entry_mtime = mtime if mtime is not None else _source_date_epoch()
+        file_path = Path(archive_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = file_path.with_name(
+            ".{}.{}.tmp".format(file_path.name, os.getpid())
+        )
+        written = 0
+        size = 0
+        complete = False
+        try:
+            with open(tmp_path, "wb") as f:
+                if kind == "zip":
+                    sink = _ZipSink(f, entry_mtime)
+                else:
+                    sink = _TarSink(
+                        f,
+                        entry_mtime,
+                        compress=(kind == "tar.gz")
+                    )
+                try:
+                    for thing in things:
+                        output_path, blob = writeable(thing)
+                        size = size + sink.add(_archive_name(output_path), blob)
+                        written = written + 1
+                finally:
+                    sink.close()
+            os.replace(tmp_path, file_path)
+            complete = True
+        finally:
+            if not complete:
+                try:
+                    os.unlink(tmp_path)
+                except FileNotFoundError:
+                    pass
+        return {"written": written, "bytes": size}
+    return write
+
+
+class WriteError(Exception):
+    """
+    Raised by a threaded write when one or more files fail to write.
+    The original exception is chained as `__cause__`, and `stats`
+    holds the write stats.
+    """
+    def __init__(self, msg, stats):
+        super().__init__(msg)
+        self.stats = stats
+
+
+_DONE = None
+
+
+def _write_worker(queue, dir_path, known_dirs, results):
+    written = 0
+    size = 0
+    errors = []
+    while True:
+        item = queue.get()
+        if item is _DONE:
+            break
+        i, output_path, blob = item
+        try:
+            write_blob_deep(
+                dir_path.joinpath(output_path),
+                blob,
+                known_dirs=known_dirs
+            )
+            written = written + 1
+            size = size + blob_size(blob)
+        except Exception as e:
+            errors.append((i, output_path, e))
+    results.append((written, size, errors))
+
+
+def threaded_writer(writeable, jobs=None, queue_size=64):
+    """
+    Lift a `writeable` function into a `write` function, like `writer`,
+    that hands `(path, bytes)` pairs to a pool of `jobs` I/O threads.
+    If `jobs` is None, the build's `jobs` option is used, or 4 if that
+    isn't set either.
+
+    Docs are still rendered lazily on the calling thread, as `things`
+    is iterated, so rendering overlaps with disk writes. The queue
+    holds at most `queue_size` pending writes. If the disk falls
+    behind, rendering waits (backpressure).
+
+    Returns a dict of stats: files written, bytes written and
+    directories created. If any writes fail, every other file is still
+    written, then a `WriteError` is raised for the failure that came
+    first in `things` order, no matter which thread saw it first.
+    """
+    def write(things, directory):
+        """
+        Write files to `directory`, using background I/O threads.
+        """
+        dir_path = PurePath(directory)
+        _clear_directory(dir_path)
+        known_dirs = set()
+        queue = Queue(maxsize=queue_size)
+        n_threads = jobs if jobs is not None else runtime.jobs(4)
+        results = []
+        threads = tuple(
+            Thread(
+                target=_write_worker,
+                args=(queue, dir_path, known_dirs, results),
+                daemon=True
+            )
+            for i in range(n_threads)
+        )
+        for thread in threads:
+            thread.start()
+        try:
+            for i, thing in enumerate(things):
+                output_path, blob = writeable(thing)
+                queue.put((i, output_path, blob))
+        finally:
+            for thread in threads:
+                queue.put(_DONE)
+            for thread in threads:
+                thread.join()
+        stats = {
+            "written": sum(written for written, size, errors in results),
+            "bytes": sum(size for written, size, errors in results),
+            "directories": len(known_dirs)
+        }
+        errors = sorted(
+            (error for written, size, errs in results for error in errs),
+            key=lambda error: error[0]
+        )
+        if errors:
+            i, output_path, e = errors[0]
+            msg = "Error writing {path} ({count} failed writes)".format(
+                path=output_path,
+                count=len(errors)
+            )
+            raise WriteError(msg, stats) from e
+        return stats
+    return write
+
+
+_CHUNK_SIZE = 1 << 16
+
+
+def _same_file(pathlike, blob):
+    """
+    Check if the file at `pathlike` exists and holds exactly `blob`.
+
+    Blobs that are paths (lazy files) are compared with the file a chunk
+    at a time, so they are never read into memory whole.
+    """
+    try:
+        if os.stat(pathlike).st_size != blob_size(blob):
+            return False
+        with open(pathlike, "rb") as f:
+            if not isinstance(blob, PurePath):
+                return f.read() == blob
+            with open(blob, "rb") as source:
+                while True:
+                    chunk = f.read(_CHUNK_SIZE)
+                    if chunk != source.read(_CHUNK_SIZE):
+                        return False
+                    if not chunk:
+                        return True
+    except OSError:
+        return False
+
+
+def _swap_symlink(link_path, target):
+    """
+    Atomically point the symlink at `link_path` to `target`.
+
+    If `link_path` is a real directory (e.g. output from a regular
+    `write`), it is removed first. That first swap is not
+    atomic, but every swap after it is.
+    """
+    tmp_link = link_path.with_name(".{}.swap".format(link_path.name))
+    try:
+        os.unlink(tmp_link)
+    except FileNotFoundError:
+        pass
+    os.symlink(target, tmp_link)
+    if link_path.is_dir() and not link_path.is_symlink():
+        shutil.rmtree(link_path)
+    os.replace(tmp_link, link_path)
+
+
+def snapshot_writer(writeable, keep=1):
+    """
+    Lift a `writeable` function into a `write` function that publishes
+    each build as an atomic snapshot.
+
+    Instead of deleting and rewriting `directory`, every build goes into
+    a fresh staging directory next to it. Files that are byte-identical
+    to the previous build are hardlinked from it, rather than
+    rewritten. When the build is finished, `directory` is swapped to
+    point at the new snapshot with an atomic symlink rename. Readers
+    always see either the whole old build or the whole new build.
+
+    Snapshots live in `.{name}.snapshots/` beside `directory`. The
+    current snapshot and the `keep` snapshots before it are kept
+    (for rollback). Older ones are removed. If the build fails, its
+    staging directory is removed, and `directory` is left as it was.
+
+    Returns a dict of stats: files written and files linked.
+    """
+    def write(things, directory):
+        """
+        Write files to a new snapshot, then publish it at `directory`.
+        """
+        link_path = Path(directory)
+        snapshots_path = link_path.with_name(
+            ".{}.snapshots".format(link_path.name)
+        )
+        previous = link_path.resolve() if link_path.is_dir() else None
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        staging = Path(snapshots_path, stamp)
+        staging.mkdir(parents=True)
+        known_dirs = set()
+        written = 0
+        linked = 0
+        try:
+            for thing in things:
+                output_path, blob = writeable(thing)
+                file_path = staging.joinpath(output_path)
+                if previous is not None:
+                    previous_path = previous.joinpath(output_path)
+                    if _same_file(previous_path, blob):
+                        parent = file_path.parent
+                        if parent not in known_dirs:
+                            parent.mkdir(parents=True, exist_ok=True)
+                            known_dirs.add(parent)
+                        try:
+                            os.link(previous_path, file_path)
+                            linked = linked + 1
+                            continue
+                        except OSError:
+                            pass
+                write_blob_deep(file_path, blob, known_dirs=known_dirs)
+                written = written + 1
+            _swap_symlink(
+                link_path,
+                os.path.relpath(staging, link_path.parent)
+            )
+        except BaseException:
+            # Don't leave a half-written snapshot behind.
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        snapshots = sorted(p for p in snapshots_path.iterdir() if p.is_dir())
+        for old in snapshots[:-(keep + 1)]:
+            shutil.rmtree(old, ignore_errors=True)
+        return {"written": written, "linked": linked}
+    return write
+
+
 def writeable(thing):
     """
     Write a doc or file to `output_path`.
@@ -51,4 +466,33 @@ def writeable(thing):
         raise ValueError(msg.format(type=type(thing)))
 
 
-write = writer(writeable)
\ No newline at end of file
+_write = writer(writeable)
+
+
+def write(things, directory):
+    """
+    Write docs and files to `directory`.
+
+    If `directory` is an archive path, like `public.tar.gz`, files are
+    streamed into the archive instead (see `archive_writer`).
+
+    If the build's `jobs` option is more than 1 (see
+    `lettersmith.runtime`), files are written by that many I/O threads,
+    using `threaded_writer`.
+
+    If the build's `serve` option is set, nothing is written. Instead,
+    the site is served from memory (see `lettersmith.serve`). This
+    blocks until the server is interrupted (Ctrl-C), then returns the
+    server's stats, with nothing written.
+    """
+    address = runtime.serve_address()
+    if address is not None:
+        # Imported here, since serve imports this module.
+        from lettersmith import serve
+        host, port = address
+        stats = serve.serve(things, host=host, port=port)
+        return {"written": 0, **stats}
+    n_threads = runtime.jobs(1)
+    if n_threads > 1 and archive_format(directory) is None:
+        return threaded_writer(writeable, jobs=n_threads)(things, directory)
+    return _write(things, directory)
\ No newline at end of file
@@ -16,8 +16,9 @@ setup(
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
-        "Programming Language :: Python :: 3.6",
+        "Programming Language :: Python :: 3.7",
     ],
+    python_requires=">=3.7",
     packages=find_packages(exclude=("tests", "tests.*")),
     install_requires=[
         "PyYAML>=3.13",
@@ -32,6 +33,7 @@ setup(
     entry_points={
         "console_scripts": [
             "lettersmith_scaffold=lettersmith.cli.scaffold:main",
+            "lettersmith=lettersmith.cli.main:main",
         ]
     }
 )
@@ -0,0 +1,94 @@
+"""
+Unit tests for aio
+"""
+import asyncio
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from lettersmith import aio
+from lettersmith import doc as Doc
+from lettersmith import docs as Docs
+from lettersmith import query
+from lettersmith.write import snapshot_writer, writeable
+
+
+async def _double(x):
+    await asyncio.sleep(0.01 * (5 - x))
+    return x * 2
+
+
+def _is_even(x):
+    return x % 2 == 0
+
+
+class test_pipe(unittest.TestCase):
+    def test_maps_keeps_order(self):
+        result = asyncio.run(aio.pipe(
+            range(5),
+            aio.maps(_double, concurrency=5),
+            aio.collect
+        ))
+        self.assertEqual(result, (0, 2, 4, 6, 8))
+
+    def test_sync_stages(self):
+        result = asyncio.run(aio.pipe(
+            range(10),
+            query.maps(lambda x: x + 1),
+            aio.filters(_is_even, concurrency=3),
+            query.sorts(reverse=True),
+            query.takes(3),
+            tuple
+        ))
+        self.assertEqual(result, (10, 8, 6))
+
+    def test_sync_stage_error(self):
+        def fail(xs):
+            for x in xs:
+                raise ValueError(x)
+            yield
+        with self.assertRaises(ValueError):
+            asyncio.run(aio.pipe(range(3), fail, aio.collect))
+
+
+class test_find_and_write(unittest.TestCase):
+    def test_roundtrip(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                Path("post").mkdir()
+                for name in ("a", "b", "c"):
+                    Path("post", name + ".md").write_text(name)
+                docs = asyncio.run(aio.pipe(
+                    aio.find("post/*.md"),
+                    Docs.with_ext_html,
+                    aio.collect
+                ))
+                stats = asyncio.run(aio.write(docs, directory="public"))
+                written = Path("public/post/b.html").read_text()
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(
+            tuple(doc.id_path for doc in docs),
+            ("post/a.md", "post/b.md", "post/c.md")
+        )
+        self.assertEqual(stats["written"], 3)
+        self.assertEqual(written, "b")
+
+    def test_refuses_snapshot(self):
+        doc = Doc.create("a.md", "a.html", content="new")
+        with tempfile.TemporaryDirectory() as tmp:
+            public = Path(tmp, "public")
+            write_snapshot = snapshot_writer(writeable)
+            write_snapshot([doc._replace(content="old")], public)
+            write_snapshot([doc._replace(content="old")], public)
+            snapshot_file = Path(public, "a.html").resolve()
+            with self.assertRaises(ValueError):
+                asyncio.run(aio.write([doc], public))
+            self.assertTrue(public.is_symlink())
+            self.assertEqual(snapshot_file.read_text(), "old")
+
+
+if __name__ == '__main__':
+    unittest.main()
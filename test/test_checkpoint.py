@@ -0,0 +1,77 @@
+"""
+Unit tests for checkpoint
+"""
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from lettersmith import checkpoint
+from lettersmith import docs as Docs
+from lettersmith import stub as Stub
+from lettersmith.func import pipe
+
+
+class test_checkpoint(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        Path("post").mkdir()
+        Path("post/a.md").write_text("A")
+        Path("post/b.md").write_text("B")
+        self.calls = 0
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def expensive(self, docs):
+        for doc in docs:
+            self.calls = self.calls + 1
+            yield doc._replace(
+                content=doc.content.lower(),
+                meta={"links": Stub.Registry().stub_list(())}
+            )
+
+    def build(self, key="x"):
+        return pipe(
+            Docs.find("post/*.md"),
+            self.expensive,
+            checkpoint.checkpoint(
+                "posts",
+                ("post/*.md",),
+                key=key,
+                cache_dir="cache"
+            ),
+            tuple
+        )
+
+    def test_resume(self):
+        first = self.build()
+        self.assertEqual(self.calls, 2)
+        second = self.build()
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(
+            tuple(doc._replace(meta={}) for doc in first),
+            tuple(doc._replace(meta={}) for doc in second)
+        )
+        self.assertEqual(tuple(second[0].meta["links"]), ())
+
+    def test_invalidate(self):
+        self.build()
+        os.utime("post/a.md", (0, 0))
+        self.build()
+        self.assertEqual(self.calls, 4)
+        self.build(key="y")
+        self.assertEqual(self.calls, 6)
+
+    def test_partial_read(self):
+        stage = checkpoint.checkpoint("posts", ("post/*.md",), cache_dir="cache")
+        docs = stage(Docs.find("post/*.md"))
+        next(docs)
+        docs.close()
+        self.assertIsNone(checkpoint.read_fingerprint("cache/checkpoint/posts"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+Unit tests for data
+"""
+import unittest
+import tempfile
+import json
+from pathlib import Path
+from lettersmith import data
+
+
+class test_lazy(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_path = Path(self.tmp.name, "data")
+        self.data_path.mkdir()
+        Path(self.data_path, "authors.yaml").write_text("- name: Ada\n")
+        Path(self.data_path, "site.json").write_text(json.dumps({"a": 1}))
+        self.cache_dir = Path(self.tmp.name, "cache")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_find(self):
+        found = data.find(self.data_path)
+        self.assertEqual(found["authors"], [{"name": "Ada"}])
+        self.assertEqual(found["site"], {"a": 1})
+
+    def test_lazy_parse(self):
+        Path(self.data_path, "broken.json").write_text("{")
+        lazy = data.lazy(self.data_path)
+        self.assertEqual(sorted(lazy), ["authors", "broken", "site"])
+        # Files that are never read are never parsed
+        self.assertEqual(lazy["site"], {"a": 1})
+        with self.assertRaises(ValueError):
+            lazy["broken"]
+
+    def test_lazy_parse_once(self):
+        lazy = data.lazy(self.data_path)
+        site = lazy["site"]
+        Path(self.data_path, "site.json").write_text(json.dumps({"a": 2}))
+        self.assertIs(lazy["site"], site)
+
+    def test_contains(self):
+        Path(self.data_path, "broken.json").write_text("{")
+        lazy = data.lazy(self.data_path)
+        with lazy.recording("page.html"):
+            self.assertIn("broken", lazy)
+            self.assertNotIn("nope", lazy)
+        self.assertEqual(lazy.report(), {"page.html": ()})
+
+    def test_disk_cache(self):
+        lazy = data.lazy(self.data_path, cache_dir=self.cache_dir)
+        self.assertEqual(lazy["site"], {"a": 1})
+        cached = data.lazy(self.data_path, cache_dir=self.cache_dir)
+        # Parsed value comes from the cache record, not the file
+        self.assertEqual(cached["site"], {"a": 1})
+        Path(self.data_path, "site.json").write_text(json.dumps({"a": 2}))
+        changed = data.lazy(self.data_path, cache_dir=self.cache_dir)
+        self.assertEqual(changed["site"], {"a": 2})
+
+    def test_recording(self):
+        lazy = data.lazy(self.data_path)
+        with lazy.recording("post.html"):
+            lazy["authors"]
+        with lazy.recording("page.html"):
+            pass
+        self.assertEqual(
+            lazy.report(),
+            {"post.html": ("authors",), "page.html": ()}
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
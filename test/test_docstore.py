@@ -0,0 +1,166 @@
+"""
+Unit tests for docstore
+"""
+import unittest
+import sqlite3
+import tempfile
+from datetime import date, datetime
+from pathlib import Path
+from lettersmith import doc as Doc
+from lettersmith import stub as Stub
+from lettersmith import docstore
+
+
+def _docs():
+    return (
+        Doc.create(
+            "post/a.md", "post/a.html",
+            created=datetime(2019, 3, 1),
+            title="A",
+            content="Links to [[B]] and [[Nope]].",
+            meta={"tags": ["x", "y"]},
+            template="post.html"
+        ),
+        Doc.create(
+            "post/b.md", "post/b.html",
+            created=datetime(2020, 3, 1),
+            title="B",
+            content="Links to [[A]].",
+            meta={"tags": ["x"]},
+            template="post.html"
+        ),
+        Doc.create(
+            "page/c.md", "page/c.html",
+            created=datetime(2019, 5, 1),
+            title="C",
+            content="C.",
+            template="page.html"
+        )
+    )
+
+
+class test_docstore(unittest.TestCase):
+    def setUp(self):
+        self.store = docstore.DocStore()
+        self.store.put(_docs())
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_get(self):
+        doc = _docs()[0]
+        self.assertEqual(self.store.get("post/a.md"), doc)
+        self.assertIsNone(self.store.get("nope"))
+        self.assertEqual(len(self.store), 3)
+
+    def test_query(self):
+        stubs = self.store.stubs(
+            taxonomy="tags",
+            term="x",
+            created_after=datetime(2019, 1, 1),
+            created_before=datetime(2020, 1, 1)
+        )
+        self.assertEqual(tuple(s.id_path for s in stubs), ("post/a.md",))
+        stubs = self.store.stubs(glob="post/*")
+        self.assertEqual(
+            tuple(s.id_path for s in stubs),
+            ("post/b.md", "post/a.md")
+        )
+        docs = tuple(self.store.docs(template="page.html"))
+        self.assertEqual(docs, (_docs()[2],))
+
+    def test_taxonomy(self):
+        self.assertEqual(self.store.terms("tags"), {"x": 2, "y": 1})
+        index = self.store.index_taxonomy("tags")
+        self.assertEqual(
+            tuple(s.id_path for s in index["x"]),
+            ("post/b.md", "post/a.md")
+        )
+
+    def test_links(self):
+        links = self.store.links("post/a.md")
+        self.assertEqual(tuple(s.id_path for s in links), ("post/b.md",))
+        backlinks = self.store.backlinks("post/a.md")
+        self.assertEqual(tuple(s.id_path for s in backlinks), ("post/b.md",))
+        self.assertEqual(self.store.backlinks("page/c.md"), ())
+
+    def test_replace_and_prune(self):
+        a = _docs()[0]._replace(meta={"tags": ["z"]})
+        self.store.put((a,))
+        self.assertEqual(self.store.terms("tags"), {"x": 1, "z": 1})
+        stub = Stub.from_doc(_docs()[2])._replace(title="New C")
+        self.store.put((stub,))
+        self.assertEqual(self.store.get("page/c.md").content, "C.")
+        self.assertEqual(self.store.get("page/c.md").title, "New C")
+        self.assertEqual(self.store.prune(("post/a.md",), glob="post/*"), 1)
+        self.assertNotIn("post/b.md", self.store)
+        self.assertIn("page/c.md", self.store)
+
+
+class test_term_types(unittest.TestCase):
+    def setUp(self):
+        self.store = docstore.DocStore()
+        self.store.put((
+            Doc.create(
+                "a.md", "a.html",
+                title="A",
+                meta={"year": [2020, "2020", date(2020, 1, 2), True]}
+            ),
+            Doc.create("b.md", "b.html", title="B", meta={"year": [2020]})
+        ), taxonomies=("year",))
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_query_by_typed_term(self):
+        stubs = self.store.stubs(taxonomy="year", term=2020)
+        self.assertEqual(sorted(s.id_path for s in stubs), ["a.md", "b.md"])
+        stubs = self.store.stubs(taxonomy="year", term="2020")
+        self.assertEqual(tuple(s.id_path for s in stubs), ("a.md",))
+        stubs = self.store.stubs(taxonomy="year", term=date(2020, 1, 2))
+        self.assertEqual(tuple(s.id_path for s in stubs), ("a.md",))
+
+    def test_terms_keep_types(self):
+        terms = self.store.terms("year")
+        self.assertEqual(
+            {(type(term), term): count for term, count in terms.items()},
+            {
+                (int, 2020): 2,
+                (str, "2020"): 1,
+                (date, date(2020, 1, 2)): 1,
+                (bool, True): 1
+            }
+        )
+        index = self.store.index_taxonomy("year")
+        self.assertEqual(len(index[2020]), 2)
+
+    def test_unknown_term_type(self):
+        doc = Doc.create("c.md", "c.html", title="C", meta={"year": [None]})
+        with self.assertRaises(TypeError):
+            self.store.put((doc,), taxonomies=("year",))
+
+
+class test_open_store(unittest.TestCase):
+    def test_persists(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp, "docs.sqlite")
+            with docstore.open_store(path) as store:
+                store.put(_docs())
+            with docstore.open_store(path) as store:
+                self.assertEqual(len(store), 3)
+
+    def test_old_schema_rebuilt(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp, "docs.sqlite")
+            conn = sqlite3.connect(str(path))
+            conn.execute(
+                "CREATE TABLE terms (id_path TEXT, taxonomy TEXT, term TEXT)"
+            )
+            conn.close()
+            with docstore.open_store(path) as store:
+                store.put(_docs())
+                self.assertEqual(store.terms("tags"), {"x": 2, "y": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+"""
+Unit tests for export
+"""
+import unittest
+import tempfile
+import json
+from datetime import date, datetime
+from pathlib import Path
+from lettersmith import doc as Doc
+from lettersmith import stub as Stub
+from lettersmith import export
+
+
+def _doc(id_path, title, meta={}):
+    return Doc.create(
+        id_path=id_path,
+        output_path=id_path,
+        title=title,
+        content="<p>Long content</p>",
+        meta=meta
+    )
+
+
+class test_to_data(unittest.TestCase):
+    def test_stubs_by_id_path(self):
+        registry = Stub.Registry()
+        b = _doc("post/b.md", "B")
+        registry.intern(b)
+        doc = _doc("post/a.md", "A", {
+            "links": registry.stub_list((0,)),
+            "related": (Stub.from_doc(b),)
+        })
+        data = export.to_data(doc)
+        self.assertEqual(data["meta"]["links"], ["post/b.md"])
+        self.assertEqual(data["meta"]["related"], ["post/b.md"])
+        self.assertIsInstance(data["created"], float)
+
+    def test_fields(self):
+        doc = _doc("post/a.md", "A", {"tags": ("x",), "summary": "S"})
+        data = export.to_data(doc, fields=("title", "meta.tags"))
+        self.assertEqual(data, {
+            "@type": "doc",
+            "id_path": "post/a.md",
+            "title": "A",
+            "meta": {"tags": ["x"]}
+        })
+
+    def test_exclude(self):
+        doc = _doc("post/a.md", "A", {"tags": ("x",), "summary": "S"})
+        data = export.to_data(doc, exclude=("content", "meta.summary"))
+        self.assertNotIn("content", data)
+        self.assertEqual(data["meta"], {"tags": ["x"]})
+
+    def test_stub(self):
+        stub = Stub.from_doc(_doc("post/a.md", "A"))
+        data = export.to_data(stub)
+        self.assertEqual(data["@type"], "stub")
+        self.assertEqual(data["title"], "A")
+
+    def test_unknown_type(self):
+        with self.assertRaises(ValueError):
+            export.to_data("nope")
+
+    def test_dates(self):
+        doc = _doc("post/a.md", "A", {
+            "date": date(2020, 1, 2),
+            "updated": datetime(2020, 1, 2, 3, 4, 5)
+        })
+        data = export.to_data(doc)
+        self.assertEqual(data["meta"]["date"], "2020-01-02")
+        self.assertEqual(data["meta"]["updated"], "2020-01-02T03:04:05")
+        json.loads(export.encode(doc))
+
+    def test_unexportable_value(self):
+        doc = _doc("post/a.md", "A", {"extra": {"thing": object()}})
+        with self.assertRaises(TypeError) as raised:
+            export.encode(doc)
+        self.assertIn("post/a.md", str(raised.exception))
+        self.assertIn("meta.extra.thing", str(raised.exception))
+
+
+class test_dump(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = (
+            _doc("post/a.md", "A"),
+            _doc("page/b.md", "B"),
+            _doc("post/c.md", "C"),
+            _doc("d.md", "D")
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ndjson(self):
+        path = Path(self.tmp.name, "api", "docs.ndjson")
+        stage = export.ndjson(path, exclude=("content",))
+        passed = tuple(stage(iter(self.docs)))
+        self.assertEqual(passed, self.docs)
+        lines = path.read_text().splitlines()
+        self.assertEqual(
+            [json.loads(line)["title"] for line in lines],
+            ["A", "B", "C", "D"]
+        )
+        self.assertNotIn("content", json.loads(lines[0]))
+
+    def test_ndjson_not_replaced_until_done(self):
+        path = Path(self.tmp.name, "docs.ndjson")
+        path.write_text("old")
+        docs = export.ndjson(path)(iter(self.docs))
+        next(docs)
+        docs.close()
+        self.assertEqual(path.read_text(), "old")
+        self.assertEqual(tuple(Path(self.tmp.name).iterdir()), (path,))
+
+    def test_sections(self):
+        directory = Path(self.tmp.name, "api")
+        stage = export.sections(directory, shard_size=1, fields=("title",))
+        passed = tuple(stage(iter(self.docs)))
+        self.assertEqual(passed, self.docs)
+        index = json.loads(Path(directory, "index.json").read_text())
+        self.assertEqual(index["sections"], {
+            "post": {"count": 2, "shards": ["post/0.json", "post/1.json"]},
+            "page": {"count": 1, "shards": ["page/0.json"]},
+            "root": {"count": 1, "shards": ["root/0.json"]}
+        })
+        shard = json.loads(Path(directory, "post/1.json").read_text())
+        self.assertEqual(
+            shard,
+            [{"@type": "doc", "id_path": "post/c.md", "title": "C"}]
+        )
+
+    def test_sections_max_open(self):
+        directory = Path(self.tmp.name, "api")
+        docs = tuple(
+            _doc("{}/{}.md".format(section, i), str(i))
+            for i in range(3) for section in ("a", "b", "c")
+        )
+        stage = export.sections(directory, fields=("title",), max_open=1)
+        tuple(stage(iter(docs)))
+        for section in ("a", "b", "c"):
+            shard = json.loads(Path(directory, section, "0.json").read_text())
+            self.assertEqual(
+                [item["title"] for item in shard],
+                ["0", "1", "2"]
+            )
+
+    def test_sections_replaced(self):
+        directory = Path(self.tmp.name, "api")
+        tuple(export.sections(directory)(iter(self.docs)))
+        tuple(export.sections(directory)(iter(self.docs[:1])))
+        self.assertEqual(
+            sorted(p.name for p in directory.iterdir()),
+            ["index.json", "post"]
+        )
+        self.assertEqual(
+            tuple(Path(self.tmp.name).iterdir()),
+            (directory,)
+        )
+
+    def test_sections_not_replaced_until_done(self):
+        directory = Path(self.tmp.name, "api")
+        tuple(export.sections(directory)(iter(self.docs)))
+        before = Path(directory, "index.json").read_text()
+        docs = export.sections(directory)(iter(self.docs[:1]))
+        next(docs)
+        docs.close()
+        self.assertEqual(Path(directory, "index.json").read_text(), before)
+        self.assertTrue(Path(directory, "page", "0.json").exists())
+        self.assertEqual(
+            tuple(Path(self.tmp.name).iterdir()),
+            (directory,)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Unit tests for link graph
+"""
+import unittest
+from lettersmith import doc as Doc
+from lettersmith import stub as Stub
+from lettersmith import graph
+
+
+def _doc(title, content=""):
+    id_path = "{}.md".format(title)
+    return Doc.create(
+        id_path=id_path,
+        output_path=id_path,
+        title=title,
+        content=content
+    )
+
+
+DOCS = (
+    _doc("A", "[[B]] [[C]]"),
+    _doc("B", "[[C]]"),
+    _doc("C", "[[A]]"),
+    _doc("D", "[[A]]"),
+    _doc("E", "Alone")
+)
+
+
+class test_link_graph(unittest.TestCase):
+    def setUp(self):
+        self.registry = Stub.Registry()
+        self.graph = graph.link_graph(DOCS, self.registry)
+        self.ids = {
+            doc.title: self.registry.id(doc.id_path)
+            for doc in DOCS
+        }
+
+    def test_links(self):
+        a, b, c = self.ids["A"], self.ids["B"], self.ids["C"]
+        self.assertEqual(tuple(self.graph.links(a)), (b, c))
+        self.assertEqual(tuple(self.graph.backlinks(c)), (a, b))
+
+    def test_orphans_and_dead_ends(self):
+        self.assertEqual(
+            self.graph.orphans(),
+            (self.ids["D"], self.ids["E"])
+        )
+        self.assertEqual(self.graph.dead_ends(), (self.ids["E"],))
+
+    def test_neighborhood(self):
+        d = self.ids["D"]
+        self.assertEqual(
+            self.graph.neighborhood(d, hops=1, direction="links"),
+            (self.ids["A"],)
+        )
+        self.assertEqual(
+            self.graph.neighborhood(d, hops=2, direction="links"),
+            (self.ids["A"], self.ids["B"], self.ids["C"])
+        )
+
+    def test_components(self):
+        components = self.graph.components()
+        self.assertEqual(components[self.ids["A"]], components[self.ids["D"]])
+        self.assertNotEqual(
+            components[self.ids["A"]],
+            components[self.ids["E"]]
+        )
+
+    def test_pagerank(self):
+        rank = self.graph.pagerank()
+        self.assertAlmostEqual(sum(rank), 1.0)
+        self.assertGreater(rank[self.ids["C"]], rank[self.ids["B"]])
+
+    def test_pagerank_python(self):
+        expected = self.graph.pagerank()
+        rank = graph._pagerank_python(self.graph, 0.85, 100, 1.0e-8)
+        for a, b in zip(rank, expected):
+            self.assertAlmostEqual(a, b)
+
+
+class test_shared_registry(unittest.TestCase):
+    def setUp(self):
+        self.registry = Stub.Registry()
+        for title in ("X", "Y"):
+            self.registry.intern(_doc(title))
+        self.graph = graph.link_graph(DOCS, self.registry)
+
+    def test_size(self):
+        self.assertEqual(len(self.graph), len(DOCS))
+        self.assertEqual(
+            tuple(self.graph.registry_ids(range(len(DOCS)))),
+            tuple(self.registry.id(doc.id_path) for doc in DOCS)
+        )
+
+    def test_queries(self):
+        node = lambda title: self.graph.node(
+            self.registry.id("{}.md".format(title))
+        )
+        self.assertEqual(
+            tuple(self.graph.links(node("A"))),
+            (node("B"), node("C"))
+        )
+        self.assertEqual(self.graph.orphans(), (node("D"), node("E")))
+        self.assertAlmostEqual(sum(self.graph.pagerank()), 1.0)
+
+    def test_annotate(self):
+        docs = {
+            doc.title: doc
+            for doc in graph.annotate_graph(DOCS, registry=self.registry)
+        }
+        self.assertEqual(
+            tuple(stub.title for stub in docs["A"].meta["links"]),
+            ("B", "C")
+        )
+        self.assertAlmostEqual(
+            sum(doc.meta["rank"] for doc in docs.values()),
+            1.0
+        )
+
+
+class test_annotate_graph(unittest.TestCase):
+    def test_meta(self):
+        docs = {
+            doc.title: doc
+            for doc in graph.annotate_graph(DOCS, hops=1)
+        }
+        self.assertTrue(docs["D"].meta["orphan"])
+        self.assertTrue(docs["E"].meta["dead_end"])
+        self.assertEqual(
+            tuple(stub.title for stub in docs["A"].meta["backlinks"]),
+            ("C", "D")
+        )
+        self.assertEqual(
+            tuple(stub.title for stub in docs["B"].meta["neighborhood"]),
+            ("A", "C")
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+"""
+Unit tests for the lettersmith package namespace
+"""
+import unittest
+import lettersmith
+from lettersmith import benchmark
+
+
+class test_lazy_imports(unittest.TestCase):
+    def test_import_skips_heavy_deps(self):
+        seconds, modules = benchmark.import_time("lettersmith", rounds=1)
+        for name in ("jinja2", "commonmark", "yaml", "frontmatter"):
+            self.assertNotIn(name, modules)
+
+    def test_submodule_on_access(self):
+        from lettersmith import docs as Docs
+        self.assertIs(lettersmith.docs, Docs)
+
+    def test_write_is_function(self):
+        self.assertTrue(callable(lettersmith.write))
+
+    def test_all(self):
+        for name in lettersmith.__all__:
+            self.assertTrue(hasattr(lettersmith, name))
+
+    def test_unknown(self):
+        with self.assertRaises(AttributeError):
+            lettersmith.nope
+
+
+if __name__ == '__main__':
+    unittest.main()
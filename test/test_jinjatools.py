@@ -0,0 +1,192 @@
+"""
+Unit tests for jinjatools
+"""
+import unittest
+import tempfile
+from pathlib import Path
+from jinja2 import UndefinedError
+from lettersmith import doc as Doc
+from lettersmith import jinjatools
+
+
+def _doc(title, template):
+    return Doc.create(
+        id_path=title + ".md",
+        output_path=title + ".html",
+        title=title,
+        template=template
+    )
+
+
+class test_incremental(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.templates = Path(self.tmp.name, "template")
+        self.templates.mkdir()
+        self._write("_base.html", "{% block body %}{% endblock %}")
+        self._write("_footer.html", "footer")
+        self._write(
+            "post.html",
+            '{% extends "_base.html" %}'
+            '{% block body %}{{doc.title | count}} '
+            '{% include "_footer.html" %}{% endblock %}'
+        )
+        self._write("page.html", "{{doc.title | count}} {{site.title}}")
+        self.cache_dir = Path(self.tmp.name, "cache")
+        self.rendered = []
+        self.docs = (_doc("A", "post.html"), _doc("B", "page.html"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, source):
+        Path(self.templates, name).write_text(source)
+
+    def _count(self, title):
+        self.rendered.append(title)
+        return title
+
+    def _render(self, site_title="Site", base_url="/", context=None,
+                filters={}):
+        self.rendered = []
+        render = jinjatools.jinja(
+            str(self.templates),
+            base_url,
+            context=(
+                context if context is not None
+                else {"site": {"title": site_title}}
+            ),
+            filters={"count": self._count, **filters},
+            cache_dir=self.cache_dir
+        )
+        return tuple(render(self.docs))
+
+    def test_closure(self):
+        env = jinjatools.LettersmithEnvironment(str(self.templates))
+        deps = jinjatools.TemplateDependencies(env)
+        self.assertEqual(
+            deps.closure("post.html"),
+            frozenset(("post.html", "_base.html", "_footer.html"))
+        )
+
+    def test_skips_unchanged(self):
+        first = self._render()
+        self.assertEqual(self.rendered, ["A", "B"])
+        second = self._render()
+        self.assertEqual(self.rendered, [])
+        self.assertEqual(first, second)
+
+    def test_template_change(self):
+        self._render()
+        self._write("_footer.html", "new footer")
+        (a, b) = self._render()
+        self.assertEqual(self.rendered, ["A"])
+        self.assertEqual(a.content, "A new footer")
+
+    def test_global_change(self):
+        self._render()
+        (a, b) = self._render(site_title="New")
+        self.assertEqual(self.rendered, ["B"])
+        self.assertEqual(b.content, "B New")
+        self.assertEqual(
+            tuple(jinjatools.dependencies(self.cache_dir, "B.md")["globals"]),
+            ("site",)
+        )
+
+    def test_global_removed(self):
+        self._render()
+        # B reads `site`, so it is rendered again, rather than read from
+        # the cache, and fails.
+        with self.assertRaises(Doc.DocException) as raised:
+            self._render(context={})
+        self.assertIsInstance(raised.exception.__cause__, UndefinedError)
+
+    def test_base_url_change(self):
+        self._render()
+        self._render(base_url="http://example.com")
+        self.assertEqual(self.rendered, ["A", "B"])
+
+    def test_filter_set_change(self):
+        self._render()
+        self._render(filters={"shout": str.upper})
+        self.assertEqual(self.rendered, ["A", "B"])
+        self._render(filters={"shout": str.upper})
+        self.assertEqual(self.rendered, [])
+
+
+class test_profile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.templates = Path(self.tmp.name, "template")
+        self.templates.mkdir()
+        self._write("_base.html", "<{% block body %}{% endblock %}>")
+        self._write("_footer.html", "{{doc.title | permalink}}")
+        self._write(
+            "post.html",
+            '{% extends "_base.html" %}'
+            '{% block body %}{{doc.title}} '
+            '{% include "_footer.html" %}{% endblock %}'
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, source):
+        Path(self.templates, name).write_text(source)
+
+    def test_records_templates_blocks_filters_and_docs(self):
+        profile = jinjatools.RenderProfile()
+        render = jinjatools.jinja(
+            str(self.templates),
+            "http://example.com",
+            profile=profile
+        )
+        docs = (_doc("a", "post.html"), _doc("b", "post.html"))
+        rendered = tuple(render(docs))
+        self.assertEqual(
+            rendered[0].content,
+            "<a http://example.com/a>"
+        )
+        counts = {
+            (row["kind"], row["name"]): row["count"]
+            for row in profile.report()
+        }
+        self.assertEqual(counts[("template", "post.html")], 2)
+        self.assertEqual(counts[("template", "_base.html")], 2)
+        self.assertEqual(counts[("template", "_footer.html")], 2)
+        self.assertEqual(counts[("block", "post.html#body")], 2)
+        self.assertEqual(counts[("filter", "permalink")], 2)
+        self.assertEqual(counts[("doc", "a.md")], 1)
+
+    def test_report_ranks_by_total(self):
+        profile = jinjatools.RenderProfile()
+        profile.record("doc", "fast.md", 0.1)
+        profile.record("doc", "slow.md", 0.3)
+        profile.record("doc", "slow.md", 0.5)
+        profile.record("template", "post.html", 1.0)
+        rows = profile.report("doc")
+        self.assertEqual([row["name"] for row in rows], ["slow.md", "fast.md"])
+        self.assertEqual(rows[0]["count"], 2)
+        self.assertEqual(rows[0]["max"], 0.5)
+        self.assertEqual(len(profile.report(limit=1)), 1)
+        self.assertIn("slow.md", profile.format_report())
+
+    def test_from_string(self):
+        profile = jinjatools.RenderProfile()
+        env = jinjatools.LettersmithEnvironment(
+            str(self.templates),
+            profile=profile
+        )
+        template = env.from_string("{% block body %}hi{% endblock %}")
+        self.assertEqual(template.render(), "hi")
+        kinds = {row["kind"] for row in profile.report()}
+        self.assertEqual(kinds, {"template", "block"})
+
+    def test_off_by_default(self):
+        env = jinjatools.LettersmithEnvironment(str(self.templates))
+        self.assertIsNone(env.profile)
+        self.assertEqual(env.template_class.__name__, "Template")
+
+
+if __name__ == '__main__':
+    unittest.main()
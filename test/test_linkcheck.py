@@ -0,0 +1,90 @@
+"""
+Unit tests for linkcheck
+"""
+import unittest
+from lettersmith import doc as Doc
+from lettersmith import file as File
+from lettersmith import linkcheck
+from lettersmith.func import pipe
+
+
+def _things():
+    return (
+        Doc.create(
+            "a.md", "a/index.html",
+            content=(
+                '<a href="/b/">B</a>'
+                '<a href="http://example.com/a/#top">A</a>'
+                '<a href="#x">X</a>'
+                '<a href="https://elsewhere.com/">Out</a>'
+                '<img src="/style.css?v=2">'
+                '<a href="/missing/">Missing</a>'
+            )
+        ),
+        Doc.create(
+            "b.md", "b/index.html",
+            content='<a href="/a/index.html">A</a><a href="nope.html">N</a>'
+        ),
+        File.create("style.css", "style.css", blob=b"")
+    )
+
+
+class test_find_broken(unittest.TestCase):
+    def test_broken(self):
+        things, broken = linkcheck.find_broken(
+            _things(),
+            "http://example.com"
+        )
+        self.assertEqual(len(tuple(things)), 3)
+        self.assertEqual(broken, {
+            "a.md": ("/missing/",),
+            "b.md": ("nope.html",)
+        })
+
+    def test_parallel(self):
+        things, broken = linkcheck.find_broken(
+            _things(),
+            "http://example.com",
+            jobs=2,
+            batch_size=1
+        )
+        tuple(things)
+        self.assertEqual(sorted(broken), ["a.md", "b.md"])
+
+    def test_relative(self):
+        things, broken = linkcheck.find_broken(
+            (
+                Doc.create(
+                    "a.md", "posts/a/index.html",
+                    content=(
+                        '<a href="../b/">B</a>'
+                        '<a href="c.html">C</a>'
+                        '<a href="../missing/">Missing</a>'
+                    )
+                ),
+                Doc.create("b.md", "posts/b/index.html"),
+                File.create("c.html", "posts/a/c.html", blob=b""),
+                Doc.create(
+                    "d.md", "posts/d.html",
+                    content='<a href="b/">B</a><a href="a/c.html">C</a>'
+                )
+            ),
+            "http://example.com/blog/"
+        )
+        tuple(things)
+        self.assertEqual(broken, {"a.md": ("../missing/",)})
+
+
+class test_validate_links(unittest.TestCase):
+    def test_raises(self):
+        with self.assertRaises(linkcheck.BrokenLinksError) as cm:
+            pipe(_things(), linkcheck.validate_links("/"), tuple)
+        self.assertEqual(cm.exception.broken["a.md"], ("/missing/",))
+
+    def test_ok(self):
+        things = pipe(_things()[2:], linkcheck.validate_links("/"), tuple)
+        self.assertEqual(len(things), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Unit tests for manifest
+"""
+import unittest
+import tempfile
+import json
+from pathlib import Path
+from lettersmith import doc as Doc
+from lettersmith import file as File
+from lettersmith import manifest
+from lettersmith.write import threaded_writer
+
+
+def _doc(name, content):
+    return Doc.create(
+        id_path="{}.md".format(name),
+        output_path="{}/index.html".format(name),
+        content=content
+    )
+
+
+class test_diff(unittest.TestCase):
+    def test_diff(self):
+        old = {
+            "a": manifest.entry("a", b"a"),
+            "b": manifest.entry("b", b"b"),
+            "c": manifest.entry("c", b"c")
+        }
+        new = {
+            "a": manifest.entry("a", b"a"),
+            "b": manifest.entry("b", b"B"),
+            "d": manifest.entry("d", b"d")
+        }
+        self.assertEqual(
+            manifest.diff(old, new),
+            manifest.Diff(added=("d",), changed=("b",), removed=("c",))
+        )
+
+
+class test_writer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.public = Path(self.tmp.name, "public")
+        self.static = Path(self.tmp.name, "style.css")
+        self.static.write_bytes(b"body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_records_and_diffs(self):
+        write = manifest.writer()
+        stats = write((_doc("a", "A"), _doc("b", "B")), self.public)
+        self.assertEqual(stats["written"], 2)
+        self.assertEqual(stats["added"], ("a/index.html", "b/index.html"))
+
+        stats = write((_doc("a", "A"), _doc("c", "C2")), self.public)
+        self.assertEqual(stats["added"], ("c/index.html",))
+        self.assertEqual(stats["changed"], ())
+        self.assertEqual(stats["removed"], ("b/index.html",))
+
+        stats = write((_doc("a", "A!"), _doc("c", "C2")), self.public)
+        self.assertEqual(stats["changed"], ("a/index.html",))
+
+    def test_manifest_file(self):
+        lazy = File.load(self.static, lazy=True)._replace(
+            id_path="style.css",
+            output_path="style.css"
+        )
+        write = manifest.writer(make_writer=threaded_writer)
+        write((_doc("a", "A"), lazy), self.public)
+        data = json.loads(manifest.manifest_path(self.public).read_text())
+        row = data["files"]["style.css"]
+        self.assertEqual(row["size"], 7)
+        self.assertEqual(row["content_type"], "text/css")
+        self.assertEqual(row["id_path"], "style.css")
+        self.assertEqual(row["etag"], '"{}"'.format(row["digest"]))
+        self.assertEqual(data["files"]["a/index.html"]["id_path"], "a.md")
+
+    def test_recording_reads_lazy_once(self):
+        recorded = {}
+        record = manifest.recording(
+            lambda thing: ("style.css", self.static),
+            recorded
+        )
+        output_path, blob = record(None)
+        self.assertEqual(blob, b"body {}")
+        self.assertEqual(
+            recorded["style.css"],
+            manifest.entry("style.css", b"body {}")
+        )
+
+    def test_roundtrip(self):
+        path = Path(self.tmp.name, "m.json")
+        entries = {"a": manifest.entry("a", b"a", "a.md")}
+        manifest.dump(entries, path)
+        self.assertEqual(manifest.load(path), entries)
+        self.assertEqual(manifest.load(Path(self.tmp.name, "none")), {})
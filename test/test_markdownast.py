@@ -0,0 +1,139 @@
+"""
+Unit tests for markdownast
+"""
+import unittest
+from lettersmith import doc as Doc
+from lettersmith import markdownast
+from lettersmith import markdowntools
+
+
+def _docs():
+    return (
+        Doc.create(
+            "a.md", "a.html",
+            title="Doc A",
+            content=(
+                "# Intro\n\n"
+                "See [[Doc B]], not `[[Doc C]]`. More.\n\n"
+                "## Intro\n\n"
+                "[[Doc B]]\n"
+            )
+        ),
+        Doc.create("b.md", "b.html", title="Doc B", content="Hi *there*. Ok"),
+        Doc.create("c.md", "c.html", title="Doc C", content="C")
+    )
+
+
+class test_parse(unittest.TestCase):
+    def test_parse_once(self):
+        doc = next(markdownast.parse(_docs()))
+        ast = doc.meta["ast"]
+        doc = next(markdownast.parse((doc,)))
+        self.assertIs(doc.meta["ast"], ast)
+
+    def test_find_wikilinks_skips_code(self):
+        doc = next(markdownast.parse(_docs()))
+        links = frozenset(markdownast.find_wikilinks(doc))
+        self.assertEqual(links, frozenset((("doc-b", "Doc B"),)))
+
+
+class test_toc(unittest.TestCase):
+    def test_unique_ids(self):
+        doc = next(markdownast.toc(_docs()))
+        self.assertEqual(
+            doc.meta["toc"],
+            (
+                markdownast.Heading(level=1, title="Intro", id="intro"),
+                markdownast.Heading(level=2, title="Intro", id="intro-1")
+            )
+        )
+
+
+class test_summary(unittest.TestCase):
+    def _summary(self, content):
+        doc = Doc.create("s.md", "s.html", title="S", content=content)
+        return markdownast.read_summary(doc)
+
+    def test_wikilinks_in_emphasis(self):
+        self.assertEqual(
+            self._summary("See [[Other]] and *[[Other | emph]]*."),
+            "See Other and emph"
+        )
+
+    def test_wikilink_alone_on_a_line(self):
+        self.assertEqual(
+            self._summary("Intro line\n[[Other]]\nrest."),
+            "Intro line\nOther\nrest"
+        )
+
+    def test_transclude_skipped(self):
+        self.assertEqual(self._summary("[[Other]]\n\nText."), "Text")
+
+
+class test_content_markdown(unittest.TestCase):
+    def test_render(self):
+        a, b, c = markdownast.content_markdown("http://example.com")(_docs())
+        self.assertNotIn("ast", a.meta)
+        self.assertIn('<h1 id="intro">Intro</h1>', a.content)
+        self.assertIn('<h2 id="intro-1">Intro</h2>', a.content)
+        self.assertIn(
+            '<a href="http://example.com/b.html" class="wikilink">Doc B</a>',
+            a.content
+        )
+        self.assertIn("<code>[[Doc C]]</code>", a.content)
+        self.assertIn('class="transclude"', a.content)
+        self.assertEqual(b.meta["summary"], "Hi there")
+        self.assertEqual(
+            tuple(stub.id_path for stub in b.meta["backlinks"]),
+            ("a.md",)
+        )
+        self.assertEqual(len(c.meta["backlinks"]), 0)
+
+    def test_wikilinks_in_raw_html(self):
+        docs = (
+            Doc.create(
+                "h.md", "h.html",
+                title="H",
+                content=(
+                    "<div>Raw [[Doc B]] html</div>\n\n"
+                    "Inline <span>x [[Doc B]]</span>\n"
+                )
+            ),
+            Doc.create("b.md", "b.html", title="Doc B", content="B"),
+            Doc.create(
+                "i.md", "i.html",
+                title="I",
+                content="<div>Only [[Doc B]] here</div>\n"
+            )
+        )
+        h, b, i = markdownast.content_markdown("http://example.com")(docs)
+        link = '<a href="http://example.com/b.html" class="wikilink">Doc B</a>'
+        self.assertIn("<div>Raw {} html</div>".format(link), h.content)
+        self.assertIn("<span>x {}</span>".format(link), h.content)
+        self.assertNotIn("[[", h.content)
+        self.assertEqual(
+            tuple(stub.id_path for stub in b.meta["backlinks"]),
+            ("h.md", "i.md")
+        )
+
+    def test_other_backend(self):
+        markdowntools.register("_upper", lambda: str.upper)
+        try:
+            render = markdownast.content_markdown(
+                "http://example.com",
+                backend="_upper"
+            )
+            a, b, c = render(_docs())
+        finally:
+            markdowntools._factories.pop("_upper")
+            markdowntools._renderers.pop("_upper")
+        self.assertEqual(b.content, "HI *THERE*. OK")
+        self.assertEqual(
+            tuple(stub.id_path for stub in b.meta["backlinks"]),
+            ("a.md",)
+        )
+        self.assertNotIn("toc", b.meta)
+
+
+if __name__ == '__main__':
+    unittest.main()
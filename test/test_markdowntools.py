@@ -0,0 +1,80 @@
+"""
+Unit tests for markdowntools
+"""
+import unittest
+from lettersmith import markdowntools
+from lettersmith import benchmark
+from lettersmith import doc as Doc
+from lettersmith import wikidoc
+
+
+class test_renderer(unittest.TestCase):
+    def test_default(self):
+        html = markdowntools.markdown("*Hi*")
+        self.assertEqual(html.strip(), "<p><em>Hi</em></p>")
+
+    def test_unknown(self):
+        with self.assertRaises(markdowntools.BackendError):
+            markdowntools.renderer("nope")
+
+    def test_not_installed(self):
+        def factory():
+            raise ImportError("nope")
+        markdowntools.register("_missing", factory)
+        try:
+            with self.assertRaises(markdowntools.BackendError):
+                markdowntools.renderer("_missing")
+            self.assertNotIn("_missing", markdowntools.available())
+        finally:
+            markdowntools._factories.pop("_missing")
+
+    def test_register(self):
+        markdowntools.register("_upper", lambda: str.upper)
+        try:
+            self.assertIn("_upper", markdowntools.available())
+            self.assertEqual(markdowntools.renderer("_upper")("hi"), "HI")
+        finally:
+            markdowntools._factories.pop("_upper")
+            markdowntools._renderers.pop("_upper")
+
+
+class test_wikidoc_backend(unittest.TestCase):
+    def test_summary_uses_backend(self):
+        markdowntools.register("_upper", lambda: str.upper)
+        try:
+            doc = Doc.create(
+                id_path="a.md",
+                output_path="a.html",
+                title="A",
+                content="Hello there. More."
+            )
+            render = wikidoc.content_markdown("/", backend="_upper")
+            (rendered,) = render((doc,))
+        finally:
+            markdowntools._factories.pop("_upper")
+            markdowntools._renderers.pop("_upper")
+        self.assertEqual(rendered.content, "HELLO THERE. MORE.")
+        self.assertEqual(rendered.meta["summary"], "HELLO THERE")
+
+
+class test_markdown_backends(unittest.TestCase):
+    def test_conformance(self):
+        markdowntools.register("_upper", lambda: str.upper)
+        try:
+            results = benchmark.markdown_backends(
+                ("*a*", "b"),
+                backends=("commonmark", "_upper"),
+                rounds=1
+            )
+        finally:
+            markdowntools._factories.pop("_upper")
+            markdowntools._renderers.pop("_upper")
+        by_name = {result.backend: result for result in results}
+        self.assertEqual(by_name["commonmark"].differing, 0)
+        self.assertEqual(by_name["commonmark"].sample_diff, "")
+        self.assertEqual(by_name["_upper"].differing, 2)
+        self.assertIn("+++ _upper", by_name["_upper"].sample_diff)
+
+
+if __name__ == '__main__':
+    unittest.main()
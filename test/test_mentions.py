@@ -0,0 +1,152 @@
+"""
+Unit tests for mentions
+"""
+import unittest
+from lettersmith import doc as Doc
+from lettersmith import mentions
+from lettersmith.lens import get
+
+
+def _doc(title, content=""):
+    id_path = "{}.md".format(title)
+    return Doc.create(
+        id_path=id_path,
+        output_path=id_path,
+        title=title,
+        content=content
+    )
+
+
+class test_automaton(unittest.TestCase):
+    def test_find_overlapping(self):
+        matcher = mentions.Automaton()
+        matcher.add(("he",), "he")
+        matcher.add(("she",), "she")
+        matcher.add(("she", "sells"), "she-sells")
+        matcher.add(("sells", "sea"), "sells-sea")
+        matcher.build()
+        found = sorted(matcher.find(("she", "sells", "sea", "shells")))
+        self.assertEqual(found, [
+            (0, 1, "she"),
+            (0, 2, "she-sells"),
+            (1, 3, "sells-sea")
+        ])
+
+    def test_failure_links(self):
+        matcher = mentions.Automaton()
+        matcher.add(("a", "b", "c"), "abc")
+        matcher.add(("b", "c", "d"), "bcd")
+        found = tuple(matcher.find(("a", "b", "c", "d")))
+        self.assertEqual(found, ((0, 3, "abc"), (1, 4, "bcd")))
+
+
+class test_find_mentions(unittest.TestCase):
+    def setUp(self):
+        self.matcher = mentions.automaton(
+            ("Cat's Cradle", "Cradle", "Node.js", "A")
+        )
+
+    def test_case_and_punctuation(self):
+        found = mentions.find_mentions(
+            self.matcher,
+            "I read CATS cradle. Then node.js."
+        )
+        self.assertEqual(
+            tuple((m.slug, m.text) for m in found),
+            (("cats-cradle", "CATS cradle"), ("node.js", "node.js"))
+        )
+
+    def test_short_titles_skipped(self):
+        found = mentions.find_mentions(self.matcher, "A cradle")
+        self.assertEqual(tuple(m.slug for m in found), ("cradle",))
+
+    def test_skips_links_and_code(self):
+        text = "[[Cradle]] `cradle` [cradle](/x) <a href='/'>cradle</a>"
+        self.assertEqual(mentions.find_mentions(self.matcher, text), ())
+
+    def test_skip_before_overlaps(self):
+        found = mentions.find_mentions(
+            self.matcher,
+            "A cat's cradle",
+            skip={"cats-cradle"}
+        )
+        self.assertEqual(tuple(m.slug for m in found), ("cradle",))
+
+
+class test_stages(unittest.TestCase):
+    def setUp(self):
+        self.docs = (
+            _doc("Graph Theory", "Graph theory is fun. See Graph Theory."),
+            _doc("Euler", "Euler invented graph theory. Graph Theory!"),
+            _doc("Linked", "[[Euler]] liked graph theory, like Euler.")
+        )
+
+    def test_annotate_mentions(self):
+        docs = tuple(mentions.annotate_mentions()(self.docs))
+        found = {
+            doc.title: tuple(
+                stub.title
+                for stub in get(mentions.meta_unlinked_mentions, doc)
+            )
+            for doc in docs
+        }
+        self.assertEqual(found["Graph Theory"], ())
+        self.assertEqual(found["Euler"], ("Graph Theory",))
+        self.assertEqual(found["Linked"], ("Graph Theory",))
+
+    def test_link_mentions(self):
+        docs = tuple(mentions.link_mentions()(self.docs))
+        content = {doc.title: doc.content for doc in docs}
+        self.assertEqual(
+            content["Graph Theory"],
+            "Graph theory is fun. See Graph Theory."
+        )
+        self.assertEqual(
+            content["Euler"],
+            "Euler invented [[graph theory]]. Graph Theory!"
+        )
+        self.assertEqual(
+            content["Linked"],
+            "[[Euler]] liked [[graph theory]], like Euler."
+        )
+
+    def test_skipped_mention_keeps_shorter(self):
+        docs = (
+            _doc("Graph", "A graph."),
+            _doc("Graph Theory", "Theory."),
+            _doc("Notes", "[[Graph Theory]] is about graph theory.")
+        )
+        annotated = {
+            doc.title: tuple(
+                stub.title
+                for stub in get(mentions.meta_unlinked_mentions, doc)
+            )
+            for doc in mentions.annotate_mentions()(docs)
+        }
+        self.assertEqual(annotated["Notes"], ("Graph",))
+        linked = {
+            doc.title: doc.content
+            for doc in mentions.link_mentions()(docs)
+        }
+        self.assertEqual(
+            linked["Notes"],
+            "[[Graph Theory]] is about [[graph]] theory."
+        )
+
+    def test_first_only_keeps_shorter(self):
+        link_text = mentions.mention_linker(("Graph", "Graph Theory"))
+        self.assertEqual(
+            link_text("Graph theory, then graph theory."),
+            "[[Graph theory]], then [[graph]] theory."
+        )
+
+    def test_piped_wikilink(self):
+        link_text = mentions.mention_linker(("Graph Theory",))
+        self.assertEqual(
+            link_text("graph -- theory"),
+            "[[graph-theory | graph -- theory]]"
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Unit tests for path
+"""
+import os
+import unittest
+import tempfile
+from unittest import mock
+from pathlib import Path
+from lettersmith import path as pathtools
+
+
+def _touch(root, *paths):
+    for p in paths:
+        file_path = Path(root, p)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text("x")
+
+
+class test_walk_files(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        _touch(
+            self.tmp.name,
+            "post/a.md",
+            "post/_draft.md",
+            "post/img/b.png",
+            "page/c.md",
+            "static/css/d.css",
+            "static/e.js"
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _walk(self, globs, exclude=()):
+        return tuple(
+            str(Path(entry.path).relative_to(self.tmp.name))
+            for entry in pathtools.walk_files(self.tmp.name, globs, exclude)
+        )
+
+    def _glob(self, glob):
+        return tuple(sorted(
+            str(Path(p).relative_to(self.tmp.name))
+            for p in pathtools.glob_files(self.tmp.name, glob)
+        ))
+
+    def test_matches_glob(self):
+        for glob in ("post/*.md", "static/**/*", "**/*.md", "*/*"):
+            self.assertEqual(self._walk((glob,)), self._glob(glob), glob)
+
+    def test_many_globs(self):
+        self.assertEqual(
+            self._walk(("post/*.md", "page/*.md")),
+            ("page/c.md", "post/_draft.md", "post/a.md")
+        )
+
+    def test_exclude(self):
+        self.assertEqual(
+            self._walk(("**/*.md",), exclude=("**/_*",)),
+            ("page/c.md", "post/a.md")
+        )
+
+    def test_excluded_directories_not_scanned(self):
+        _touch(self.tmp.name, "node_modules/x/y.js", "static/vendor/z.js")
+        scanned = []
+        scandir = os.scandir
+        def recording_scandir(path):
+            scanned.append(Path(path).name)
+            return scandir(path)
+        with mock.patch.object(pathtools.os, "scandir", recording_scandir):
+            found = self._walk(
+                ("**/*",),
+                exclude=("node_modules/**", "**/vendor/**/*")
+            )
+        self.assertNotIn("node_modules", scanned)
+        self.assertNotIn("vendor", scanned)
+        self.assertNotIn("node_modules/x/y.js", found)
+        self.assertIn("static/e.js", found)
+
+    def test_partial_exclude_still_scanned(self):
+        self.assertEqual(
+            self._walk(("static/**/*",), exclude=("static/*",)),
+            ("static/css/d.css",)
+        )
+
+    def test_follows_symlinked_directories(self):
+        os.symlink(Path(self.tmp.name, "page"), Path(self.tmp.name, "link"))
+        # A loop back to the root is not followed forever
+        os.symlink(self.tmp.name, Path(self.tmp.name, "post", "loop"))
+        found = self._walk(("**/*.md",))
+        self.assertIn("link/c.md", found)
+        self.assertNotIn("post/loop/page/c.md", found)
+
+    def test_times(self):
+        (entry,) = pathtools.walk_files(self.tmp.name, ("page/c.md",))
+        self.assertGreater(entry.modified.year, 1970)
+
+
+if __name__ == '__main__':
+    unittest.main()
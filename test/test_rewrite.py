@@ -0,0 +1,77 @@
+"""
+Unit tests for rewrite
+"""
+import unittest
+from lettersmith import doc as Doc
+from lettersmith import rewrite
+
+
+class test_rewrite_content(unittest.TestCase):
+    def test_untouched(self):
+        html = """<p class='x'>Hi <!-- <a href="/a"> --> <br/></p>"""
+        s = rewrite.rewrite_content(html, ())
+        self.assertEqual(s, html)
+
+    def test_qualify_urls(self):
+        html = """<a href='/foo/' class="x">Foo</a><img src="bar.png">"""
+        s = rewrite.rewrite_content(
+            html,
+            (rewrite.qualify_urls("http://example.com"),)
+        )
+        self.assertEqual(
+            s,
+            '<a href="http://example.com/foo/" class="x">Foo</a>'
+            '<img src="http://example.com/bar.png">'
+        )
+
+    def test_skips_script(self):
+        html = """<script src="/a.js">if (a <b) { x = "<a href='/b'>" }</script>"""
+        s = rewrite.rewrite_content(
+            html,
+            (rewrite.qualify_urls("http://example.com"),)
+        )
+        self.assertEqual(
+            s,
+            """<script src="http://example.com/a.js">"""
+            """if (a <b) { x = "<a href='/b'>" }</script>"""
+        )
+
+    def test_inject_attrs(self):
+        html = """<img src="a.png"><img src="b.png" loading="eager">"""
+        s = rewrite.rewrite_content(
+            html,
+            (rewrite.inject_attrs("img", {"loading": "lazy"}),)
+        )
+        self.assertEqual(
+            s,
+            """<img src="a.png" loading="lazy">"""
+            """<img src="b.png" loading="eager">"""
+        )
+
+
+class test_rewrite_html(unittest.TestCase):
+    def test_one_pass(self):
+        doc = Doc.create(
+            id_path="a.md",
+            output_path="a.html",
+            content="""<a href="/a.css">A</a> <img src="/b.png">"""
+        )
+        render = rewrite.rewrite_html(
+            rewrite.fingerprint_assets({"/a.css": "/a.123.css"}),
+            rewrite.qualify_urls("http://example.com"),
+            rewrite.collect_urls("urls")
+        )
+        (doc,) = render((doc,))
+        self.assertEqual(
+            doc.content,
+            """<a href="http://example.com/a.123.css">A</a> """
+            """<img src="http://example.com/b.png">"""
+        )
+        self.assertEqual(
+            doc.meta["urls"],
+            ["http://example.com/a.123.css", "http://example.com/b.png"]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
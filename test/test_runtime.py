@@ -0,0 +1,66 @@
+"""
+Unit tests for runtime and the build command
+"""
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from lettersmith import runtime
+from lettersmith.cli import main as cli
+
+
+class test_using(unittest.TestCase):
+    def test_defaults(self):
+        with runtime.using(runtime.create()):
+            self.assertEqual(runtime.jobs(4), 4)
+            self.assertIsNone(runtime.cache_dir())
+            self.assertTrue(runtime.is_selected("post/a.md"))
+
+    def test_options(self):
+        options = runtime.create(
+            jobs=3,
+            cache_dir="cache",
+            incremental=True,
+            only="post/**/*.md"
+        )
+        with runtime.using(options):
+            self.assertEqual(runtime.jobs(4), 3)
+            self.assertEqual(runtime.cache_dir(), "cache")
+            self.assertTrue(runtime.is_selected("post/2020/a.md"))
+            self.assertFalse(runtime.is_selected("page/a.md"))
+            self.assertEqual(runtime.from_env(os.environ), options)
+        self.assertIsNone(os.environ.get("LETTERSMITH_JOBS"))
+
+
+_SCRIPT = """
+import json
+from lettersmith import runtime
+with open("options.json", "w") as f:
+    json.dump(runtime.options()._asdict(), f)
+"""
+
+
+class test_build(unittest.TestCase):
+    def test_build(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                Path("build.py").write_text(_SCRIPT)
+                args = cli.parser.parse_args((
+                    "build", "--jobs", "2", "--incremental",
+                    "--profile", "profile.json"
+                ))
+                self.assertEqual(cli.build(args), 0)
+                options = json.loads(Path("options.json").read_text())
+                profile = json.loads(Path("profile.json").read_text())
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(options["jobs"], 2)
+        self.assertTrue(options["incremental"])
+        self.assertTrue(len(profile["functions"]) > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
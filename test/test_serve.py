@@ -0,0 +1,75 @@
+"""
+Unit tests for serve
+"""
+import gzip
+import unittest
+from threading import Thread
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+from lettersmith import doc as Doc
+from lettersmith import serve
+
+
+class test_preview_site(unittest.TestCase):
+    def test_lazy(self):
+        pulled = []
+        rendered = []
+
+        def docs():
+            for name in ("a", "b", "c"):
+                pulled.append(name)
+                yield Doc.create(name, name + "/index.html", content=name)
+
+        def render(docs):
+            for doc in docs:
+                rendered.append(doc.id_path)
+                yield doc._replace(content=doc.content.upper())
+
+        site = serve.PreviewSite(docs(), render=render)
+        output_path, response = site.resolve("/b/")
+        self.assertEqual(output_path, "b/index.html")
+        self.assertEqual(response.body, b"B")
+        self.assertEqual(pulled, ["a", "b"])
+        self.assertEqual(rendered, ["b"])
+        self.assertEqual(site.resolve("/a/")[1].body, b"A")
+        self.assertEqual(pulled, ["a", "b"])
+        self.assertIsNone(site.resolve("/nope/"))
+        self.assertEqual(pulled, ["a", "b", "c"])
+        self.assertEqual(site.rendered(), 2)
+
+
+class test_server(unittest.TestCase):
+    def setUp(self):
+        content = "<p>{}</p>".format("Hello " * 100)
+        docs = (Doc.create("a", "a/index.html", content=content),)
+        self.httpd = serve.server(docs, port=0)
+        host, port = self.httpd.server_address
+        self.base = "http://{}:{}".format(host, port)
+        self.thread = Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def test_gzip_and_etag(self):
+        req = Request(self.base + "/a/", headers={"Accept-Encoding": "gzip"})
+        with urlopen(req) as res:
+            self.assertEqual(res.headers["Content-Encoding"], "gzip")
+            self.assertIn("text/html", res.headers["Content-Type"])
+            body = gzip.decompress(res.read())
+            etag = res.headers["ETag"]
+        self.assertTrue(body.startswith(b"<p>Hello"))
+        req = Request(self.base + "/a/", headers={"If-None-Match": etag})
+        with self.assertRaises(HTTPError) as cm:
+            urlopen(req)
+        self.assertEqual(cm.exception.code, 304)
+
+    def test_not_found(self):
+        with self.assertRaises(HTTPError) as cm:
+            urlopen(self.base + "/nope/")
+        self.assertEqual(cm.exception.code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Unit tests for sharded builds
+"""
+import unittest
+import tempfile
+from datetime import date, datetime
+from pathlib import Path
+from lettersmith import doc as Doc
+from lettersmith import shard
+
+
+def _doc(title, content="", tags=()):
+    id_path = "{}.md".format(title)
+    return Doc.create(
+        id_path=id_path,
+        output_path=id_path,
+        title=title,
+        content=content,
+        meta={"tags": list(tags)}
+    )
+
+
+DOCS = tuple(
+    _doc(
+        "Doc {}".format(i),
+        "See [[Doc {}]]".format((i + 1) % 6),
+        ("even",) if i % 2 == 0 else ()
+    )
+    for i in range(6)
+)
+
+
+def _index_shard(n, count):
+    docs = tuple(shard.in_shard(n, count)(DOCS))
+    return shard.index_shard(docs)
+
+
+class test_shard(unittest.TestCase):
+    def test_partition(self):
+        count = 3
+        shards = [tuple(shard.in_shard(n, count)(DOCS)) for n in range(count)]
+        self.assertEqual(sum(len(s) for s in shards), len(DOCS))
+
+    def test_run_and_merge(self):
+        indexes = shard.run(_index_shard, 3, jobs=2)
+        site = shard.merge(indexes)
+        self.assertEqual(len(site.registry), len(DOCS))
+        annotate = shard.annotate_links(site)
+        docs = {doc.title: doc for doc in annotate(DOCS)}
+        self.assertEqual(
+            tuple(stub.title for stub in docs["Doc 0"].meta["backlinks"]),
+            ("Doc 5",)
+        )
+        self.assertEqual(
+            tuple(stub.title for stub in site.taxonomies["tags"]["even"]),
+            tuple(sorted(
+                (d.title for d in DOCS if d.meta["tags"]),
+                key=lambda t: site.registry.id(t + ".md")
+            ))
+        )
+
+    def test_dump_load(self):
+        index = shard.index_shard(DOCS)
+        with tempfile.TemporaryDirectory() as tmp:
+            index_path = Path(tmp, "0.json")
+            shard.dump(index, index_path)
+            self.assertEqual(shard.load(index_path), index)
+
+    def test_dump_load_term_types(self):
+        docs = (
+            _doc("A", tags=(2020, date(2020, 1, 2), "2020")),
+            _doc("B", tags=(datetime(2020, 1, 2, 3, 4), 1.5, True))
+        )
+        index = shard.index_shard(docs)
+        with tempfile.TemporaryDirectory() as tmp:
+            index_path = Path(tmp, "0.json")
+            shard.dump(index, index_path)
+            loaded = shard.load(index_path)
+        self.assertEqual(loaded, index)
+        self.assertEqual(
+            tuple(type(term) for term in loaded.taxonomies["tags"]),
+            (int, date, str, datetime, float, bool)
+        )
+
+    def test_dump_unknown_term(self):
+        index = shard.index_shard((_doc("A", tags=(("x", "y"),)),))
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(TypeError):
+                shard.dump(index, Path(tmp, "0.json"))
+
+    def test_content_wikilinks(self):
+        site = shard.merge((shard.index_shard(DOCS),))
+        render = shard.content_wikilinks(site, "/")
+        (doc,) = render(DOCS[:1])
+        self.assertEqual(
+            doc.content,
+            'See <a href="/doc-1.md" class="wikilink">Doc 1</a>'
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
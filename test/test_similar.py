@@ -0,0 +1,117 @@
+"""
+Unit tests for content similarity
+"""
+import unittest
+from lettersmith import doc as Doc
+from lettersmith import similar
+from lettersmith.taxonomy import meta_related
+from lettersmith.lens import get
+
+
+def _doc(title, content):
+    id_path = "{}.html".format(title)
+    return Doc.create(
+        id_path=id_path,
+        output_path=id_path,
+        title=title,
+        content=content
+    )
+
+
+DOCS = (
+    _doc("cats", "<p>Cats purr and chase mice around the house.</p>"),
+    _doc("kittens", "Kittens purr, chase yarn and chase mice."),
+    _doc("rockets", "Rockets burn fuel to reach orbit."),
+    _doc("launch", "The launch sent rockets into orbit."),
+    _doc("empty", "")
+)
+
+
+class test_vectorize(unittest.TestCase):
+    def test_min_df_drops_unshared_terms(self):
+        vectors = similar.vectorize(
+            ("apple banana", "apple cherry", "date"),
+            max_df=1.0
+        )
+        self.assertEqual(vectors.vocabulary, {"apple": 0})
+        self.assertEqual(len(vectors), 3)
+        self.assertEqual(vectors.row(2), ())
+
+    def test_max_terms(self):
+        texts = ("aa bb cc dd", "aa bb cc dd", "ee ff gg hh", "ee ff gg hh")
+        vectors = similar.vectorize(texts, max_terms=2)
+        self.assertTrue(all(len(vectors.row(i)) == 2 for i in range(4)))
+
+    def test_small_corpus(self):
+        vectors = similar.vectorize(("apple banana", "apple cherry", "date"))
+        self.assertEqual(vectors.vocabulary, {"apple": 0})
+
+
+class test_nearest(unittest.TestCase):
+    def setUp(self):
+        texts = tuple(similar.plain_text(doc) for doc in DOCS)
+        self.vectors = similar.vectorize(texts)
+
+    def test_nearest(self):
+        near = tuple(similar.nearest(self.vectors, k=1))
+        self.assertEqual(near, ((1,), (0,), (3,), (2,), ()))
+
+    def test_python_and_numpy_agree(self):
+        if similar.numpy is None:
+            self.skipTest("NumPy and SciPy aren't installed")
+        expected = tuple(similar.nearest(self.vectors, k=3))
+        numpy = similar.numpy
+        similar.numpy = None
+        try:
+            self.assertEqual(tuple(similar.nearest(self.vectors, k=3)), expected)
+        finally:
+            similar.numpy = numpy
+
+    def test_blocks(self):
+        expected = tuple(similar.nearest(self.vectors, k=2))
+        blocked = tuple(similar.nearest(self.vectors, k=2, block_size=2))
+        self.assertEqual(blocked, expected)
+
+
+class test_plain_text(unittest.TestCase):
+    def test_markdown_source(self):
+        doc = Doc.create("a.md", "a.md", content="Some *cats* and dogs")
+        self.assertEqual(similar.plain_text(doc).strip(), "Some cats and dogs")
+
+    def test_rendered_markdown(self):
+        html = "<p>Some <code>*cats*</code> and dogs</p>"
+        for output_path in ("a.html", "a.md"):
+            doc = Doc.create("a.md", output_path, content=html)
+            self.assertEqual(
+                similar.plain_text(doc).strip(),
+                "Some *cats* and dogs"
+            )
+
+
+class test_related(unittest.TestCase):
+    def test_related(self):
+        docs = tuple(similar.related(k=2)(DOCS))
+        related = {
+            doc.title: tuple(stub.title for stub in get(meta_related, doc))
+            for doc in docs
+        }
+        self.assertEqual(related["cats"][0], "kittens")
+        self.assertEqual(related["rockets"][0], "launch")
+        self.assertTrue(all(len(titles) <= 2 for titles in related.values()))
+        self.assertEqual(related["empty"], ())
+
+    def test_three_docs(self):
+        docs = tuple(similar.related(k=2)(DOCS[:3]))
+        related = {
+            doc.title: tuple(stub.title for stub in get(meta_related, doc))
+            for doc in docs
+        }
+        self.assertEqual(related, {
+            "cats": ("kittens",),
+            "kittens": ("cats",),
+            "rockets": ()
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
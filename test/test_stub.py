@@ -0,0 +1,84 @@
+"""
+Unit tests for stub registry
+"""
+import unittest
+import pickle
+from lettersmith import doc as Doc
+from lettersmith import stub as Stub
+from lettersmith import wikidoc
+
+
+def _doc(title, content=""):
+    id_path = "{}.md".format(title)
+    return Doc.create(
+        id_path=id_path,
+        output_path=id_path,
+        title=title,
+        content=content
+    )
+
+
+class test_registry(unittest.TestCase):
+    def test_intern_once(self):
+        registry = Stub.Registry()
+        doc = _doc("A")
+        i = registry.intern(doc)
+        j = registry.intern(doc)
+        self.assertEqual(i, j)
+        self.assertEqual(len(registry), 1)
+
+    def test_materialize(self):
+        registry = Stub.Registry()
+        doc = _doc("A")
+        i = registry.intern(doc)
+        self.assertEqual(registry.stub(i), Stub.from_doc(doc))
+
+    def test_refresh(self):
+        registry = Stub.Registry()
+        i = registry.intern(_doc("A"))
+        registry.intern(_doc("A")._replace(output_path="a/index.html"))
+        self.assertEqual(registry.stub(i).output_path, "a/index.html")
+
+
+class test_stub_list(unittest.TestCase):
+    def setUp(self):
+        self.registry = Stub.Registry()
+        self.docs = (_doc("A"), _doc("B"))
+        ids = [self.registry.intern(doc) for doc in self.docs]
+        self.stubs = self.registry.stub_list(ids)
+
+    def test_sequence(self):
+        self.assertEqual(len(self.stubs), 2)
+        self.assertEqual(self.stubs[1].title, "B")
+        self.assertIn(Stub.from_doc(self.docs[0]), self.stubs)
+
+    def test_pickle(self):
+        value = pickle.loads(pickle.dumps(self.stubs))
+        self.assertEqual(value, tuple(Stub.stubs(self.docs)))
+
+
+class test_annotate_links(unittest.TestCase):
+    def test_links_and_backlinks(self):
+        docs = (
+            _doc("A", "Links to [[B]] and [[C | see C]]"),
+            _doc("B", "Links to [[A]]"),
+            _doc("C", "Links to [[Nowhere]]")
+        )
+        a, b, c = wikidoc.annotate_links(docs)
+        self.assertEqual(
+            tuple(stub.title for stub in a.meta["links"]),
+            ("B", "C")
+        )
+        self.assertEqual(
+            tuple(stub.title for stub in a.meta["backlinks"]),
+            ("B",)
+        )
+        self.assertEqual(len(c.meta["links"]), 0)
+        self.assertEqual(
+            tuple(stub.title for stub in c.meta["backlinks"]),
+            ("A",)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Unit tests for taxonomy
+"""
+import unittest
+from lettersmith import doc as Doc
+from lettersmith import stub as Stub
+from lettersmith import taxonomy
+from lettersmith.lens import get
+
+
+def _doc(title, **meta):
+    id_path = "post/{}.md".format(title)
+    return Doc.create(
+        id_path=id_path,
+        output_path=id_path,
+        title=title,
+        content="<p>{}</p>".format(title),
+        meta=meta
+    )
+
+
+DOCS = (
+    _doc("a", tags=("python", "Web"), series="intro"),
+    _doc("b", tags=("web", "python", "python")),
+    _doc("c", tags=("cooking",)),
+    _doc("d")
+)
+
+
+class test_index_taxonomies(unittest.TestCase):
+    def setUp(self):
+        self.registry = Stub.Registry()
+        self.index = taxonomy.index_taxonomies(
+            ("tags", "series"),
+            registry=self.registry
+        )(iter(DOCS))
+
+    def test_terms(self):
+        self.assertEqual(
+            self.index.terms("tags"),
+            ("cooking", "python", "Web", "web")
+        )
+        self.assertEqual(self.index.terms("series"), ("intro",))
+        self.assertEqual(self.index.terms("missing"), ())
+
+    def test_terms_by_count(self):
+        self.assertEqual(
+            self.index.terms("tags", by_count=True)[0],
+            "python"
+        )
+
+    def test_counts(self):
+        self.assertEqual(self.index.count("tags", "python"), 2)
+        self.assertEqual(self.index.counts("series"), {"intro": 1})
+
+    def test_docs(self):
+        titles = tuple(stub.title for stub in self.index.docs("tags", "python"))
+        self.assertEqual(titles, ("a", "b"))
+        self.assertEqual(len(self.registry), 3)
+
+    def test_index_taxonomy(self):
+        index = taxonomy.index_taxonomy("tags")(DOCS)
+        self.assertEqual(tuple(index), ("cooking", "python", "Web", "web"))
+        self.assertEqual(index["cooking"][0].title, "c")
+
+    def test_cloud(self):
+        cloud = self.index.cloud("tags", steps=3)
+        weights = {term.term: term.weight for term in cloud}
+        self.assertEqual(weights, {
+            "cooking": 1, "python": 3, "web": 1, "Web": 1
+        })
+
+
+class test_stages(unittest.TestCase):
+    def test_shared_index(self):
+        tax_index = taxonomy.index_taxonomies(("tags", "series"))(DOCS)
+        pages = tuple(taxonomy.archives(tax_index, "series"))
+        self.assertEqual(pages[0].output_path, "series/intro/index.html")
+        pages = tuple(
+            taxonomy.taxonomy_archives("tags", tax_index=tax_index)(())
+        )
+        self.assertEqual(len(pages), 4)
+
+    def test_related(self):
+        docs = tuple(taxonomy.related_by_tag(DOCS))
+        related = {
+            doc.title: tuple(
+                stub.title for stub in get(taxonomy.meta_related, doc)
+            )
+            for doc in docs
+        }
+        self.assertEqual(related, {"a": ("b",), "b": ("a",), "c": (), "d": ()})
+
+    def test_term_feeds(self):
+        feeds = tuple(taxonomy.term_feeds(
+            "tags",
+            "http://example.com",
+            "Posts tagged {term}",
+            "",
+            "Author"
+        )(DOCS))
+        self.assertEqual(feeds[1].output_path, "tags/python/rss.xml")
+        self.assertEqual(feeds[1].title, "Posts tagged python")
+        self.assertIn("<p>b</p>", feeds[1].content)
@@ -0,0 +1,239 @@
+"""
+Unit tests for write
+"""
+import unittest
+import tempfile
+import tarfile
+import zipfile
+from pathlib import Path, PurePath
+from lettersmith import doc as Doc
+from lettersmith import file as File
+from lettersmith.write import (
+    writer, threaded_writer, snapshot_writer, archive_writer,
+    archive_format, writeable as doc_writeable, WriteError
+)
+
+
+def _docs(n):
+    for i in range(n):
+        yield Doc.create(
+            id_path="{}.md".format(i),
+            output_path="dir{}/{}.html".format(i % 3, i),
+            content="doc {}".format(i)
+        )
+
+
+class test_threaded_writer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.public = Path(self.tmp.name, "public")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_writes(self):
+        write_threaded = threaded_writer(
+            doc_writeable,
+            jobs=3,
+            queue_size=2
+        )
+        stats = write_threaded(_docs(20), self.public)
+        self.assertEqual(stats["written"], 20)
+        self.assertEqual(stats["directories"], 3)
+        self.assertEqual(
+            Path(self.public, "dir1", "4.html").read_text(),
+            "doc 4"
+        )
+
+    def test_first_error(self):
+        missing = PurePath(self.tmp.name, "missing.bin")
+        def writeable(doc):
+            if doc.id_path in ("5.md", "7.md"):
+                # Copying from a file that doesn't exist always fails,
+                # no matter which thread writes it, or when.
+                return doc.output_path, missing
+            return doc_writeable(doc)
+        write_threaded = threaded_writer(writeable, jobs=4)
+        with self.assertRaises(WriteError) as context:
+            write_threaded(_docs(10), self.public)
+        self.assertEqual(context.exception.stats["written"], 8)
+        self.assertIn("2 failed writes", str(context.exception))
+        self.assertIn("5.html", str(context.exception))
+
+
+class test_snapshot_writer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.public = Path(self.tmp.name, "public")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_links_unchanged(self):
+        write_snapshot = snapshot_writer(doc_writeable)
+        stats = write_snapshot(_docs(4), self.public)
+        self.assertEqual(stats, {"written": 4, "linked": 0})
+        self.assertTrue(self.public.is_symlink())
+        first = Path(self.public, "dir0", "0.html").resolve()
+
+        docs = list(_docs(4))
+        docs[1] = docs[1]._replace(content="changed")
+        stats = write_snapshot(docs, self.public)
+        self.assertEqual(stats, {"written": 1, "linked": 3})
+        self.assertEqual(
+            Path(self.public, "dir1", "1.html").read_text(),
+            "changed"
+        )
+        second = Path(self.public, "dir0", "0.html").resolve()
+        self.assertNotEqual(first, second)
+        self.assertEqual(first.stat().st_ino, second.stat().st_ino)
+
+    def test_replaces_plain_directory(self):
+        Path(self.public, "old").mkdir(parents=True)
+        write_snapshot = snapshot_writer(doc_writeable)
+        write_snapshot(_docs(1), self.public)
+        self.assertFalse(Path(self.public, "old").exists())
+        self.assertTrue(Path(self.public, "dir0", "0.html").exists())
+
+    def test_lazy_files(self):
+        static = Path(self.tmp.name, "style.css")
+        static.write_bytes(b"body {a}")
+        def things():
+            yield File.load(static, lazy=True)._replace(
+                output_path="style.css"
+            )
+        write_snapshot = snapshot_writer(doc_writeable)
+        self.assertEqual(
+            write_snapshot(things(), self.public),
+            {"written": 1, "linked": 0}
+        )
+        self.assertEqual(
+            write_snapshot(things(), self.public),
+            {"written": 0, "linked": 1}
+        )
+        # Same size, different bytes
+        static.write_bytes(b"body {b}")
+        self.assertEqual(
+            write_snapshot(things(), self.public),
+            {"written": 1, "linked": 0}
+        )
+        self.assertEqual(
+            Path(self.public, "style.css").read_bytes(),
+            b"body {b}"
+        )
+
+    def test_failed_build_is_removed(self):
+        write_snapshot = snapshot_writer(doc_writeable)
+        write_snapshot(_docs(2), self.public)
+        def failing():
+            yield from _docs(1)
+            raise RuntimeError("render failed")
+        with self.assertRaises(RuntimeError):
+            write_snapshot(failing(), self.public)
+        snapshots = Path(self.tmp.name, ".public.snapshots")
+        self.assertEqual(len(tuple(snapshots.iterdir())), 1)
+        self.assertTrue(Path(self.public, "dir1", "1.html").exists())
+
+    def test_plain_writer_refuses_snapshot(self):
+        snapshot_writer(doc_writeable)(_docs(1), self.public)
+        snapshot_file = Path(self.public, "dir0", "0.html").resolve()
+        with self.assertRaises(ValueError):
+            writer(doc_writeable)(_docs(1), self.public)
+        with self.assertRaises(ValueError):
+            threaded_writer(doc_writeable, jobs=2)(_docs(1), self.public)
+        self.assertEqual(snapshot_file.read_text(), "doc 0")
+
+
+class test_archive_writer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = Path(self.tmp.name, "style.css")
+        self.static.write_bytes(b"body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _things(self):
+        yield from _docs(3)
+        yield File.load(self.static, lazy=True)._replace(
+            output_path="static/style.css"
+        )
+
+    def test_archive_format(self):
+        self.assertEqual(archive_format("public.tar.gz"), "tar.gz")
+        self.assertEqual(archive_format("out/public.TGZ"), "tar.gz")
+        self.assertEqual(archive_format("public.tar"), "tar")
+        self.assertEqual(archive_format("public.zip"), "zip")
+        self.assertIsNone(archive_format("public"))
+
+    def test_tar_gz(self):
+        path = Path(self.tmp.name, "public.tar.gz")
+        stats = writer(doc_writeable)(self._things(), path)
+        self.assertEqual(stats, {"written": 4, "bytes": 22})
+        with tarfile.open(path) as tar:
+            self.assertEqual(tar.getnames(), [
+                "dir0/0.html", "dir1/1.html", "dir2/2.html", "static/style.css"
+            ])
+            self.assertEqual(
+                tar.extractfile("static/style.css").read(),
+                b"body {}"
+            )
+            self.assertEqual(tar.getmember("dir0/0.html").mtime, 315532800)
+
+    def test_zip(self):
+        path = Path(self.tmp.name, "public.zip")
+        writer(doc_writeable)(self._things(), path)
+        with zipfile.ZipFile(path) as archive:
+            self.assertEqual(archive.read("dir1/1.html"), b"doc 1")
+            self.assertEqual(archive.read("static/style.css"), b"body {}")
+
+    def test_deterministic(self):
+        for name in ("a.tar.gz", "a.zip"):
+            first = Path(self.tmp.name, "1", name)
+            second = Path(self.tmp.name, "2", name)
+            write_archive = archive_writer(doc_writeable)
+            write_archive(self._things(), first)
+            write_archive(self._things(), second)
+            self.assertEqual(first.read_bytes(), second.read_bytes())
+
+    def test_no_partial_archive(self):
+        path = Path(self.tmp.name, "public.tar")
+        path.write_bytes(b"old")
+        def things():
+            yield from _docs(2)
+            raise RuntimeError("Build failed")
+        with self.assertRaises(RuntimeError):
+            writer(doc_writeable)(things(), path)
+        self.assertEqual(path.read_bytes(), b"old")
+        self.assertEqual(len(tuple(Path(self.tmp.name).iterdir())), 2)
+
+
+class test_lazy_files(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = Path(self.tmp.name, "style.css")
+        self.static.write_bytes(b"body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lazy_load(self):
+        file = File.load(self.static, lazy=True)
+        self.assertIsNone(file.blob)
+        self.assertEqual(File.read_blob(file), b"body {}")
+
+    def test_writers_copy_lazy_files(self):
+        file = File.load(self.static, lazy=True)._replace(
+            output_path="css/style.css"
+        )
+        for write in (writer(doc_writeable), threaded_writer(doc_writeable)):
+            public = Path(self.tmp.name, "public")
+            write((file,), public)
+            self.assertEqual(
+                Path(public, "css", "style.css").read_bytes(),
+                b"body {}"
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()